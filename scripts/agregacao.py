@@ -0,0 +1,85 @@
+# === agregacao.py ===
+# Agregação de várias chaves em uma única passada sobre a base, com códigos inteiros e bincount
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import instrumentar
+
+QUANTIS_PADRAO = (0.25, 0.5, 0.75)
+
+
+# Nome da coluna de um quantil: 0.5 -> 'q50'
+def nome_quantil(q):
+    return f"q{round(q * 100):02d}"
+
+
+# Quantis por grupo (interpolação linear, como o pandas), a partir dos valores ordenados por grupo
+def _quantis_por_grupo(codigos, valores, contagem, quantis):
+    ordem = np.lexsort((valores, codigos))
+    ordenados = valores[ordem]
+    inicio = np.concatenate(([0], np.cumsum(contagem)[:-1]))
+    resultado = {}
+    com_dados = contagem > 0
+    for q in quantis:
+        posicao = inicio + q * np.maximum(contagem - 1, 0)
+        abaixo = np.floor(posicao).astype(np.int64)
+        acima = np.minimum(abaixo + 1, inicio + np.maximum(contagem - 1, 0))
+        fracao = posicao - abaixo
+        coluna = np.full(len(contagem), np.nan)
+        coluna[com_dados] = (ordenados[abaixo[com_dados]] * (1 - fracao[com_dados])
+                             + ordenados[acima[com_dados]] * fracao[com_dados])
+        resultado[nome_quantil(q)] = coluna
+    return resultado
+
+
+# Estatísticas de uma chave: contagem, soma, média, desvio padrão e quantis
+def _agregar_chave(serie_chave, valores, validos, quantis):
+    codigos, categorias = pd.factorize(serie_chave)
+    k = len(categorias)
+
+    # Linhas com chave ausente (código -1) ficam de fora, como no groupby
+    com_chave = codigos >= 0
+    linhas = np.bincount(codigos[com_chave], minlength=k)
+
+    usar = com_chave & validos
+    c = codigos[usar]
+    v = valores[usar]
+    contagem = np.bincount(c, minlength=k)
+    soma = np.bincount(c, weights=v, minlength=k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = soma / contagem
+        # Desvio amostral (ddof=1) em duas etapas, mais estável que a soma de quadrados
+        desvios = np.bincount(c, weights=(v - media[c]) ** 2, minlength=k)
+        desvio = np.sqrt(desvios / (contagem - 1))
+    desvio[contagem < 2] = np.nan
+
+    colunas = {
+        'linhas': linhas,
+        'contagem': contagem,
+        'soma': soma,
+        'media': media,
+        'desvio': desvio
+    }
+    colunas.update(_quantis_por_grupo(c, v, contagem, quantis))
+    return pd.DataFrame(colunas, index=pd.Index(categorias, name=serie_chave.name))
+
+
+# Agregar o valor por várias chaves de uma vez; devolve {chave: DataFrame com as estatísticas}
+@instrumentar
+def agregar(df, chaves, valor, quantis=QUANTIS_PADRAO):
+    valores = df[valor].to_numpy(dtype=np.float64)
+    validos = ~np.isnan(valores)
+    return {chave: _agregar_chave(df[chave], valores, validos, quantis) for chave in chaves}
+
+
+# Visão filtrada de um resumo: apenas grupos com pelo menos "minimo" registros (sem recalcular)
+def filtrar_minimo(resumo, minimo):
+    return resumo[resumo['linhas'] >= minimo]
+
+
+# Ranking de uma estatística do resumo, em ordem decrescente
+def ranking(resumo, coluna='media', n=None):
+    # Ordenação estável: empates mantêm a ordem de aparição, como no value_counts
+    serie = resumo[coluna].sort_values(ascending=False, kind='stable')
+    return serie if n is None else serie.head(n)
@@ -1,10 +1,33 @@
 # === IMPORTAÇÃO DE BIBLIOTECAS ===
+import argparse
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from base_dados import carregar_tratado
+from correlacao import calcular, ranking_alvo
+from particionamento import PASTA_PARTICOES, carregar_particoes
+from quantis import estatisticas_boxplot, resumos_por_grupo, tabela_quantis
+
+# === FILTROS (OPCIONAIS) SOBRE A BASE PARTICIONADA DE VÁRIOS TRIBUNAIS ===
+# Sem filtros, a análise usa a base tratada do TJSP, como antes
+parser = argparse.ArgumentParser(description="Análise exploratória")
+parser.add_argument("--tribunal", nargs="+", default=None, help="ex.: TJSP")
+parser.add_argument("--uf", nargs="+", default=None, help="ex.: SP")
+parser.add_argument("--grau", nargs="+", default=None, help='ex.: "G1, JE"')
+parser.add_argument("--particoes", default=PASTA_PARTICOES, help="pasta da base particionada")
+args = parser.parse_args()
+filtros = {coluna: valores for coluna, valores in
+           [('Tribunal', args.tribunal), ('UF', args.uf), ('Grau', args.grau)] if valores}
 
 # === CARREGAMENTO DOS DADOS ===
-df = pd.read_csv("../dados/tjsp_processos_tratado.csv", sep=";")
+if filtros:
+    df = carregar_particoes(filtros, pasta=args.particoes)
+    leitura = df.attrs['leitura']
+    print(f"Filtros {filtros}: {leitura['particoes_lidas']} de {leitura['particoes_total']} partições lidas, "
+          f"{len(df)} linhas")
+else:
+    df = carregar_tratado()
 
 # === VISÃO GERAL DOS DADOS ===
 print(df.info())
@@ -25,8 +48,9 @@ print("\nResumo estatístico das variáveis numéricas:")
 print(df.describe())
 
 # === CORRELAÇÃO COM TEMPO DE TRAMITAÇÃO ===
-df_num = df.select_dtypes(include=['float64', 'int64'])
-correlacoes = df_num.corr()['TPSent_12_meses_num'].sort_values(ascending=False)
+# Uma única passada (guardada em cache) serve ao ranking, ao mapa de calor e ao recorte por Grau
+matrizes = calcular(df, agrupar='Grau')
+correlacoes = ranking_alvo(matrizes['pearson'])
 
 print("\n10 variáveis mais correlacionadas (positivamente) com o tempo de tramitação:")
 print(correlacoes.head(10))
@@ -34,6 +58,12 @@ print(correlacoes.head(10))
 print("\n10 variáveis mais correlacionadas (negativamente):")
 print(correlacoes.tail(10))
 
+print("\nCorrelação com o tempo de tramitação por Grau (Pearson):")
+print(pd.DataFrame({grau: ranking_alvo(m['pearson']) for grau, m in matrizes['grupos'].items()})
+      .reindex(correlacoes.index).round(2))
+print("\nCorrelação de postos (Spearman) com o tempo de tramitação:")
+print(ranking_alvo(matrizes['spearman']).head(10))
+
 # === VISUALIZAÇÕES ===
 
 # Histograma do tempo de tramitação
@@ -47,14 +77,14 @@ plt.show()
 
 # Mapa de calor das correlações
 plt.figure(figsize=(10, 8))
-sns.heatmap(df_num.corr(), cmap='coolwarm', annot=False)
+sns.heatmap(matrizes['pearson'], cmap='coolwarm', annot=False)
 plt.title('Mapa de Calor das Correlações')
 plt.tight_layout()
 plt.show()
 
-# Boxplot por Grau
-plt.figure(figsize=(8, 5))
-sns.boxplot(data=df, x='Grau', y='TPSent_12_meses_num')
+# Boxplot por Grau, desenhado a partir dos resumos de quantis de cada grupo (sem as linhas)
+fig, ax = plt.subplots(figsize=(8, 5))
+ax.bxp(estatisticas_boxplot(resumos_por_grupo(df, 'Grau')), patch_artist=True)
 plt.title('Tempo de Tramitação por Grau de Jurisdição')
 plt.xlabel('Grau')
 plt.ylabel('Meses até Sentença')
@@ -62,15 +92,21 @@ plt.tight_layout()
 plt.show()
 
 # 10 órgãos mais lentos
-ranking_lento = df.groupby('Nome orgao')['TPSent_12_meses_num'].mean().sort_values(ascending=False).head(10)
+ranking_lento = df.groupby('Nome orgao', observed=True)['TPSent_12_meses_num'].mean().sort_values(ascending=False).head(10)
 plt.figure(figsize=(10, 6))
-sns.barplot(x=ranking_lento.values, y=ranking_lento.index)
+sns.barplot(x=ranking_lento.values, y=ranking_lento.index.astype(str))
 plt.title('10 Órgãos com Maior Tempo Médio de Tramitação')
 plt.xlabel('Tempo Médio (meses)')
 plt.ylabel('Órgão Judicial')
 plt.tight_layout()
 plt.show()
 
+# 10 municípios com maior tempo mediano entre os órgãos (menos sensível a poucos órgãos muito lentos)
+medianas_municipio = tabela_quantis(resumos_por_grupo(df, 'Municipio'))
+medianas_municipio = medianas_municipio[medianas_municipio['contagem'] >= 5]
+print("\n10 municípios com maior tempo mediano de tramitação (mínimo de 5 órgãos):")
+print(medianas_municipio.sort_values('q50', ascending=False, kind='stable').head(10)[['contagem', 'q25', 'q50', 'q75']])
+
 # Correlação TPCPL x TPSent
 plt.figure(figsize=(8, 5))
 sns.scatterplot(data=df, x='TPCPL_Dec_2024_num', y='TPSent_12_meses_num')
@@ -115,9 +151,7 @@ plt.tight_layout()
 plt.show()
 
 # Histograma do Índice de Atendimento à Demanda (IAD_12_meses) ===
-# Converter a coluna de IAD para numérica, caso ainda esteja como texto com %
-df['IAD_12_meses_num'] = df['IAD_12_meses'].str.replace('%', '').str.replace(',', '.').astype(float)
-
+# A coluna IAD_12_meses_num já vem convertida do tratamento (carregamento.py)
 plt.figure(figsize=(10, 6))
 sns.histplot(df['IAD_12_meses_num'], bins=30, kde=True, color='skyblue')
 plt.title('Distribuição do Índice de Atendimento à Demanda (IAD)')
@@ -127,46 +161,14 @@ plt.tight_layout()
 plt.show()
 
 # Boxplot do tempo de tramitação nos 10 municípios com mais processos ===
-# Selecionar os 10 municípios com mais registros
-top_municipios = df['Municipio'].value_counts().head(10).index
-
-plt.figure(figsize=(12, 6))
-sns.boxplot(
-    data=df[df['Municipio'].isin(top_municipios)],
-    x='Municipio',
-    y='TPSent_12_meses_num',
-    palette='Pastel1'
-)
-plt.title('Tempo de Tramitação por Município (Top 10 mais frequentes)')
-plt.xlabel('Município')
-plt.ylabel('Tempo de Tramitação (meses)')
-plt.xticks(rotation=45)
-plt.tight_layout()
-plt.show()
-
-# Histograma do IAD==
-# Converter IAD de string para número
-df['IAD_12_meses_num'] = df['IAD_12_meses'].str.replace('%', '').str.replace(',', '.').astype(float)
-
-plt.figure(figsize=(10, 6))
-sns.histplot(df['IAD_12_meses_num'], bins=30, kde=True, color='lightcoral')
-plt.title('Distribuição do Índice de Atendimento à Demanda (IAD)')
-plt.xlabel('IAD (%)')
-plt.ylabel('Frequência')
-plt.tight_layout()
-plt.show()
-
-#Boxplot do tempo de tramitação por municípios mais demandados ==
-# Selecionar os 10 municípios com mais registros
-top_municipios = df['Municipio'].value_counts().head(10).index
-
-plt.figure(figsize=(12, 6))
-sns.boxplot(
-    data=df[df['Municipio'].isin(top_municipios)],
-    x='Municipio',
-    y='TPSent_12_meses_num',
-    palette='Pastel2'
-)
+# Selecionar os 10 municípios com mais registros (contagens dos próprios resumos)
+resumos_municipio = resumos_por_grupo(df, 'Municipio')
+top_municipios = sorted(resumos_municipio, key=lambda m: -resumos_municipio[m].n)[:10]
+
+fig, ax = plt.subplots(figsize=(12, 6))
+caixas = ax.bxp(estatisticas_boxplot(resumos_municipio, top_municipios), patch_artist=True)
+for caixa, cor in zip(caixas['boxes'], plt.get_cmap('Pastel1').colors):
+    caixa.set_facecolor(cor)
 plt.title('Tempo de Tramitação por Município (Top 10 mais frequentes)')
 plt.xlabel('Município')
 plt.ylabel('Tempo de Tramitação (meses)')
@@ -1,48 +1,46 @@
 # === analise_fatores_atraso.py ===
 # Análise complementar dos fatores que influenciam o tempo de tramitação dos processos
 
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from agregacao import filtrar_minimo, ranking
+from cubo import carregar_cubo
 
-# === CARREGAR OS DADOS ===
-df = pd.read_csv(r"C:\Users\Windows\Arquivos de sistema\Desktop\tcc_previsao_processos\dados\tjsp_processos_tratado.csv", sep=";")
-
-# === REMOVER REGISTROS INCOMPLETOS RELEVANTES ===
-df = df.dropna(subset=['TPSent_12_meses_num', 'Nome orgao', 'Municipio', 'Grau'])
+# === CUBO PRÉ-AGREGADO DE ÓRGÃO x MUNICÍPIO x GRAU ===
+# Contagem, soma e soma de quadrados por célula, montados uma vez e guardados em cache (ver cubo.py);
+# cada tabela abaixo é um rollup do cubo, sem nova passada sobre a base
+cubo = carregar_cubo()
+resumos = {chave: cubo.consultar(chave) for chave in ['Nome orgao', 'Municipio', 'Grau']}
 
 # === TEMPO MÉDIO POR ÓRGÃO ===
-tempo_por_orgao = df.groupby('Nome orgao')['TPSent_12_meses_num'].mean().sort_values(ascending=False)
+tempo_por_orgao = ranking(resumos['Nome orgao'], 'media')
 print("\nTempo médio por órgão:")
 print(tempo_por_orgao.head(10))
 
 # === TEMPO MÉDIO POR MUNICÍPIO ===
-tempo_por_municipio = df.groupby('Municipio')['TPSent_12_meses_num'].mean().sort_values(ascending=False)
+tempo_por_municipio = ranking(resumos['Municipio'], 'media')
 print("\nTempo médio por município:")
 print(tempo_por_municipio.head(10))
 
 # === TEMPO MÉDIO POR GRAU ===
-tempo_por_grau = df.groupby('Grau')['TPSent_12_meses_num'].mean()
+tempo_por_grau = resumos['Grau']['media'].sort_index()
 print("\nTempo médio por grau:")
 print(tempo_por_grau)
 
 # === VOLUME DE PROCESSOS POR ÓRGÃO ===
-volume_por_orgao = df['Nome orgao'].value_counts()
+volume_por_orgao = ranking(resumos['Nome orgao'], 'linhas')
 print("\nVolume de processos por órgão:")
 print(volume_por_orgao.head(10))
 
 # === VOLUME DE PROCESSOS POR MUNICÍPIO ===
-volume_por_municipio = df['Municipio'].value_counts()
+volume_por_municipio = ranking(resumos['Municipio'], 'linhas')
 print("\nVolume de processos por município:")
 print(volume_por_municipio.head(10))
 
 # === TABELA CRUZADA: TEMPO MÉDIO + QUANTIDADE DE PROCESSOS POR ÓRGÃO ===
-resumo_orgao = df.groupby('Nome orgao').agg({
-    'TPSent_12_meses_num': 'mean',
-    'Nome orgao': 'count'
-}).rename(columns={
-    'TPSent_12_meses_num': 'Tempo_medio_meses',
-    'Nome orgao': 'Qtd_processos'
+resumo_orgao = resumos['Nome orgao'][['media', 'linhas']].rename(columns={
+    'media': 'Tempo_medio_meses',
+    'linhas': 'Qtd_processos'
 }).sort_values(by='Tempo_medio_meses', ascending=False)
 
 print("\nResumo por órgão (tempo médio e volume):")
@@ -81,31 +79,21 @@ plt.show()
 print("\n=== ANÁLISE REFINADA ===")
 print("Aplicando filtro: considerar apenas órgãos com 5 ou mais processos.")
 
-# Contar número de processos por órgão
-volume_orgao = df['Nome orgao'].value_counts()
-orgaos_validos = volume_orgao[volume_orgao >= 5].index
-
-# Criar novo DataFrame filtrado
-df_filtrado = df[df['Nome orgao'].isin(orgaos_validos)]
+# O filtro é uma visão do resumo já calculado: as estatísticas de cada órgão não mudam
+resumo_orgao_filtrado = filtrar_minimo(resumos['Nome orgao'], 5)
 
-# Recalcular tempo médio por órgão (após filtro)
-tempo_filtrado = df_filtrado.groupby('Nome orgao')['TPSent_12_meses_num'].mean().sort_values(ascending=False)
+# Tempo médio por órgão (após filtro)
+tempo_filtrado = ranking(resumo_orgao_filtrado, 'media')
 print("\nTempo médio por órgão (≥ 5 processos):")
 print(tempo_filtrado.head(10))
 
-# Recalcular volume de processos por órgão (após filtro)
-volume_filtrado = df_filtrado['Nome orgao'].value_counts()
+# Volume de processos por órgão (após filtro)
+volume_filtrado = ranking(resumo_orgao_filtrado, 'linhas')
 print("\nVolume de processos por órgão (≥ 5):")
 print(volume_filtrado.head(10))
 
 # Tabela cruzada resumo por órgão (após filtro)
-resumo_filtrado = df_filtrado.groupby('Nome orgao').agg({
-    'TPSent_12_meses_num': 'mean',
-    'Nome orgao': 'count'
-}).rename(columns={
-    'TPSent_12_meses_num': 'Tempo_medio_meses',
-    'Nome orgao': 'Qtd_processos'
-}).sort_values(by='Tempo_medio_meses', ascending=False)
+resumo_filtrado = resumo_orgao.loc[resumo_orgao['Qtd_processos'] >= 5]
 
 print("\nResumo por órgão (tempo médio e volume - ≥ 5 processos):")
 print(resumo_filtrado.head(10))
@@ -0,0 +1,136 @@
+# === artefato_modelo.py ===
+# Persistência versionada do modelo final (codificador + Random Forest ou gradient boosting com histogramas)
+# e previsão a partir do artefato
+
+import json
+import os
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import floresta_compilada
+from base_dados import ALVO, PASTA_SCRIPTS
+
+PASTA_MODELOS = os.path.join(PASTA_SCRIPTS, "..", "modelos")
+NOME_MODELO = "rf_final"
+
+# Até este número de linhas a previsão usa a floresta compilada (latência baixa em lotes pequenos);
+# acima dele o predict do sklearn, em Cython, é mais rápido
+LIMITE_COMPILADA = 10_000
+
+
+def _pasta_modelo(nome):
+    return os.path.join(PASTA_MODELOS, nome)
+
+
+# Versões existentes de um modelo, em ordem crescente (pastas v001, v002, ...)
+def listar_versoes(nome=NOME_MODELO):
+    pasta = _pasta_modelo(nome)
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(int(p[1:]) for p in os.listdir(pasta) if p.startswith('v') and p[1:].isdigit())
+
+
+# === SALVAR ===
+# Cada chamada cria uma nova versão. As tabelas do codificador vão em .npy (lidas com memory map)
+# e a floresta vai em joblib sem compressão, para que seus arrays também possam ser mapeados.
+def salvar_artefato(encoder, modelo, variaveis_numericas, variaveis_categoricas, metricas=None, nome=NOME_MODELO):
+    versao = (listar_versoes(nome) or [0])[-1] + 1
+    pasta = os.path.join(_pasta_modelo(nome), f"v{versao:03d}")
+    os.makedirs(pasta)
+
+    joblib.dump(modelo, os.path.join(pasta, "modelo.joblib"), compress=0)
+
+    # Floresta compilada em arrays contíguos (.npy), para previsões de baixa latência (só Random Forest)
+    floresta = None
+    if hasattr(modelo, 'estimators_'):
+        floresta = floresta_compilada.compilar(modelo)
+        floresta_compilada.salvar(floresta, pasta)
+
+    tabelas = {}
+    for i, coluna in enumerate(encoder.categorias_):
+        np.save(os.path.join(pasta, f"codificador_{i}_valores.npy"), encoder.valores_[coluna])
+        categorias = encoder.categorias_[coluna].astype(str).tolist()
+        tabelas[coluna] = {'arquivo': f"codificador_{i}_valores.npy", 'categorias': categorias}
+
+    import sklearn
+    metadados = {
+        'nome': nome,
+        'versao': versao,
+        'criado_em': datetime.now().isoformat(timespec='seconds'),
+        'alvo': ALVO,
+        'variaveis_numericas': list(variaveis_numericas),
+        'variaveis_categoricas': list(variaveis_categoricas),
+        'colunas_modelo': list(variaveis_numericas) + list(variaveis_categoricas),
+        'tipo_modelo': type(modelo).__name__,
+        'tipo_codificador': type(encoder).__name__,
+        'prior': encoder.prior_,
+        'codificador': tabelas,
+        'metricas': metricas or {},
+        'sklearn': sklearn.__version__,
+    }
+    if floresta is not None:
+        metadados['floresta'] = {'profundidade': floresta['profundidade'], 'n_atributos': floresta['n_atributos']}
+    with open(os.path.join(pasta, "metadados.json"), 'w', encoding='utf-8') as arquivo:
+        json.dump(metadados, arquivo, ensure_ascii=False, indent=1)
+    return pasta
+
+
+# === CARREGAR ===
+def carregar_artefato(versao=None, nome=NOME_MODELO, mmap=True):
+    versoes = listar_versoes(nome)
+    if not versoes:
+        raise FileNotFoundError(f"Nenhum artefato salvo para '{nome}' em {PASTA_MODELOS}")
+    versao = versao or versoes[-1]
+    pasta = os.path.join(_pasta_modelo(nome), f"v{versao:03d}")
+
+    with open(os.path.join(pasta, "metadados.json"), encoding='utf-8') as arquivo:
+        metadados = json.load(arquivo)
+
+    modo = 'r' if mmap else None
+    codificador = {}
+    for coluna, tabela in metadados['codificador'].items():
+        codificador[coluna] = {
+            'categorias': pd.Index(tabela['categorias']),
+            'valores': np.load(os.path.join(pasta, tabela['arquivo']), mmap_mode=modo)
+        }
+
+    floresta = None
+    if 'floresta' in metadados:
+        floresta = floresta_compilada.carregar(pasta, metadados['floresta']['profundidade'],
+                                               metadados['floresta']['n_atributos'], mmap=mmap)
+
+    return {
+        'metadados': metadados,
+        'codificador': codificador,
+        'modelo': joblib.load(os.path.join(pasta, "modelo.joblib"), mmap_mode=modo),
+        'floresta': floresta,
+        'pasta': pasta
+    }
+
+
+# === PREVER ===
+# Monta a matriz na mesma ordem de colunas do treino; categorias desconhecidas recebem o 'prior'
+# (a média geral no target encoding, ausente nos códigos categóricos nativos)
+def montar_matriz(artefato, df):
+    meta = artefato['metadados']
+    X = np.empty((len(df), len(meta['colunas_modelo'])), dtype=np.float64)
+    for j, coluna in enumerate(meta['variaveis_numericas']):
+        X[:, j] = pd.to_numeric(df[coluna], errors='coerce').to_numpy(dtype=np.float64)
+    inicio = len(meta['variaveis_numericas'])
+    for j, coluna in enumerate(meta['variaveis_categoricas']):
+        tabela = artefato['codificador'][coluna]
+        codigos = tabela['categorias'].get_indexer(df[coluna].astype(str))
+        X[:, inicio + j] = np.where(codigos >= 0, tabela['valores'][np.maximum(codigos, 0)], meta['prior'])
+    return X
+
+
+def prever(artefato, df):
+    X = montar_matriz(artefato, df)
+    if artefato.get('floresta') is not None and len(X) <= LIMITE_COMPILADA:
+        return floresta_compilada.prever(artefato['floresta'], X)
+    # O modelo foi ajustado com nomes de colunas; usamos o mesmo formato para evitar avisos
+    X = pd.DataFrame(X, columns=artefato['metadados']['colunas_modelo'])
+    return artefato['modelo'].predict(X)
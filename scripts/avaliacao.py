@@ -0,0 +1,283 @@
+# === avaliacao.py ===
+# Avaliação por K-fold repetido, em vez de uma única divisão treino/teste.
+# Os índices das dobras são calculados uma vez e guardados em disco; para cada dobra ficam em cache
+# o codificador ajustado no treino e as previsões de cada modelo, numa pasta identificada pelo hash
+# dos dados e da configuração. Rodar de novo depois de incluir um modelo (ou mais repetições)
+# ajusta só o que falta.
+#
+# Exemplos:
+#   python avaliacao.py
+#   python avaliacao.py --repeticoes 5 --agrupar Municipio
+#   python avaliacao.py --estratificar Grau --modelos "Random Forest" "Random Forest + categóricas"
+#   python avaliacao.py --modelos "Random Forest + categóricas (fora da dobra)" "Gradient Boosting (histogramas)"
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from base_dados import ALVO, PASTA_CACHE, VARIAVEIS_CATEGORICAS, VARIAVEIS_NUMERICAS, carregar_modelagem
+from codificacao import CodificadorAlvo
+from comparacao_modelos import intervalo_corrigido
+
+PASTA_CACHE_AVALIACAO = os.path.join(PASTA_CACHE, "avaliacao")
+METRICAS = ['MAE', 'RMSE', 'R2']
+
+
+# === MODELOS ===
+# Cada modelo declara como é criado e se usa as variáveis categóricas, codificadas na dobra de treino:
+# True para target encoding, 'fora_da_dobra' para target encoding out-of-fold no treino (cada linha
+# codificada sem o próprio alvo, como em cli.py treinar --fora-da-dobra) e 'nativas' para códigos
+# categóricos (CodificadorCategorias)
+def _regressao_linear():
+    from sklearn.linear_model import LinearRegression
+    return LinearRegression()
+
+
+def _arvore():
+    from sklearn.tree import DecisionTreeRegressor
+    return DecisionTreeRegressor(random_state=42)
+
+
+def _floresta():
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(random_state=42, n_jobs=-1)
+
+
+def _gradiente():
+    from gradiente_histograma import criar_modelo
+    return criar_modelo(semente=42)
+
+
+MODELOS = {
+    'Regressão Linear': {'criar': _regressao_linear, 'categoricas': False},
+    'Árvore de Decisão': {'criar': _arvore, 'categoricas': False},
+    'Random Forest': {'criar': _floresta, 'categoricas': False},
+    'Random Forest + categóricas': {'criar': _floresta, 'categoricas': True},
+    'Random Forest + categóricas (fora da dobra)': {'criar': _floresta, 'categoricas': 'fora_da_dobra'},
+    'Gradient Boosting (histogramas)': {'criar': _gradiente, 'categoricas': 'nativas'},
+}
+
+
+# Chave do modelo: nome legível + hash dos hiperparâmetros, para que mudar um parâmetro gere outra pasta.
+# Modelos com target encoding incluem o hash dos parâmetros do codificador: as previsões mudam com eles
+def chave_modelo(nome, especificacao, codificador=None):
+    parametros = especificacao['criar']().get_params()
+    conteudo = {'parametros': parametros, 'categoricas': especificacao['categoricas']}
+    if especificacao['categoricas'] in (True, 'fora_da_dobra'):
+        conteudo['codificador'] = codificador
+    texto = json.dumps(conteudo, sort_keys=True, default=str)
+    prefixo = re.sub(r'[^a-z0-9]+', '_', nome.lower().encode('ascii', 'ignore').decode()).strip('_')
+    return f"{prefixo}-{hashlib.sha256(texto.encode('utf-8')).hexdigest()[:12]}"
+
+
+# === DOBRAS ===
+# Dobra de teste de cada linha numa repetição (vetor de inteiros de 0 a n_dobras - 1)
+def gerar_dobras(df, n_dobras, semente, agrupar=None, estratificar=None):
+    from sklearn.model_selection import KFold, StratifiedGroupKFold, StratifiedKFold
+
+    dobra = np.empty(len(df), dtype=np.int8)
+    if agrupar and estratificar:
+        divisor = StratifiedGroupKFold(n_splits=n_dobras, shuffle=True, random_state=semente)
+        divisoes = divisor.split(df, df[estratificar].astype(str), df[agrupar].astype(str))
+    elif estratificar:
+        divisor = StratifiedKFold(n_splits=n_dobras, shuffle=True, random_state=semente)
+        divisoes = divisor.split(df, df[estratificar].astype(str))
+    elif agrupar:
+        return _dobras_agrupadas(df[agrupar], n_dobras, semente)
+    else:
+        divisoes = KFold(n_splits=n_dobras, shuffle=True, random_state=semente).split(df)
+    for d, (_, teste) in enumerate(divisoes):
+        dobra[teste] = d
+    return dobra
+
+
+# Grupos inteiros (por exemplo, todos os órgãos de um município) caem na mesma dobra.
+# Os grupos são embaralhados e, do maior para o menor, vão para a dobra com menos linhas até então.
+def _dobras_agrupadas(grupos, n_dobras, semente):
+    codigos, _ = pd.factorize(grupos.astype(str))
+    tamanhos = np.bincount(codigos)
+    ordem = np.random.default_rng(semente).permutation(len(tamanhos))
+    ordem = ordem[np.argsort(-tamanhos[ordem], kind='stable')]
+    carga = np.zeros(n_dobras, dtype=np.int64)
+    dobra_do_grupo = np.empty(len(tamanhos), dtype=np.int8)
+    for g in ordem:
+        destino = int(np.argmin(carga))
+        dobra_do_grupo[g] = destino
+        carga[destino] += tamanhos[g]
+    return dobra_do_grupo[codigos]
+
+
+# === CACHE ===
+# Pasta da avaliação: hash dos dados + configuração das dobras. O número de repetições fica de fora:
+# a repetição r usa sempre a semente (semente + r), então aumentar as repetições reaproveita as anteriores.
+def hash_dados(df):
+    h = hashlib.sha256(json.dumps(list(df.columns)).encode('utf-8'))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def pasta_avaliacao(df, configuracao):
+    texto = json.dumps({'dados': hash_dados(df), **configuracao}, sort_keys=True)
+    return os.path.join(PASTA_CACHE_AVALIACAO, hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16])
+
+
+def _ler(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return pickle.load(arquivo)
+
+
+def _gravar(caminho, objeto):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as arquivo:
+        pickle.dump(objeto, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+
+
+def _em_cache(caminho, calcular):
+    if os.path.exists(caminho):
+        return _ler(caminho), True
+    objeto = calcular()
+    _gravar(caminho, objeto)
+    return objeto, False
+
+
+# === AVALIAÇÃO ===
+def avaliar(df, modelos=None, n_dobras=5, repeticoes=3, agrupar=None, estratificar=None, semente=42,
+            codificador=None, verbose=True):
+    modelos = modelos or list(MODELOS)
+    codificador = codificador or {}
+    configuracao = {'n_dobras': n_dobras, 'agrupar': agrupar, 'estratificar': estratificar, 'semente': semente,
+                    'alvo': ALVO, 'numericas': VARIAVEIS_NUMERICAS, 'categoricas': VARIAVEIS_CATEGORICAS}
+    pasta = pasta_avaliacao(df, configuracao)
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, "configuracao.json"), 'w', encoding='utf-8') as arquivo:
+        json.dump(configuracao, arquivo, ensure_ascii=False, indent=1)
+
+    y = df[ALVO].to_numpy(np.float64)
+    numericas = df[VARIAVEIS_NUMERICAS].to_numpy(np.float64)
+    hash_codificador = hashlib.sha256(json.dumps(codificador, sort_keys=True).encode('utf-8')).hexdigest()[:8]
+    pasta_codificadores = os.path.join(pasta, "codificadores-" + hash_codificador)
+
+    resultados = []
+    for r in range(repeticoes):
+        dobras, _ = _em_cache(os.path.join(pasta, "dobras", f"r{r:02d}.pkl"),
+                              lambda: gerar_dobras(df, n_dobras, semente + r, agrupar, estratificar))
+        for d in range(n_dobras):
+            treino, teste = np.flatnonzero(dobras != d), np.flatnonzero(dobras == d)
+            matrizes = {}
+
+            # Matrizes montadas só se algum modelo desta dobra ainda não estiver em cache
+            def montar(categoricas):
+                if categoricas not in matrizes:
+                    if not categoricas:
+                        matrizes[categoricas] = numericas[treino], numericas[teste]
+                    else:
+                        if categoricas == 'fora_da_dobra':
+                            # Treino codificado fora da dobra; o teste, pelo codificador ajustado no treino todo
+                            def ajustar_oof():
+                                enc = CodificadorAlvo(**codificador)
+                                cat_treino = enc.fit_transform_oof(df[VARIAVEIS_CATEGORICAS].iloc[treino], y[treino])
+                                return enc, cat_treino.to_numpy(np.float64)
+
+                            (enc, cat_treino), _ = _em_cache(
+                                os.path.join(pasta_codificadores, f"oof_r{r:02d}_d{d}.pkl"), ajustar_oof)
+                            matrizes[categoricas] = (
+                                np.column_stack([numericas[treino], cat_treino]),
+                                np.column_stack([numericas[teste], enc.transform(
+                                    df[VARIAVEIS_CATEGORICAS].iloc[teste]).to_numpy(np.float64)]))
+                            return matrizes[categoricas]
+                        if categoricas == 'nativas':
+                            from gradiente_histograma import criar_codificador
+                            enc, _ = _em_cache(os.path.join(pasta, "categorias", f"r{r:02d}_d{d}.pkl"),
+                                               lambda: criar_codificador().fit(df[VARIAVEIS_CATEGORICAS].iloc[treino]))
+                        else:
+                            enc, _ = _em_cache(os.path.join(pasta_codificadores, f"r{r:02d}_d{d}.pkl"),
+                                               lambda: CodificadorAlvo(**codificador).fit(
+                                                   df[VARIAVEIS_CATEGORICAS].iloc[treino], y[treino]))
+                        matrizes[categoricas] = tuple(
+                            np.column_stack([numericas[idx],
+                                             enc.transform(df[VARIAVEIS_CATEGORICAS].iloc[idx]).to_numpy(np.float64)])
+                            for idx in (treino, teste))
+                return matrizes[categoricas]
+
+            for nome in modelos:
+                especificacao = MODELOS[nome]
+
+                def ajustar():
+                    X_treino, X_teste = montar(especificacao['categoricas'])
+                    inicio = time.perf_counter()
+                    modelo = especificacao['criar']().fit(X_treino, y[treino])
+                    return {'previsto': modelo.predict(X_teste), 'segundos': time.perf_counter() - inicio}
+
+                caminho = os.path.join(pasta, "modelos", chave_modelo(nome, especificacao, hash_codificador),
+                                       f"r{r:02d}_d{d}.pkl")
+                saida, do_cache = _em_cache(caminho, ajustar)
+                previsto = saida['previsto']
+                resultados.append({
+                    'Modelo': nome, 'repeticao': r, 'dobra': d, 'n_teste': len(teste),
+                    'MAE': mean_absolute_error(y[teste], previsto),
+                    'RMSE': mean_squared_error(y[teste], previsto) ** 0.5,
+                    'R2': r2_score(y[teste], previsto),
+                    'segundos': saida['segundos'], 'do_cache': do_cache,
+                })
+        if verbose:
+            novos = sum(not x['do_cache'] for x in resultados if x['repeticao'] == r)
+            print(f"Repetição {r + 1}/{repeticoes}: {novos} ajustes novos, "
+                  f"{n_dobras * len(modelos) - novos} lidos do cache")
+    return pd.DataFrame(resultados)
+
+
+# Média por modelo sobre todas as dobras e repetições, com intervalo corrigido de Nadeau-Bengio
+# (no K-fold, a proporção de teste de cada dobra é 1 / n_dobras)
+def resumir(resultados, n_dobras, confianca=0.95):
+    linhas = []
+    for nome, grupo in resultados.groupby('Modelo', sort=False):
+        linha = {'Modelo': nome, 'dobras': len(grupo)}
+        for metrica in METRICAS:
+            media, inferior, superior = intervalo_corrigido(grupo[metrica].to_numpy(), 1 / n_dobras, confianca)
+            linha[metrica] = media
+            linha[f'{metrica}_desvio'] = grupo[metrica].std()
+            linha[f'{metrica}_inf'] = inferior
+            linha[f'{metrica}_sup'] = superior
+        linhas.append(linha)
+    return pd.DataFrame(linhas).sort_values('R2', ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Avaliação dos modelos por K-fold repetido com cache por dobra")
+    parser.add_argument("--modelos", nargs="+", default=list(MODELOS))
+    parser.add_argument("--dobras", type=int, default=5)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--agrupar", default=None, help="coluna de grupos mantidos na mesma dobra (ex.: Municipio)")
+    parser.add_argument("--estratificar", default=None, help="coluna usada para estratificar as dobras (ex.: Grau)")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    desconhecidos = set(args.modelos) - set(MODELOS)
+    if desconhecidos:
+        parser.error(f"modelos desconhecidos: {sorted(desconhecidos)} (opções: {list(MODELOS)})")
+
+    df = carregar_modelagem(categoricas=True).reset_index(drop=True)
+    for coluna in (args.agrupar, args.estratificar):
+        if coluna and coluna not in df.columns:
+            parser.error(f"coluna desconhecida: {coluna}")
+
+    inicio = time.perf_counter()
+    resultados = avaliar(df, args.modelos, args.dobras, args.repeticoes, args.agrupar, args.estratificar,
+                         args.semente)
+    print(f"\nAvaliação concluída em {time.perf_counter() - inicio:.1f} s")
+
+    pd.set_option('display.width', 200)
+    print(f"\nK-fold {args.dobras} x {args.repeticoes} repetições"
+          + (f", agrupado por {args.agrupar}" if args.agrupar else "")
+          + (f", estratificado por {args.estratificar}" if args.estratificar else "") + ":")
+    print(resumir(resultados, args.dobras).round(3).to_string(index=False))
@@ -0,0 +1,149 @@
+# === base_dados.py ===
+# Acesso à base tratada com cache colunar (Parquet) invalidado pela origem CSV
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from instrumentacao import instrumentar, rastrear
+
+# === CAMINHOS ===
+PASTA_SCRIPTS = os.path.dirname(os.path.abspath(__file__))
+PASTA_DADOS = os.path.join(PASTA_SCRIPTS, "..", "dados")
+PASTA_CACHE = os.path.join(PASTA_DADOS, "cache")
+CAMINHO_ORIGINAL = os.path.join(PASTA_DADOS, "tjsp_processos_sp.csv")
+CAMINHO_TRATADO = os.path.join(PASTA_DADOS, "tjsp_processos_tratado.csv")
+
+# === VARIÁVEIS USADAS NA MODELAGEM ===
+ALVO = 'TPSent_12_meses_num'
+
+VARIAVEIS_NUMERICAS = [
+    'TPCPL_Dec_2024_num',
+    'Conc100_Dec_2024',
+    'CN_12_meses',
+    'Desp_12_meses',
+    'Sus_Dec_2023',
+    'Sus_Dec_2024',
+    'Tbaix_12_meses',
+    'CP_Dec_2024',
+    'SentCM_12_meses',
+    'SentSM_12_meses'
+]
+
+VARIAVEIS_CATEGORICAS = ['Nome orgao', 'Municipio', 'Grau']
+
+# Tipos da base tratada, para não depender da inferência do read_csv
+TIPOS_TEXTO = [
+    'Tribunal', 'Municipio', 'UF', 'Nome orgao', 'Grau', '%CP', '%Sus',
+    'TPSent_12_meses', 'TPCPL_Dec_2024', 'TC_Dec_2024', 'IAD_12_meses'
+]
+
+
+# Versão do conteúdo do cache; caches de versões anteriores são refeitos.
+# 2: tabela compactada (textos como categoria, números no menor tipo seguro; ver carregamento.compactar)
+# 3: contagens inteiras gravadas como inteiros (int32/int16) em vez de float64
+VERSAO_CACHE = 3
+
+
+# Formato do cache: Parquet quando o pyarrow estiver instalado, senão pickle do pandas
+def formato_cache():
+    try:
+        import pyarrow  # noqa: F401
+        return 'parquet'
+    except ImportError:
+        return 'pickle'
+
+
+# Hash SHA-256 do conteúdo de um arquivo, lido em blocos
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+# Salvar um DataFrame no formato colunar escolhido
+def salvar_colunar(df, caminho, formato=None):
+    formato = formato or formato_cache()
+    if formato == 'parquet':
+        df.to_parquet(caminho, index=False)
+    else:
+        df.to_pickle(caminho)
+
+
+# Ler um DataFrame do formato colunar, lendo só as colunas pedidas quando possível
+def ler_colunar(caminho, colunas=None, formato=None):
+    formato = formato or formato_cache()
+    if formato == 'parquet':
+        return pd.read_parquet(caminho, columns=colunas)
+    df = pd.read_pickle(caminho)
+    return df[colunas] if colunas is not None else df
+
+
+# Verificar se o cache ainda corresponde ao CSV de origem (mtime/tamanho e, se mudarem, hash)
+def _cache_valido(origem, caminho_meta, caminho_cache, formato):
+    if not (os.path.exists(caminho_meta) and os.path.exists(caminho_cache)):
+        return False
+    with open(caminho_meta, encoding='utf-8') as arquivo:
+        meta = json.load(arquivo)
+    if meta.get('formato') != formato or meta.get('versao') != VERSAO_CACHE:
+        return False
+    estado = os.stat(origem)
+    if meta['mtime_ns'] == estado.st_mtime_ns and meta['tamanho'] == estado.st_size:
+        return True
+    # Arquivo tocado mas com o mesmo conteúdo: basta atualizar os metadados
+    if meta['sha256'] == hash_arquivo(origem):
+        meta['mtime_ns'] = estado.st_mtime_ns
+        meta['tamanho'] = estado.st_size
+        with open(caminho_meta, 'w', encoding='utf-8') as arquivo:
+            json.dump(meta, arquivo)
+        return True
+    return False
+
+
+# Materializar o CSV tratado (compactado) no cache colunar, se necessário, e devolver o caminho do cache
+@instrumentar
+def materializar(origem=CAMINHO_TRATADO):
+    formato = formato_cache()
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    nome = os.path.splitext(os.path.basename(origem))[0]
+    caminho_cache = os.path.join(PASTA_CACHE, f"{nome}.{formato}")
+    caminho_meta = os.path.join(PASTA_CACHE, f"{nome}.json")
+
+    if not _cache_valido(origem, caminho_meta, caminho_cache, formato):
+        from carregamento import compactar
+        df = pd.read_csv(origem, sep=";", dtype={coluna: str for coluna in TIPOS_TEXTO})
+        salvar_colunar(compactar(df), caminho_cache, formato)
+        estado = os.stat(origem)
+        with open(caminho_meta, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'origem': os.path.abspath(origem),
+                'mtime_ns': estado.st_mtime_ns,
+                'tamanho': estado.st_size,
+                'sha256': hash_arquivo(origem),
+                'formato': formato,
+                'versao': VERSAO_CACHE
+            }, arquivo)
+    return caminho_cache
+
+
+# Carregar a base tratada (só as colunas pedidas) e remover ausentes nas colunas informadas
+@instrumentar
+def carregar_tratado(colunas=None, remover_ausentes=None, origem=CAMINHO_TRATADO):
+    caminho_cache = materializar(origem)
+    with rastrear('ler_colunar') as etapa:
+        df = ler_colunar(caminho_cache, colunas)
+        etapa.linhas = len(df)
+    if remover_ausentes:
+        with rastrear('dropna', linhas=len(df)):
+            df = df.dropna(subset=remover_ausentes)
+    return df
+
+
+# Atalho para a modelagem: alvo + variáveis numéricas (e categóricas, se pedido), sem ausentes
+def carregar_modelagem(categoricas=False):
+    colunas = [ALVO] + VARIAVEIS_NUMERICAS + (VARIAVEIS_CATEGORICAS if categoricas else [])
+    return carregar_tratado(colunas, remover_ausentes=colunas)
@@ -0,0 +1,344 @@
+# === benchmark.py ===
+# Tempo e memória de cada etapa (conversão das durações, tratamento de ausentes, rankings por
+# órgão/município/grau, target encoding, Random Forest, gradient boosting com histogramas, busca de
+# hiperparâmetros por successive halving e por grade) com a base
+# ampliada de 1x a 1000x. Os resultados vão para JSON e são comparados com uma linha de base salva,
+# desde que gerada com as mesmas opções (fonte, base de origem, árvores, iterações).
+# Sai com código 1 se houver regressão e 2 se a linha de base não for comparável.
+#
+# Exemplos:
+#   python benchmark.py --escalas 1 10 100
+#   python benchmark.py --escalas 1 10 --salvar-base
+#   python benchmark.py --escalas 1 10 --tolerancia 0.3
+#   python benchmark.py --escalas 10 100 --fonte sintetica
+
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from agregacao import agregar
+from base_dados import (ALVO, CAMINHO_ORIGINAL, PASTA_SCRIPTS, VARIAVEIS_CATEGORICAS, VARIAVEIS_NUMERICAS,
+                        hash_arquivo)
+from carregamento import COLUNAS_DURACAO, converter_meses, converter_tipos, tratar_ausentes
+from codificacao import CodificadorAlvo
+from instrumentacao import pico_rss_mb
+
+PASTA_BENCHMARKS = os.path.join(PASTA_SCRIPTS, "..", "benchmarks")
+CAMINHO_BASE = os.path.join(PASTA_BENCHMARKS, "linha_de_base.json")
+
+# Muda quando as etapas ou a forma de medir mudam; linhas de base de outra versão não são comparadas
+VERSAO_MEDIDAS = 2
+
+# Abaixo destes valores a variação é ruído de medição e não entra na comparação com a base
+MINIMOS = {'segundos': 0.05, 'aumento_pico_rss_mb': 1.0}
+
+
+# === DADOS AMPLIADOS ===
+# Reamostra as linhas da base original (ainda como texto) e cria órgãos distintos a cada réplica,
+# para que a cardinalidade de 'Nome orgao' e 'Codigo orgao' cresça com a escala, como na base nacional
+def ampliar(df_bruto, fator, semente=42):
+    gerador = np.random.default_rng(semente)
+    n = len(df_bruto) * fator
+    amostra = df_bruto.iloc[gerador.integers(0, len(df_bruto), n)].reset_index(drop=True)
+    replica = np.repeat(np.arange(fator), len(df_bruto))
+    amostra['Codigo orgao'] = (np.arange(n) + 1).astype(str)
+    if fator > 1:
+        amostra['Nome orgao'] = amostra['Nome orgao'] + ' #' + pd.Series(replica).astype(str)
+    return amostra
+
+
+# === ETAPAS MEDIDAS ===
+# Cada etapa recebe o estado (dicionário) e devolve (número de linhas processadas, novos valores de estado)
+def etapa_duracoes(estado, opcoes):
+    bruto = estado['bruto']
+    for coluna in COLUNAS_DURACAO:
+        converter_meses(bruto[coluna])
+    return len(bruto), {}
+
+
+def etapa_tipos(estado, opcoes):
+    return len(estado['bruto']), {'convertido': converter_tipos(estado['bruto'])}
+
+
+def etapa_ausentes(estado, opcoes):
+    tratado = tratar_ausentes(estado['convertido'])
+    return len(estado['convertido']), {'tratado': tratado}
+
+
+def etapa_rankings(estado, opcoes):
+    df = estado['tratado'].dropna(subset=[ALVO] + VARIAVEIS_CATEGORICAS)
+    agregar(df, VARIAVEIS_CATEGORICAS, ALVO)
+    return len(df), {}
+
+
+def etapa_codificacao(estado, opcoes):
+    df = estado['tratado'].dropna(subset=[ALVO] + VARIAVEIS_NUMERICAS + VARIAVEIS_CATEGORICAS)
+    codificadas = CodificadorAlvo().fit_transform(df[VARIAVEIS_CATEGORICAS], df[ALVO])
+    X = np.column_stack([df[VARIAVEIS_NUMERICAS].to_numpy(np.float64), codificadas.to_numpy(np.float64)])
+    return len(df), {'X': X, 'y': df[ALVO].to_numpy(np.float64)}
+
+
+def etapa_rf_ajuste(estado, opcoes):
+    from sklearn.ensemble import RandomForestRegressor
+    modelo = RandomForestRegressor(n_estimators=opcoes['arvores'], random_state=42, n_jobs=-1)
+    modelo.fit(estado['X'], estado['y'])
+    return len(estado['y']), {'modelo': modelo}
+
+
+def etapa_rf_previsao(estado, opcoes):
+    estado['modelo'].predict(estado['X'])
+    return len(estado['y']), {}
+
+
+# Gradient boosting com as categóricas nativas: os códigos fazem parte do ajuste, como o target
+# encoding faz parte do custo da Random Forest (etapa 'codificacao')
+def etapa_hgb_ajuste(estado, opcoes):
+    from gradiente_histograma import ajustar, montar_matriz
+    df = estado['tratado'].dropna(subset=[ALVO] + VARIAVEIS_NUMERICAS + VARIAVEIS_CATEGORICAS)
+    codificador, modelo = ajustar(df, iteracoes=opcoes['iteracoes'])
+    return len(df), {'modelo_hgb': modelo, 'X_hgb': montar_matriz(df, codificador)}
+
+
+def etapa_hgb_previsao(estado, opcoes):
+    estado['modelo_hgb'].predict(estado['X_hgb'])
+    return len(estado['X_hgb']), {}
+
+
+# Grade reduzida com o mesmo formato da de modelagem_preditiva.py: três níveis de árvores (recurso do
+# successive halving) e quatro candidatos. As duas buscas usam a mesma grade, para comparar o custo do
+# caminho usado por padrão (busca_halving) com o do GridSearchCV completo
+def _grade_busca(opcoes):
+    arvores = opcoes['arvores']
+    return {'n_estimators': [max(1, arvores // 4), max(1, arvores // 2), arvores],
+            'max_depth': [None, 10], 'min_samples_leaf': [1, 4]}
+
+
+def etapa_busca_halving(estado, opcoes):
+    from busca_hiperparametros import busca_halving
+    busca_halving(estado['X'], estado['y'], _grade_busca(opcoes), recurso='n_estimators', fator=3, cv=3,
+                  verbose=False)
+    return len(estado['y']), {}
+
+
+def etapa_busca_grade(estado, opcoes):
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.model_selection import GridSearchCV
+    busca = GridSearchCV(RandomForestRegressor(random_state=42), _grade_busca(opcoes), cv=3,
+                         scoring='neg_mean_absolute_error', n_jobs=-1)
+    busca.fit(estado['X'], estado['y'])
+    return len(estado['y']), {}
+
+
+ETAPAS = [
+    ('duracoes', etapa_duracoes),
+    ('conversao_tipos', etapa_tipos),
+    ('ausentes', etapa_ausentes),
+    ('rankings', etapa_rankings),
+    ('codificacao', etapa_codificacao),
+    ('rf_ajuste', etapa_rf_ajuste),
+    ('rf_previsao', etapa_rf_previsao),
+    ('hgb_ajuste', etapa_hgb_ajuste),
+    ('hgb_previsao', etapa_hgb_previsao),
+    ('busca_halving', etapa_busca_halving),
+    ('busca_grade', etapa_busca_grade),
+]
+
+
+# === MEMÓRIA ===
+# O pico de memória de uma etapa é medido repetindo-a sozinha num processo novo, que recebe o estado:
+# pico de RSS do processo (instrumentacao.pico_rss_mb) ao fim da etapa, menos o RSS com que ela começou.
+# Entram as alocações nativas (numpy, sklearn, Cython), que o tracemalloc não vê, e o pico não fica
+# escondido atrás do de etapas anteriores. O processo vem do forkserver: um filho de spawn herda no
+# ru_maxrss o pico do processo que o criou.
+def _contexto_processos():
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+
+
+# No Linux, recomeça o pico registrado (VmHWM) do RSS atual, descartando o da desserialização do estado;
+# nos demais sistemas o aumento é contado a partir desse pico e pode subestimar etapas pequenas
+def _zerar_pico_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as arquivo:
+            arquivo.write('5')
+    except OSError:
+        pass
+
+
+def _pico_no_processo(funcao, estado, opcoes):
+    gc.collect()
+    _zerar_pico_rss()
+    inicio = pico_rss_mb()
+    funcao(estado, opcoes)
+    pico = pico_rss_mb()
+    if pico is None:
+        return {}
+    return {'pico_rss_mb': pico, 'aumento_pico_rss_mb': pico - inicio}
+
+
+def medir_memoria(funcao, estado, opcoes):
+    with ProcessPoolExecutor(max_workers=1, mp_context=_contexto_processos()) as executor:
+        return executor.submit(_pico_no_processo, funcao, estado, opcoes).result()
+
+
+# Executa uma etapa medindo o tempo; se pedido, repete num processo novo para o pico de memória
+# (em execução separada, para que a medida de memória não distorça o tempo)
+def medir(funcao, estado, opcoes, memoria):
+    inicio_cpu = time.process_time()
+    inicio = time.perf_counter()
+    linhas, novos = funcao(estado, opcoes)
+    resultado = {
+        'segundos': time.perf_counter() - inicio,
+        'cpu_segundos': time.process_time() - inicio_cpu,
+        'linhas': int(linhas),
+    }
+    resultado['linhas_por_segundo'] = linhas / resultado['segundos'] if resultado['segundos'] > 0 else None
+    if memoria:
+        resultado.update(medir_memoria(funcao, estado, opcoes))
+    return resultado, novos
+
+
+def executar(escalas, opcoes, etapas=None, memoria=True, verbose=True):
+    df_bruto = pd.read_csv(opcoes['origem'], sep=";", dtype=str, encoding="utf-8-sig")
+    if opcoes.get('fonte') == 'sintetica':
+        from gerador_sintetico import aprender_perfil, gerar_dataframe
+        perfil = aprender_perfil(opcoes['origem'])
+    resultados = []
+    for fator in escalas:
+        if opcoes.get('fonte') == 'sintetica':
+            estado = {'bruto': gerar_dataframe(perfil, len(df_bruto) * fator)}
+        else:
+            estado = {'bruto': ampliar(df_bruto, fator)}
+        for nome, funcao in ETAPAS:
+            if etapas and nome not in etapas:
+                # Etapas puladas ainda precisam preencher o estado das seguintes
+                if nome in ('conversao_tipos', 'ausentes', 'codificacao', 'rf_ajuste', 'hgb_ajuste'):
+                    _, novos = funcao(estado, opcoes)
+                    estado.update(novos)
+                continue
+            medida, novos = medir(funcao, estado, opcoes, memoria)
+            estado.update(novos)
+            resultados.append({'escala': fator, 'etapa': nome, **medida})
+            if verbose:
+                memoria_txt = (f", pico RSS +{medida['aumento_pico_rss_mb']:.1f} MB"
+                               if 'aumento_pico_rss_mb' in medida else "")
+                print(f"[{fator:>5}x] {nome:<22} {medida['segundos']:8.3f} s ({medida['linhas']} linhas{memoria_txt})")
+    return resultados
+
+
+# === COMPARAÇÃO COM A LINHA DE BASE ===
+# O que muda o que cada etapa mede: com qualquer item diferente, a comparação com a base não faz sentido.
+# A base de origem entra pelo conteúdo (sha256), não pelo caminho
+def configuracao(opcoes):
+    return {
+        'versao': VERSAO_MEDIDAS,
+        'fonte': opcoes.get('fonte', 'ampliada'),
+        'origem_sha256': hash_arquivo(opcoes['origem']),
+        'arvores': opcoes['arvores'],
+        'iteracoes': opcoes['iteracoes'],
+    }
+
+
+# Itens da configuração que diferem entre a base e a execução atual: {item: (base, atual)}
+def diferencas_configuracao(atual, base):
+    anterior = base.get('configuracao', {'versao': 1})
+    return {chave: (anterior.get(chave), atual.get(chave)) for chave in sorted(set(atual) | set(anterior))
+            if anterior.get(chave) != atual.get(chave)}
+
+
+# Regressão: etapa mais lenta (ou com mais memória) que a base além da tolerância relativa
+def comparar_com_base(resultados, base, tolerancia):
+    referencia = {(r['escala'], r['etapa']): r for r in base['resultados']}
+    regressoes = []
+    for r in resultados:
+        anterior = referencia.get((r['escala'], r['etapa']))
+        if anterior is None:
+            continue
+        for metrica in ('segundos', 'aumento_pico_rss_mb'):
+            if metrica in r and metrica in anterior and anterior[metrica] >= MINIMOS[metrica]:
+                razao = r[metrica] / anterior[metrica]
+                if razao > 1 + tolerancia:
+                    regressoes.append({'escala': r['escala'], 'etapa': r['etapa'], 'metrica': metrica,
+                                       'base': anterior[metrica], 'atual': r[metrica], 'razao': razao})
+    return regressoes
+
+
+def _ambiente():
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark das etapas com a base ampliada")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--etapas", nargs="+", default=None, choices=[nome for nome, _ in ETAPAS])
+    parser.add_argument("--origem", default=CAMINHO_ORIGINAL, help="base usada como semente")
+    parser.add_argument("--fonte", default="ampliada", choices=["ampliada", "sintetica"],
+                        help="reamostrar a base original ou gerar linhas novas com gerador_sintetico.py")
+    parser.add_argument("--arvores", type=int, default=100, help="árvores da Random Forest")
+    parser.add_argument("--iteracoes", type=int, default=300, help="máximo de iterações do gradient boosting")
+    parser.add_argument("--sem-memoria", action="store_true", help="não medir o pico de memória (RSS)")
+    parser.add_argument("--salvar-base", action="store_true", help="gravar os resultados como linha de base")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="piora relativa aceita antes de acusar regressão")
+    args = parser.parse_args()
+
+    opcoes = {'origem': args.origem, 'fonte': args.fonte, 'arvores': args.arvores, 'iteracoes': args.iteracoes}
+    resultados = executar(args.escalas, opcoes, args.etapas, memoria=not args.sem_memoria)
+    relatorio = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': _ambiente(),
+        'opcoes': opcoes,
+        'configuracao': configuracao(opcoes),
+        'resultados': resultados,
+    }
+
+    os.makedirs(PASTA_BENCHMARKS, exist_ok=True)
+    caminho = os.path.join(PASTA_BENCHMARKS, f"resultados_{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, ensure_ascii=False, indent=1)
+    print(f"\nResultados salvos em {caminho}")
+
+    if args.salvar_base:
+        with open(CAMINHO_BASE, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=1)
+        print(f"Linha de base atualizada: {CAMINHO_BASE}")
+    elif os.path.exists(CAMINHO_BASE):
+        with open(CAMINHO_BASE, encoding='utf-8') as arquivo:
+            base = json.load(arquivo)
+        diferencas = diferencas_configuracao(relatorio['configuracao'], base)
+        if diferencas:
+            print("\nLinha de base gerada com outras opções; comparação recusada "
+                  "(grave outra com --salvar-base):")
+            for chave, (anterior, atual) in diferencas.items():
+                print(f"  {chave}: base {anterior}, atual {atual}")
+            raise SystemExit(2)
+        ambiente = {chave: (base.get('ambiente', {}).get(chave), valor)
+                    for chave, valor in relatorio['ambiente'].items() if base.get('ambiente', {}).get(chave) != valor}
+        if ambiente:
+            print("\nAtenção: ambiente diferente do da linha de base ("
+                  + ", ".join(f"{chave} {anterior} -> {atual}" for chave, (anterior, atual) in ambiente.items())
+                  + "); diferenças podem não ser regressões.")
+        regressoes = comparar_com_base(resultados, base, args.tolerancia)
+        if regressoes:
+            print(f"\n{len(regressoes)} regressão(ões) em relação à linha de base:")
+            for r in regressoes:
+                print(f"  [{r['escala']}x] {r['etapa']} ({r['metrica']}): "
+                      f"{r['base']:.3f} -> {r['atual']:.3f} ({r['razao']:.2f}x)")
+            raise SystemExit(1)
+        print("\nSem regressões em relação à linha de base.")
@@ -0,0 +1,106 @@
+# === busca_hiperparametros.py ===
+# Busca de hiperparâmetros da Random Forest por "successive halving" com reaproveitamento de árvores:
+# todos os candidatos começam com poucas árvores, só o melhor terço de cada rodada segue adiante,
+# e as árvores já crescidas são mantidas (warm_start) quando o n_estimators aumenta.
+
+import math
+import time
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_absolute_error
+from sklearn.model_selection import KFold
+
+from instrumentacao import instrumentar
+
+
+# Combinações da grade, sem o parâmetro usado como recurso (n_estimators)
+def _candidatos(grade, recurso):
+    nomes = [nome for nome in grade if nome != recurso]
+    return [dict(zip(nomes, valores)) for valores in product(*(grade[nome] for nome in nomes))]
+
+
+# Custo da busca exaustiva equivalente (GridSearchCV), em ajustes de floresta e em árvores
+def custo_grade_completa(grade, cv, recurso='n_estimators'):
+    n_candidatos = len(_candidatos(grade, recurso))
+    ajustes = n_candidatos * len(grade[recurso]) * cv
+    arvores = n_candidatos * sum(grade[recurso]) * cv
+    return ajustes, arvores
+
+
+@instrumentar
+def busca_halving(X, y, grade, recurso='n_estimators', fator=3, cv=5, random_state=42, n_jobs=-1, verbose=True):
+    inicio = time.perf_counter()
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    niveis = sorted(grade[recurso])
+    candidatos = _candidatos(grade, recurso)
+    dobras = list(KFold(n_splits=cv).split(X))
+
+    # Uma floresta por (candidato, dobra), mantida entre as rodadas para crescer por warm_start
+    florestas = {}
+    vivos = list(range(len(candidatos)))
+    historico = []
+    arvores_ajustadas = ajustes = 0
+
+    for rodada, n_arvores in enumerate(niveis):
+        notas = {}
+        for c in vivos:
+            erros = []
+            for d, (treino, validacao) in enumerate(dobras):
+                modelo = florestas.get((c, d))
+                if modelo is None:
+                    modelo = RandomForestRegressor(random_state=random_state, warm_start=True, n_jobs=n_jobs,
+                                                   **candidatos[c])
+                    florestas[(c, d)] = modelo
+                novas = n_arvores - len(getattr(modelo, 'estimators_', []))
+                modelo.set_params(n_estimators=n_arvores)
+                modelo.fit(X[treino], y[treino])
+                arvores_ajustadas += novas
+                ajustes += 1
+                erros.append(mean_absolute_error(y[validacao], modelo.predict(X[validacao])))
+            notas[c] = -float(np.mean(erros))
+            historico.append({'rodada': rodada, recurso: n_arvores, **candidatos[c],
+                              'mean_test_score': notas[c], 'std_test_score': float(np.std(erros))})
+
+        if verbose:
+            print(f"Rodada {rodada}: {len(vivos)} candidatos com {n_arvores} árvores")
+
+        # Na última rodada não há mais corte; nas demais, segue o melhor 1/fator
+        if rodada < len(niveis) - 1:
+            manter = max(1, math.ceil(len(vivos) / fator))
+            vivos = sorted(vivos, key=lambda c: notas[c], reverse=True)[:manter]
+            for c in list(florestas):
+                if c[0] not in vivos:
+                    del florestas[c]
+
+    melhor = max(vivos, key=lambda c: notas[c])
+    melhores_parametros = {**candidatos[melhor], recurso: niveis[-1]}
+
+    # Reajuste do melhor candidato com todo o conjunto de treino (como o refit do GridSearchCV)
+    melhor_modelo = RandomForestRegressor(random_state=random_state, n_jobs=n_jobs, **melhores_parametros)
+    melhor_modelo.fit(X, y)
+
+    ajustes_grade, arvores_grade = custo_grade_completa(grade, cv, recurso)
+    return {
+        'melhor_modelo': melhor_modelo,
+        'melhores_parametros': melhores_parametros,
+        'melhor_nota': notas[melhor],
+        'resultados': pd.DataFrame(historico),
+        'segundos': time.perf_counter() - inicio,
+        'ajustes': ajustes,
+        'arvores_ajustadas': arvores_ajustadas,
+        'ajustes_grade_completa': ajustes_grade,
+        'arvores_grade_completa': arvores_grade,
+    }
+
+
+# Resumo do custo da busca comparado à grade exaustiva
+def imprimir_resumo(resultado):
+    economia = 1 - resultado['arvores_ajustadas'] / resultado['arvores_grade_completa']
+    print(f"\nBusca por successive halving concluída em {resultado['segundos']:.1f} s")
+    print(f"Ajustes de floresta: {resultado['ajustes']} (grade completa: {resultado['ajustes_grade_completa']})")
+    print(f"Árvores ajustadas: {resultado['arvores_ajustadas']} "
+          f"(grade completa: {resultado['arvores_grade_completa']}, economia de {economia:.0%})")
@@ -0,0 +1,187 @@
+# === carregamento.py ===
+# Leitura e conversão tipada da base do DataJud, compartilhada pelos scripts
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import instrumentar
+
+# === COLUNAS DA BASE ORIGINAL ===
+# Contagens no formato brasileiro, com ponto como separador de milhar ("4.700")
+COLUNAS_CONTAGEM = [
+    'CP_Dec_2023', 'CP_Dec_2024', 'Sus_Dec_2023', 'Sus_Dec_2024',
+    'CN_12_meses', 'Tbaix_12_meses', 'Desp_12_meses', 'DecInc_12_meses',
+    'SentCM_12_meses', 'SentSM_12_meses', 'ProcSM100_Dec_2024', 'Conc100_Dec_2024'
+]
+
+# Percentuais com vírgula decimal ("-4,3%", "1.100%")
+COLUNAS_PERCENTUAL = ['%CP', '%Sus', 'TC_Dec_2024', 'IAD_12_meses']
+
+# Durações por extenso ("8 anos e 5 meses")
+COLUNAS_DURACAO = ['TPSent_12_meses', 'TPCPL_Dec_2024']
+
+COLUNAS_TEXTO = ['Tribunal', 'Municipio', 'UF', 'Nome orgao', 'Grau']
+
+
+# Converter durações por extenso em meses, de forma vetorizada
+@instrumentar
+def converter_meses(serie):
+    texto = serie.astype('string').str.lower()
+    anos = texto.str.extract(r"(\d+)\s*ano", expand=False).astype('float64').fillna(0)
+    meses = texto.str.extract(r"(\d+)\s*mes", expand=False).astype('float64').fillna(0)
+    resultado = anos * 12 + meses
+    # Valores ausentes continuam ausentes
+    return resultado.where(serie.notna())
+
+
+# Converter números no formato brasileiro ("4.700", "0,5") em float
+def converter_numero(serie):
+    texto = serie.astype('string').str.strip()
+    texto = texto.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    return pd.to_numeric(texto, errors='coerce').astype('float64')
+
+
+# Converter percentuais ("-4,3%", "108%") em float, na escala de 0 a 100
+def converter_percentual(serie):
+    return converter_numero(serie.astype('string').str.replace('%', '', regex=False))
+
+
+# Ler a base original com todas as colunas como texto e converter em uma única passada
+@instrumentar
+def ler_base_original(caminho, **kwargs):
+    df = pd.read_csv(caminho, sep=";", dtype=str, encoding="utf-8-sig", **kwargs)
+    return converter_tipos(df)
+
+
+# Aplicar as conversões de tipo sobre um DataFrame lido como texto
+@instrumentar
+def converter_tipos(df):
+    df = df.copy()
+    df['Codigo orgao'] = pd.to_numeric(df['Codigo orgao'], errors='coerce').astype('Int64')
+    for coluna in COLUNAS_CONTAGEM:
+        df[coluna] = converter_numero(df[coluna])
+    # Percentuais mantêm o texto original e ganham uma coluna numérica "_num"
+    for coluna in COLUNAS_PERCENTUAL:
+        df[coluna + '_num'] = converter_percentual(df[coluna])
+    for coluna in COLUNAS_DURACAO:
+        df[coluna + '_num'] = converter_meses(df[coluna])
+    return df
+
+
+# === TRATAMENTO DE VALORES AUSENTES ===
+# Regras aplicadas linha a linha, portanto válidas tanto na base inteira quanto em blocos
+@instrumentar
+def tratar_ausentes(df):
+    # 1. Remover linhas com valores ausentes nas variáveis numéricas essenciais para a modelagem
+    df = df.dropna(subset=['TPSent_12_meses_num', 'TPCPL_Dec_2024_num'])
+
+    # 2. Remover também linhas com IAD_12_meses ausente (fator relevante de atraso)
+    df = df.dropna(subset=['IAD_12_meses']).copy()
+
+    # 3. Preencher colunas textuais com valor padrão
+    df[['Municipio', 'UF']] = df[['Municipio', 'UF']].fillna('Não informado')
+
+    # 4. Substituir valores ausentes em colunas de percentual por "0%" (evita erro na análise)
+    df[['%CP', '%Sus']] = df[['%CP', '%Sus']].fillna('0%')
+    df[['%CP_num', '%Sus_num']] = df[['%CP_num', '%Sus_num']].fillna(0)
+
+    # 5. Substituir campos de texto 'TC_Dec_2024' e 'TPCPL_Dec_2024' ausentes por 'Não informado'
+    df[['TC_Dec_2024', 'TPCPL_Dec_2024']] = df[['TC_Dec_2024', 'TPCPL_Dec_2024']].fillna('Não informado')
+    return df
+
+
+# === TRATAMENTO EM BLOCOS (STREAMING) ===
+# Lê a base original em blocos de tamanho fixo, trata cada bloco e acrescenta ao arquivo de saída.
+# O pico de memória depende do tamanho do bloco, não do tamanho da entrada.
+@instrumentar
+def tratar_em_blocos(origem, destino, linhas_por_bloco=100_000):
+    inicio = time.perf_counter()
+    linhas_lidas = linhas_gravadas = 0
+    ausentes = None
+
+    leitor = pd.read_csv(origem, sep=";", dtype=str, encoding="utf-8-sig", chunksize=linhas_por_bloco)
+    for i, bloco in enumerate(leitor):
+        linhas_lidas += len(bloco)
+        bloco = tratar_ausentes(converter_tipos(bloco))
+        linhas_gravadas += len(bloco)
+
+        contagem = bloco.isnull().sum()
+        ausentes = contagem if ausentes is None else ausentes + contagem
+
+        bloco.to_csv(destino, sep=";", index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+
+    duracao = time.perf_counter() - inicio
+    return {
+        'linhas_lidas': linhas_lidas,
+        'linhas_gravadas': linhas_gravadas,
+        'segundos': duracao,
+        'linhas_por_segundo': linhas_lidas / duracao if duracao > 0 else float('inf'),
+        'ausentes': ausentes
+    }
+
+
+# === REPRESENTAÇÃO COMPACTA EM MEMÓRIA ===
+# Outras colunas de texto viram categoria quando têm poucos valores distintos em relação às linhas
+PROPORCAO_CATEGORIA = 0.5
+
+
+# Menor tipo que representa a coluna sem perda: inteiros vão para o menor inteiro com sinal (sem sinal,
+# uma diferença entre contagens daria a volta). Reais só vão para float32 se pedido e se a ida e volta
+# for exata: o valor guardado é o mesmo, mas médias e somas passariam a acumular em precisão simples.
+# Reais com valores inteiros continuam reais, para não mudar o tipo que o resto do código espera.
+def _reduzir_numerica(serie, reais=False):
+    if pd.api.types.is_integer_dtype(serie):
+        return serie if serie.hasnans else pd.to_numeric(serie.astype(np.int64), downcast='integer')
+    if not reais:
+        return serie
+    valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+    if np.array_equal(valores.astype(np.float32).astype(np.float64), valores, equal_nan=True):
+        return serie.astype('float32')
+    return serie
+
+
+# Contagens chegam como reais (converter_numero). Se todos os valores forem inteiros, vão para o menor
+# inteiro com sinal, ou para o inteiro anulável de mesmo tamanho (Int16, Int32, ...) quando há ausentes.
+def _reduzir_contagem(serie):
+    valores = serie.to_numpy(dtype='float64', na_value=np.nan)
+    presentes = valores[~np.isnan(valores)]
+    if not (np.isfinite(presentes).all() and np.array_equal(presentes, np.round(presentes))):
+        return serie
+    tipo = pd.to_numeric(presentes.astype(np.int64), downcast='integer').dtype if len(presentes) else np.int8
+    if len(presentes) == len(valores):
+        return pd.Series(valores.astype(tipo), index=serie.index, name=serie.name)
+    return serie.astype(f"Int{np.dtype(tipo).itemsize * 8}")
+
+
+# Dimensões de texto como categoria (códigos inteiros + dicionário) e números no menor tipo seguro
+@instrumentar
+def compactar(df, reais=False):
+    df = df.copy()
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            continue
+        if coluna in COLUNAS_CONTAGEM and pd.api.types.is_float_dtype(serie):
+            df[coluna] = _reduzir_contagem(serie)
+        elif pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+            df[coluna] = _reduzir_numerica(serie, reais)
+        elif coluna in COLUNAS_TEXTO or serie.nunique(dropna=True) <= PROPORCAO_CATEGORIA * len(serie):
+            df[coluna] = serie.astype('category')
+    return df
+
+
+# Memória (com o conteúdo dos textos) e tipo de cada coluna antes e depois da compactação
+def relatorio_memoria(antes, depois):
+    mb_antes = antes.memory_usage(deep=True, index=False) / 2 ** 20
+    mb_depois = depois.memory_usage(deep=True, index=False) / 2 ** 20
+    relatorio = pd.DataFrame({
+        'tipo_antes': antes.dtypes.astype(str),
+        'tipo_depois': depois.dtypes.astype(str),
+        'mb_antes': mb_antes,
+        'mb_depois': mb_depois,
+    })
+    relatorio.loc['TOTAL'] = ['', '', mb_antes.sum(), mb_depois.sum()]
+    relatorio['reducao'] = relatorio['mb_antes'] / relatorio['mb_depois']
+    return relatorio
@@ -0,0 +1,248 @@
+# === cli.py ===
+# Ponto de entrada único para as etapas do projeto. Cada subcomando importa só o que usa:
+# limpar, agregar e memoria carregam apenas pandas/numpy; sklearn, joblib e matplotlib ficam para
+# treinar, prever e graficos.
+#
+# Exemplos:
+#   python cli.py limpar
+#   python cli.py limpar --incremental
+#   python cli.py agregar --minimo 5
+#   python cli.py memoria
+#   python cli.py treinar --arvores 200
+#   python cli.py treinar --modelo hgb
+#   python cli.py prever ../dados/tjsp_processos_tratado.csv previsoes.csv
+#   python cli.py graficos --processos 4
+#   python cli.py --perfil-importacoes agregar
+#   python cli.py --rastreio treinar --modelo hgb
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+# === SUBCOMANDOS ===
+def cmd_limpar(args):
+    from carregamento import ler_base_original, tratar_ausentes, tratar_em_blocos
+
+    if args.incremental:
+        from incremental import atualizar
+
+        resumo = atualizar(args.origem, args.destino)
+        print(f"{resumo['linhas_tratadas']} linhas tratadas ({resumo['inseridos']} inseridas, "
+              f"{resumo['alterados']} alteradas, {resumo['removidos']} removidas) em {resumo['segundos']:.2f} s "
+              f"-> {args.destino}")
+    elif args.blocos:
+        resumo = tratar_em_blocos(args.origem, args.destino, args.blocos)
+        print(f"{resumo['linhas_gravadas']} linhas tratadas em {resumo['segundos']:.2f} s "
+              f"({resumo['linhas_por_segundo']:,.0f} linhas/s) -> {args.destino}")
+    else:
+        df = tratar_ausentes(ler_base_original(args.origem))
+        df.to_csv(args.destino, sep=";", index=False)
+        print(f"{len(df)} linhas tratadas -> {args.destino}")
+
+
+def cmd_agregar(args):
+    from agregacao import agregar, filtrar_minimo, ranking
+    from base_dados import ALVO, carregar_tratado
+
+    if args.incrementais:
+        from incremental import carregar_agregados
+        resumos = carregar_agregados()
+    else:
+        colunas = [ALVO] + args.chaves
+        df = carregar_tratado(colunas, remover_ausentes=colunas)
+        resumos = agregar(df, args.chaves, ALVO)
+    for chave in args.chaves:
+        resumo = filtrar_minimo(resumos[chave], args.minimo) if args.minimo else resumos[chave]
+        filtro = f" (≥ {args.minimo} processos)" if args.minimo else ""
+        print(f"\nTempo médio por {chave}{filtro}:")
+        print(ranking(resumo, 'media').head(args.n))
+        print(f"\nVolume de processos por {chave}{filtro}:")
+        print(ranking(resumo, 'linhas').head(args.n))
+
+
+def cmd_memoria(args):
+    import pandas as pd
+
+    from base_dados import TIPOS_TEXTO
+    from carregamento import compactar, relatorio_memoria
+
+    df = pd.read_csv(args.origem, sep=";", dtype={coluna: str for coluna in TIPOS_TEXTO})
+    relatorio = relatorio_memoria(df, compactar(df, reais=args.reais))
+    pd.set_option('display.width', 200)
+    print(relatorio.round(3).to_string())
+
+
+def cmd_treinar(args):
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+    from sklearn.model_selection import train_test_split
+
+    from artefato_modelo import NOME_MODELO, salvar_artefato
+    from base_dados import ALVO, VARIAVEIS_CATEGORICAS, VARIAVEIS_NUMERICAS, carregar_modelagem
+    from instrumentacao import rastrear
+
+    df = carregar_modelagem(categoricas=True)
+    treino, teste = train_test_split(df, test_size=args.teste, random_state=args.semente)
+
+    inicio = time.perf_counter()
+    if args.modelo == 'hgb':
+        import gradiente_histograma
+
+        nome = gradiente_histograma.NOME_MODELO
+        encoder, modelo = gradiente_histograma.ajustar(treino, args.semente, iteracoes=args.iteracoes,
+                                                       taxa=args.taxa)
+        previsto = modelo.predict(gradiente_histograma.montar_matriz(teste, encoder))
+        detalhe = f"{modelo.n_iter_} iterações (parada antecipada)"
+    else:
+        from sklearn.ensemble import RandomForestRegressor
+
+        from codificacao import CodificadorAlvo
+
+        nome = NOME_MODELO
+        encoder = CodificadorAlvo()
+        if args.fora_da_dobra:
+            cat_treino = encoder.fit_transform_oof(treino[VARIAVEIS_CATEGORICAS], treino[ALVO])
+        else:
+            cat_treino = encoder.fit_transform(treino[VARIAVEIS_CATEGORICAS], treino[ALVO])
+        X_treino = treino[VARIAVEIS_NUMERICAS].join(cat_treino)
+        X_teste = teste[VARIAVEIS_NUMERICAS].join(encoder.transform(teste[VARIAVEIS_CATEGORICAS]))
+
+        modelo = RandomForestRegressor(n_estimators=args.arvores, random_state=args.semente, n_jobs=-1)
+        with rastrear('RandomForestRegressor.fit', linhas=len(X_treino)):
+            modelo.fit(X_treino, treino[ALVO])
+        with rastrear('RandomForestRegressor.predict', linhas=len(X_teste)):
+            previsto = modelo.predict(X_teste)
+        detalhe = f"{args.arvores} árvores"
+    print(f"Ajuste em {time.perf_counter() - inicio:.2f} s ({detalhe})")
+    metricas = {
+        'MAE': mean_absolute_error(teste[ALVO], previsto),
+        'RMSE': mean_squared_error(teste[ALVO], previsto) ** 0.5,
+        'R2': r2_score(teste[ALVO], previsto),
+    }
+    print(f"MAE: {metricas['MAE']:.2f}  RMSE: {metricas['RMSE']:.2f}  R²: {metricas['R2']:.2f}")
+    if not args.sem_artefato:
+        pasta = salvar_artefato(encoder, modelo, VARIAVEIS_NUMERICAS, VARIAVEIS_CATEGORICAS, metricas=metricas,
+                                nome=nome)
+        print(f"Artefato salvo em: {pasta}")
+
+
+def cmd_prever(args):
+    from artefato_modelo import NOME_MODELO, carregar_artefato
+    from pontuar import pontuar_csv
+
+    if args.modelo == 'hgb':
+        from gradiente_histograma import NOME_MODELO
+    artefato = carregar_artefato(args.versao, NOME_MODELO)
+    total, segundos = pontuar_csv(artefato, args.entrada, args.saida, args.blocos)
+    print(f"{total} órgãos pontuados com o modelo v{artefato['metadados']['versao']:03d} "
+          f"em {segundos:.2f} s -> {args.saida}")
+
+
+def cmd_graficos(args):
+    from base_dados import carregar_tratado
+    from graficos import renderizar
+    from renderizar_graficos import especs_exploratoria, especs_fatores
+
+    df = carregar_tratado()
+    resultado = renderizar(especs_exploratoria(df) + especs_fatores(df), processos=args.processos,
+                           forcar=args.forcar)
+    print(f"{len(resultado['desenhados'])} gráficos desenhados, {resultado['pulados']} sem mudanças.")
+
+
+# === PERFIL DE IMPORTAÇÕES ===
+# Reexecuta o mesmo comando com "python -X importtime" e soma o tempo próprio de cada pacote raiz
+def perfil_importacoes(argumentos, n=15):
+    inicio = time.perf_counter()
+    processo = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(__file__)] + argumentos,
+                              stderr=subprocess.PIPE, text=True)
+    total = time.perf_counter() - inicio
+
+    por_pacote = {}
+    for linha in processo.stderr.splitlines():
+        achado = re.match(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\S+)', linha)
+        if achado:
+            pacote = achado.group(3).split('.')[0]
+            por_pacote[pacote] = por_pacote.get(pacote, 0) + int(achado.group(1))
+        elif not linha.startswith('import time:'):
+            print(linha, file=sys.stderr)
+
+    importacao = sum(por_pacote.values()) / 1e6
+    print(f"\n=== Importações: {importacao:.3f} s de {total:.3f} s de execução ===")
+    for pacote, micros in sorted(por_pacote.items(), key=lambda item: -item[1])[:n]:
+        print(f"  {pacote:<28} {micros / 1e6:8.3f} s")
+    return processo.returncode
+
+
+def criar_parser():
+    from base_dados import CAMINHO_ORIGINAL, CAMINHO_TRATADO
+
+    parser = argparse.ArgumentParser(description="Tempo de tramitação no TJSP: tratamento, agregação e modelos")
+    parser.add_argument("--perfil-importacoes", "--import-profile", action="store_true",
+                        help="mostrar o tempo de importação de cada pacote ao final")
+    parser.add_argument("--rastreio", "--trace", action="store_true",
+                        help="gravar o tempo e a memória de cada etapa (JSON do Chrome/Perfetto) em ../rastreios "
+                             "ou onde indicar TJSP_RASTREIO; ver instrumentacao.py")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("limpar", aliases=["clean"], help="tratar a base original")
+    p.add_argument("--origem", default=CAMINHO_ORIGINAL)
+    p.add_argument("--destino", default=CAMINHO_TRATADO)
+    p.add_argument("--blocos", type=int, default=None, help="processar em blocos com este número de linhas")
+    p.add_argument("--incremental", action="store_true", help="tratar só os órgãos inseridos ou alterados")
+    p.set_defaults(funcao=cmd_limpar)
+
+    p = sub.add_parser("agregar", aliases=["aggregate"], help="tabelas de fatores de atraso")
+    p.add_argument("--chaves", nargs="+", default=['Nome orgao', 'Municipio', 'Grau'])
+    p.add_argument("--minimo", type=int, default=0, help="mínimo de processos por grupo")
+    p.add_argument("-n", type=int, default=10, help="linhas de cada ranking")
+    p.add_argument("--incrementais", action="store_true",
+                   help="usar os agregados mantidos pelo tratamento incremental (sem quantis)")
+    p.set_defaults(funcao=cmd_agregar)
+
+    p = sub.add_parser("memoria", aliases=["memory"], help="memória da base tratada antes e depois da compactação")
+    p.add_argument("--origem", default=CAMINHO_TRATADO)
+    p.add_argument("--reais", action="store_true", help="reduzir também os reais a float32 quando exato")
+    p.set_defaults(funcao=cmd_memoria)
+
+    p = sub.add_parser("treinar", aliases=["train"], help="treinar o modelo final e salvar o artefato")
+    p.add_argument("--modelo", choices=["rf", "hgb"], default="rf",
+                   help="Random Forest com target encoding ou gradient boosting com histogramas e categóricas nativas")
+    p.add_argument("--arvores", type=int, default=100)
+    p.add_argument("--iteracoes", type=int, default=300, help="máximo de iterações do boosting (hgb)")
+    p.add_argument("--taxa", type=float, default=0.1, help="taxa de aprendizado do boosting (hgb)")
+    p.add_argument("--teste", type=float, default=0.2)
+    p.add_argument("--semente", type=int, default=42)
+    p.add_argument("--fora-da-dobra", action="store_true", help="codificação out-of-fold no treino")
+    p.add_argument("--sem-artefato", action="store_true", help="não salvar o modelo")
+    p.set_defaults(funcao=cmd_treinar)
+
+    p = sub.add_parser("prever", aliases=["predict"], help="pontuar um CSV com o artefato salvo")
+    p.add_argument("entrada")
+    p.add_argument("saida")
+    p.add_argument("--versao", type=int, default=None)
+    p.add_argument("--modelo", choices=["rf", "hgb"], default="rf", help="artefato a usar")
+    p.add_argument("--blocos", type=int, default=100_000)
+    p.set_defaults(funcao=cmd_prever)
+
+    p = sub.add_parser("graficos", aliases=["plot"], help="renderizar os gráficos em lote")
+    p.add_argument("--processos", type=int, default=None)
+    p.add_argument("--forcar", action="store_true")
+    p.set_defaults(funcao=cmd_graficos)
+    return parser
+
+
+if __name__ == "__main__":
+    argumentos = sys.argv[1:]
+    if any(a in ("--perfil-importacoes", "--import-profile") for a in argumentos):
+        raise SystemExit(perfil_importacoes([a for a in argumentos
+                                             if a not in ("--perfil-importacoes", "--import-profile")]))
+    args = criar_parser().parse_args(argumentos)
+    if args.rastreio:
+        import instrumentacao
+        instrumentacao.ativar(os.environ.get(instrumentacao.VARIAVEL_AMBIENTE) or '1')
+    args.funcao(args)
+    if args.rastreio:
+        print(f"Rastreio gravado em: {instrumentacao.salvar()}")
@@ -0,0 +1,132 @@
+# === codificacao.py ===
+# Target encoding nativo, sem a dependência do category_encoders.
+# As categorias são fatoradas uma única vez e as estatísticas por categoria saem de np.bincount;
+# a suavização é a mesma do TargetEncoder do category_encoders (sigmoide com min_samples_leaf e smoothing).
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold
+
+from instrumentacao import instrumentar
+
+
+def _sigmoide(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class CodificadorAlvo:
+    def __init__(self, cols=None, min_samples_leaf=20, smoothing=10, n_dobras=5, random_state=42):
+        self.cols = cols
+        self.min_samples_leaf = min_samples_leaf
+        self.smoothing = smoothing
+        self.n_dobras = n_dobras
+        self.random_state = random_state
+
+    # Aceita DataFrame ou Series (como o TargetEncoder) e devolve sempre DataFrame
+    @staticmethod
+    def _como_dataframe(X):
+        return X.to_frame() if isinstance(X, pd.Series) else X
+
+    def _colunas(self, X):
+        return list(self.cols) if self.cols is not None else list(X.columns)
+
+    # Valor codificado de cada categoria: média da categoria puxada para a média geral (prior)
+    def _suavizar(self, contagem, soma, prior):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = soma / contagem
+        peso = _sigmoide((contagem - self.min_samples_leaf) / self.smoothing)
+        valores = prior * (1 - peso) + np.nan_to_num(media) * peso
+        return np.where(contagem > 0, valores, prior)
+
+    # === AJUSTE ===
+    # Para cada coluna guardamos só dois arrays compactos: as categorias e o valor codificado de cada uma
+    @instrumentar
+    def fit(self, X, y):
+        X = self._como_dataframe(X)
+        y = np.asarray(y, dtype=np.float64)
+        self.prior_ = float(y.mean())
+        self.categorias_, self.valores_ = {}, {}
+        for coluna in self._colunas(X):
+            codigos, categorias = pd.factorize(X[coluna])
+            validos = codigos >= 0
+            contagem = np.bincount(codigos[validos], minlength=len(categorias))
+            soma = np.bincount(codigos[validos], weights=y[validos], minlength=len(categorias))
+            self.categorias_[coluna] = pd.Index(categorias)
+            self.valores_[coluna] = self._suavizar(contagem, soma, self.prior_)
+        return self
+
+    # === TRANSFORMAÇÃO ===
+    # Categorias desconhecidas ou ausentes recebem a média geral, como no category_encoders
+    @instrumentar
+    def transform(self, X):
+        X = self._como_dataframe(X)
+        saida = X.copy()
+        for coluna in self.categorias_:
+            codigos = self.categorias_[coluna].get_indexer(X[coluna])
+            valores = self.valores_[coluna]
+            saida[coluna] = np.where(codigos >= 0, valores[np.maximum(codigos, 0)], self.prior_)
+        return saida
+
+    def fit_transform(self, X, y):
+        return self.fit(X, y).transform(X)
+
+    # === CODIFICAÇÃO FORA DA DOBRA (OUT-OF-FOLD) ===
+    # Cada linha do treino é codificada com estatísticas das outras dobras, o que evita que o modelo
+    # "veja" o próprio alvo na variável codificada. Ao final o codificador fica ajustado no treino todo,
+    # para transformar o teste normalmente.
+    @instrumentar
+    def fit_transform_oof(self, X, y):
+        X = self._como_dataframe(X)
+        y = np.asarray(y, dtype=np.float64)
+        self.fit(X, y)
+
+        dobras = list(KFold(n_splits=self.n_dobras, shuffle=True, random_state=self.random_state).split(y))
+        saida = X.copy()
+        for coluna in self._colunas(X):
+            # Códigos sobre as categorias já fatoradas no ajuste: todas as linhas do treino são conhecidas
+            codigos = self.categorias_[coluna].get_indexer(X[coluna])
+            validos = codigos >= 0
+            k = len(self.categorias_[coluna])
+            contagem_total = np.bincount(codigos[validos], minlength=k)
+            soma_total = np.bincount(codigos[validos], weights=y[validos], minlength=k)
+
+            codificada = np.full(len(y), np.nan)
+            for _, fora in dobras:
+                dentro = np.ones(len(y), dtype=bool)
+                dentro[fora] = False
+                # Estatísticas das demais dobras = total menos a dobra atual
+                fora_validos = fora[validos[fora]]
+                contagem = contagem_total - np.bincount(codigos[fora_validos], minlength=k)
+                soma = soma_total - np.bincount(codigos[fora_validos], weights=y[fora_validos], minlength=k)
+                prior = float(y[dentro].mean())
+                valores = self._suavizar(contagem, soma, prior)
+                codigos_fora = codigos[fora]
+                codificada[fora] = np.where(codigos_fora >= 0, valores[np.maximum(codigos_fora, 0)], prior)
+            saida[coluna] = codificada
+        return saida
+
+
+# === CÓDIGOS CATEGÓRICOS NATIVOS ===
+# Para modelos que tratam categorias diretamente (HistGradientBoostingRegressor): cada categoria vira
+# um código inteiro, em ordem de frequência no treino. Acima de 'max_categorias' as menos frequentes
+# dividem um único código ("outros"), para caber nas faixas (max_bins) do modelo. Categorias não vistas
+# no ajuste ficam ausentes (NaN), que o modelo trata como categoria faltante. Guarda as mesmas tabelas
+# do CodificadorAlvo (categorias_, valores_, prior_), então a transformação e o artefato são os mesmos.
+class CodificadorCategorias(CodificadorAlvo):
+    def __init__(self, cols=None, max_categorias=254):
+        super().__init__(cols)
+        self.max_categorias = max_categorias
+
+    @instrumentar
+    def fit(self, X, y=None):
+        X = self._como_dataframe(X)
+        self.prior_ = np.nan
+        self.categorias_, self.valores_ = {}, {}
+        for coluna in self._colunas(X):
+            codigos, categorias = pd.factorize(X[coluna])
+            contagem = np.bincount(codigos[codigos >= 0], minlength=len(categorias))
+            # Mais frequentes primeiro; empates na ordem em que aparecem
+            ordem = np.argsort(-contagem, kind='stable')
+            self.categorias_[coluna] = pd.Index(categorias[ordem])
+            self.valores_[coluna] = np.minimum(np.arange(len(ordem)), self.max_categorias).astype(np.float64)
+        return self
@@ -0,0 +1,172 @@
+# === comparacao_modelos.py ===
+# Comparação dos modelos de modelagem_preditiva.py (Regressão Linear, Árvore de Decisão, Random Forest)
+# em muitas divisões treino/teste aleatórias, ajustadas em paralelo num pool de processos.
+# A matriz de atributos é gravada uma única vez em .npy e cada processo a abre com memory map,
+# em vez de recebê-la serializada a cada tarefa. As métricas saem com intervalos de confiança.
+#
+# Exemplos:
+#   python comparacao_modelos.py --repeticoes 30
+#   python comparacao_modelos.py --repeticoes 100 --processos 8 --modelos "Random Forest" "Regressão Linear"
+
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from base_dados import ALVO, VARIAVEIS_NUMERICAS, carregar_modelagem
+
+METRICAS = ['MAE', 'RMSE', 'R2']
+NOMES_MODELOS = ['Regressão Linear', 'Árvore de Decisão', 'Random Forest']
+
+
+# Modelos criados dentro de cada processo (só o nome e a semente atravessam o pool)
+def criar_modelo(nome, semente):
+    if nome == 'Regressão Linear':
+        from sklearn.linear_model import LinearRegression
+        return LinearRegression()
+    if nome == 'Árvore de Decisão':
+        from sklearn.tree import DecisionTreeRegressor
+        return DecisionTreeRegressor(random_state=semente)
+    if nome == 'Random Forest':
+        from sklearn.ensemble import RandomForestRegressor
+        # Uma thread por floresta: o paralelismo vem do pool de processos
+        return RandomForestRegressor(random_state=semente, n_jobs=1)
+    raise ValueError(f"Modelo desconhecido: {nome}")
+
+
+# === DADOS COMPARTILHADOS ===
+# Em cada processo do pool, X e y ficam mapeados do disco (somente leitura); as páginas são
+# compartilhadas pelo cache do sistema operacional entre todos os processos
+_DADOS = {}
+
+
+def _gravar_dados(X, y, pasta):
+    np.save(os.path.join(pasta, "X.npy"), np.ascontiguousarray(X, dtype=np.float64))
+    np.save(os.path.join(pasta, "y.npy"), np.ascontiguousarray(y, dtype=np.float64))
+
+
+def _abrir_dados(pasta):
+    _DADOS['X'] = np.load(os.path.join(pasta, "X.npy"), mmap_mode='r')
+    _DADOS['y'] = np.load(os.path.join(pasta, "y.npy"), mmap_mode='r')
+
+
+# Índices de teste de uma repetição, reproduzíveis a partir da semente
+def dividir(n, proporcao_teste, semente):
+    ordem = np.random.default_rng(semente).permutation(n)
+    n_teste = int(round(n * proporcao_teste))
+    return np.sort(ordem[n_teste:]), np.sort(ordem[:n_teste])
+
+
+def _ajustar(tarefa):
+    nome, repeticao, semente, proporcao_teste = tarefa
+    X, y = _DADOS['X'], _DADOS['y']
+    treino, teste = dividir(len(y), proporcao_teste, semente)
+
+    inicio = time.perf_counter()
+    modelo = criar_modelo(nome, semente)
+    modelo.fit(X[treino], y[treino])
+    previsto = modelo.predict(X[teste])
+    return {
+        'Modelo': nome,
+        'repeticao': repeticao,
+        'MAE': mean_absolute_error(y[teste], previsto),
+        'RMSE': mean_squared_error(y[teste], previsto) ** 0.5,
+        'R2': r2_score(y[teste], previsto),
+        'segundos': time.perf_counter() - inicio,
+    }
+
+
+def comparar(X, y, modelos=NOMES_MODELOS, repeticoes=30, proporcao_teste=0.2, semente=42, processos=None):
+    tarefas = [(nome, r, semente + r, proporcao_teste) for r in range(repeticoes) for nome in modelos]
+    with tempfile.TemporaryDirectory(prefix="comparacao_") as pasta:
+        _gravar_dados(X, y, pasta)
+        if processos == 1:
+            _abrir_dados(pasta)
+            resultados = [_ajustar(t) for t in tarefas]
+            _DADOS.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=processos, initializer=_abrir_dados, initargs=(pasta,)) as executor:
+                # As tarefas mais caras (florestas) vão primeiro, para não sobrarem no final
+                ordem = sorted(range(len(tarefas)), key=lambda i: tarefas[i][0] != 'Random Forest')
+                feitos = dict(zip(ordem, executor.map(_ajustar, [tarefas[i] for i in ordem])))
+            resultados = [feitos[i] for i in range(len(tarefas))]
+    return pd.DataFrame(resultados)
+
+
+# === INTERVALOS DE CONFIANÇA ===
+# As repetições compartilham linhas de treino, então as notas não são independentes e o desvio
+# padrão simples subestima a incerteza. Usamos a correção de Nadeau e Bengio para divisões aleatórias
+# repetidas: variância * (1/J + n_teste/n_treino), com t de Student de J - 1 graus de liberdade.
+def intervalo_corrigido(valores, proporcao_teste, confianca):
+    j = len(valores)
+    media = float(np.mean(valores))
+    if j < 2:
+        return media, np.nan, np.nan
+    variancia = np.var(valores, ddof=1) * (1 / j + proporcao_teste / (1 - proporcao_teste))
+    margem = stats.t.ppf((1 + confianca) / 2, j - 1) * np.sqrt(variancia)
+    return media, media - margem, media + margem
+
+
+def resumir(resultados, proporcao_teste=0.2, confianca=0.95):
+    linhas = []
+    for nome, grupo in resultados.groupby('Modelo', sort=False):
+        linha = {'Modelo': nome, 'repeticoes': len(grupo)}
+        for metrica in METRICAS:
+            media, inferior, superior = intervalo_corrigido(grupo[metrica].to_numpy(), proporcao_teste, confianca)
+            linha[metrica] = media
+            linha[f'{metrica}_inf'] = inferior
+            linha[f'{metrica}_sup'] = superior
+        linha['segundos_por_ajuste'] = grupo['segundos'].mean()
+        linhas.append(linha)
+    return pd.DataFrame(linhas).sort_values('R2', ascending=False).reset_index(drop=True)
+
+
+# Diferenças pareadas (mesma divisão) de cada modelo em relação a uma referência
+def diferencas(resultados, referencia, metrica='R2', proporcao_teste=0.2, confianca=0.95):
+    tabela = resultados.pivot(index='repeticao', columns='Modelo', values=metrica)
+    linhas = []
+    for nome in tabela.columns.drop(referencia):
+        media, inferior, superior = intervalo_corrigido((tabela[nome] - tabela[referencia]).to_numpy(),
+                                                        proporcao_teste, confianca)
+        linhas.append({'Modelo': nome, f'{metrica} - {referencia}': media, 'inf': inferior, 'sup': superior,
+                       'significativa': not (inferior <= 0 <= superior)})
+    return pd.DataFrame(linhas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comparação de modelos em divisões repetidas, em paralelo")
+    parser.add_argument("--modelos", nargs="+", default=NOMES_MODELOS)
+    parser.add_argument("--repeticoes", type=int, default=30, help="divisões treino/teste aleatórias")
+    parser.add_argument("--teste", type=float, default=0.2, help="proporção de teste em cada divisão")
+    parser.add_argument("--processos", type=int, default=None, help="processos do pool (padrão: todos os núcleos)")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--confianca", type=float, default=0.95)
+    args = parser.parse_args()
+
+    desconhecidos = set(args.modelos) - set(NOMES_MODELOS)
+    if desconhecidos:
+        parser.error(f"modelos desconhecidos: {sorted(desconhecidos)} (opções: {NOMES_MODELOS})")
+
+    df = carregar_modelagem()
+    inicio = time.perf_counter()
+    resultados = comparar(df[VARIAVEIS_NUMERICAS].to_numpy(), df[ALVO].to_numpy(), args.modelos,
+                          args.repeticoes, args.teste, args.semente, args.processos)
+    segundos = time.perf_counter() - inicio
+
+    resumo = resumir(resultados, args.teste, args.confianca)
+    pd.set_option('display.width', 200)
+    print(f"\n{len(resultados)} ajustes ({args.repeticoes} divisões x {len(args.modelos)} modelos) "
+          f"em {segundos:.1f} s")
+    print(f"\nMédias e intervalos de {args.confianca:.0%} (correção de Nadeau-Bengio):")
+    print(resumo.round(3).to_string(index=False))
+
+    if len(args.modelos) > 1:
+        print(f"\nDiferenças pareadas de R² em relação a {resumo['Modelo'].iloc[0]}:")
+        print(diferencas(resultados, resumo['Modelo'].iloc[0], 'R2', args.teste, args.confianca)
+              .round(3).to_string(index=False))
@@ -0,0 +1,334 @@
+# === correlacao.py ===
+# Correlações de Pearson e de postos (Spearman) acumuladas em blocos, sem a base inteira em memória.
+# Cada bloco soma contagens, somas, quadrados e produtos cruzados por par de colunas (só nas linhas em
+# que as duas existem, como o df.corr() do pandas). Os valores entram deslocados por uma média
+# aproximada, para que a subtração final não perca precisão. Acumuladores de blocos diferentes
+# somam-se, então partes do arquivo podem ser processadas em paralelo e juntadas no final.
+# Os postos saem de uma primeira passada que conta os valores de cada coluna (exatos até
+# LIMITE_VALORES valores distintos, depois agrupados em faixas de mesma contagem); na segunda passada
+# cada valor vira o posto médio do seu valor (ou faixa) e as correlações de Pearson dos postos dão
+# o Spearman. Os postos são os de cada coluna sobre todos os seus valores presentes: o Spearman só é
+# igual ao do pandas (postos refeitos em cada par) quando os pares não perdem linhas por ausentes de
+# uma só das colunas. O resultado fica em cache, identificado pelo conteúdo dos dados e pela configuração.
+#
+# Exemplos:
+#   python correlacao.py
+#   python correlacao.py --origem ../dados/nacional_tratado.csv --processos 8 --agrupar Grau
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from base_dados import ALVO, CAMINHO_TRATADO, PASTA_CACHE, TIPOS_TEXTO, hash_arquivo
+from instrumentacao import instrumentar
+
+PASTA_CACHE_CORRELACAO = os.path.join(PASTA_CACHE, "correlacao")
+LIMITE_VALORES = 4096
+LINHAS_POR_BLOCO = 200_000
+BYTES_POR_BLOCO = 64 << 20
+VERSAO = 2
+
+
+# === ACUMULADORES ===
+class Comomentos:
+    # Somas por par (i, j) sobre as linhas em que i e j existem: n[i, j], soma[i, j] = Σ (x_i - k_i),
+    # quadrados[i, j] = Σ (x_i - k_i)², produtos[i, j] = Σ (x_i - k_i)(x_j - k_j)
+    def __init__(self, deslocamento):
+        self.deslocamento = np.asarray(deslocamento, dtype=np.float64)
+        p = len(self.deslocamento)
+        self.n = np.zeros((p, p))
+        self.soma = np.zeros((p, p))
+        self.quadrados = np.zeros((p, p))
+        self.produtos = np.zeros((p, p))
+
+    def atualizar(self, X):
+        validos = ~np.isnan(X)
+        V = validos.astype(np.float64)
+        Z = np.where(validos, X - self.deslocamento, 0.0)
+        self.n += V.T @ V
+        self.soma += Z.T @ V
+        self.quadrados += (Z * Z).T @ V
+        self.produtos += Z.T @ Z
+        return self
+
+    def juntar(self, outro):
+        if not np.array_equal(self.deslocamento, outro.deslocamento):
+            raise ValueError("Só é possível juntar acumuladores com o mesmo deslocamento")
+        self.n += outro.n
+        self.soma += outro.soma
+        self.quadrados += outro.quadrados
+        self.produtos += outro.produtos
+        return self
+
+    def correlacao(self):
+        n = self.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariancia = self.produtos - self.soma * self.soma.T / n
+            variancia = self.quadrados - self.soma ** 2 / n
+            r = covariancia / np.sqrt(variancia * variancia.T)
+        r[(n < 2) | (variancia <= 0) | (variancia.T <= 0)] = np.nan
+        return np.clip(r, -1, 1)
+
+
+class Contagens:
+    # Valores distintos (ordenados) de uma coluna e quantas vezes aparecem. Acima de 'limite' valores,
+    # vizinhos são agrupados em faixas de contagem parecida, guardando o maior valor de cada faixa.
+    def __init__(self, valores=None, contagens=None, limite=LIMITE_VALORES):
+        self.valores = np.empty(0) if valores is None else valores
+        self.contagens = np.empty(0, dtype=np.int64) if contagens is None else contagens
+        self.limite = limite
+        self.exata = True
+
+    def atualizar(self, x):
+        valores, contagens = np.unique(x[~np.isnan(x)], return_counts=True)
+        return self.juntar(Contagens(valores, contagens, self.limite))
+
+    def juntar(self, outro):
+        valores, inverso = np.unique(np.concatenate([self.valores, outro.valores]), return_inverse=True)
+        contagens = np.bincount(inverso, weights=np.concatenate([self.contagens, outro.contagens]))
+        self.valores, self.contagens = valores, contagens.astype(np.int64)
+        self.exata = self.exata and outro.exata
+        if len(self.valores) > self.limite:
+            self._agrupar(self.limite // 2)
+        return self
+
+    def _agrupar(self, faixas):
+        acumulado = np.cumsum(self.contagens)
+        faixa = ((acumulado - self.contagens) * faixas // acumulado[-1]).astype(np.int64)
+        inicios = np.flatnonzero(np.r_[True, faixa[1:] != faixa[:-1]])
+        fins = np.r_[inicios[1:], len(faixa)] - 1
+        self.valores = self.valores[fins]
+        self.contagens = np.add.reduceat(self.contagens, inicios)
+        self.exata = False
+
+    def total(self):
+        return int(self.contagens.sum())
+
+    # Posto médio (a partir de 1) de cada valor: empates, ou valores da mesma faixa, dividem o posto
+    def postos(self, x):
+        if not len(self.valores):
+            return np.full(len(x), np.nan)
+        acumulado = np.cumsum(self.contagens)
+        medio = acumulado - (self.contagens - 1) / 2
+        posicao = np.minimum(np.searchsorted(self.valores, x, side='left'), len(self.valores) - 1)
+        return np.where(np.isnan(x), np.nan, medio[posicao])
+
+
+# === LEITURA EM BLOCOS ===
+# Um CSV é dividido em faixas de bytes que começam e terminam em fim de linha, lidas cada uma por
+# um processo; dentro da faixa a leitura também é em blocos. Exige uma linha física por registro.
+def dividir_arquivo(caminho, partes):
+    tamanho = os.path.getsize(caminho)
+    with open(caminho, 'rb') as arquivo:
+        cabecalho = arquivo.readline()
+        limites = [len(cabecalho)]
+        for k in range(1, partes):
+            arquivo.seek(max(limites[-1], tamanho * k // partes))
+            arquivo.readline()
+            limites.append(min(arquivo.tell(), tamanho))
+    limites.append(tamanho)
+    return cabecalho, [(inicio, fim) for inicio, fim in zip(limites[:-1], limites[1:]) if fim > inicio]
+
+
+def _ler_faixa(caminho, cabecalho, inicio, fim, usar, bytes_por_bloco=BYTES_POR_BLOCO):
+    nomes = cabecalho.decode('utf-8-sig').rstrip('\r\n').split(';')
+    tipos = {coluna: str for coluna in TIPOS_TEXTO if coluna in usar}
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        posicao, resto = inicio, b''
+        while posicao < fim:
+            dados = resto + arquivo.read(min(bytes_por_bloco, fim - posicao))
+            posicao = min(arquivo.tell(), fim)
+            corte = dados.rfind(b'\n') + 1 if posicao < fim else len(dados)
+            dados, resto = dados[:corte], dados[corte:]
+            if dados.strip():
+                yield pd.read_csv(io.BytesIO(dados), sep=";", header=None, names=nomes, usecols=usar, dtype=tipos)
+
+
+# Blocos de um DataFrame, ou de uma faixa (caminho, cabeçalho, início, fim) de um CSV
+def ler_blocos(fonte, usar, linhas_por_bloco=LINHAS_POR_BLOCO):
+    if isinstance(fonte, pd.DataFrame):
+        for inicio in range(0, len(fonte), linhas_por_bloco):
+            yield fonte.iloc[inicio:inicio + linhas_por_bloco][usar]
+    else:
+        caminho, cabecalho, inicio, fim = fonte
+        yield from _ler_faixa(caminho, cabecalho, inicio, fim, usar)
+
+
+# === PASSADAS ===
+# Cada passada devolve acumuladores por grupo; None é a base inteira
+def _grupos(bloco, agrupar):
+    yield None, np.ones(len(bloco), dtype=bool)
+    if agrupar:
+        chaves = bloco[agrupar].astype(object)
+        for valor in chaves.dropna().unique():
+            yield str(valor), (chaves == valor).to_numpy()
+
+
+def _passada(tarefa):
+    fonte, colunas, agrupar, deslocamento, contagens = tarefa
+    usar = colunas + ([agrupar] if agrupar else [])
+    resultado = {}
+    for bloco in ler_blocos(fonte, usar):
+        X = bloco[colunas].to_numpy(dtype=np.float64, na_value=np.nan)
+        for grupo, mascara in _grupos(bloco, agrupar):
+            Xg = X[mascara]
+            if contagens is None:
+                # Primeira passada: Pearson e contagem de valores por coluna
+                if grupo not in resultado:
+                    resultado[grupo] = {'pearson': Comomentos(deslocamento),
+                                        'contagens': [Contagens() for _ in colunas]}
+                resultado[grupo]['pearson'].atualizar(Xg)
+                for j, contagem in enumerate(resultado[grupo]['contagens']):
+                    contagem.atualizar(Xg[:, j])
+            else:
+                # Segunda passada: Pearson dos postos
+                postos = np.column_stack([c.postos(Xg[:, j]) for j, c in enumerate(contagens[grupo])])
+                centro = [(c.total() + 1) / 2 for c in contagens[grupo]]
+                resultado.setdefault(grupo, Comomentos(centro)).atualizar(postos)
+    return resultado
+
+
+def _juntar(parciais, segunda):
+    total = {}
+    for parcial in parciais:
+        for grupo, acumulado in parcial.items():
+            if grupo not in total:
+                total[grupo] = acumulado
+            elif segunda:
+                total[grupo].juntar(acumulado)
+            else:
+                total[grupo]['pearson'].juntar(acumulado['pearson'])
+                for a, b in zip(total[grupo]['contagens'], acumulado['contagens']):
+                    a.juntar(b)
+    return total
+
+
+def _executar(fontes, colunas, agrupar, deslocamento, contagens, processos):
+    tarefas = [(fonte, colunas, agrupar, deslocamento, contagens) for fonte in fontes]
+    if processos == 1 or len(tarefas) == 1:
+        parciais = map(_passada, tarefas)
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            parciais = list(executor.map(_passada, tarefas))
+    return _juntar(parciais, segunda=contagens is not None)
+
+
+# === CÁLCULO COM CACHE ===
+def colunas_numericas(fonte):
+    if isinstance(fonte, pd.DataFrame):
+        return list(fonte.select_dtypes(include='number').columns)
+    amostra = pd.read_csv(fonte, sep=";", nrows=1000, dtype={coluna: str for coluna in TIPOS_TEXTO})
+    return list(amostra.select_dtypes(include='number').columns)
+
+
+def _chave_cache(fonte, colunas, agrupar):
+    if isinstance(fonte, pd.DataFrame):
+        usar = colunas + ([agrupar] if agrupar else [])
+        dados = hashlib.sha256(pd.util.hash_pandas_object(fonte[usar], index=False).to_numpy().tobytes())
+        dados = dados.hexdigest()
+    else:
+        dados = hash_arquivo(fonte)
+    texto = json.dumps({'dados': dados, 'colunas': colunas, 'agrupar': agrupar, 'versao': VERSAO,
+                        'limite_valores': LIMITE_VALORES}, sort_keys=True)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16]
+
+
+def _tabela(matriz, colunas):
+    return pd.DataFrame(matriz, index=colunas, columns=colunas)
+
+
+# Correlações da base inteira e de cada grupo de 'agrupar':
+#   {'pearson': DataFrame, 'spearman': DataFrame, 'n': DataFrame, 'exata': bool, 'pares_completos': bool,
+#    'grupos': {valor: {'pearson': ..., 'spearman': ..., 'n': ...}}}
+# 'fonte' é um DataFrame ou o caminho de um CSV no formato da base tratada (lido em blocos).
+# Com 'processos' > 1, o CSV é dividido em faixas processadas em paralelo.
+@instrumentar
+def calcular(fonte, colunas=None, agrupar=None, postos=True, processos=1, usar_cache=True):
+    colunas = list(colunas) if colunas is not None else colunas_numericas(fonte)
+    caminho = os.path.join(PASTA_CACHE_CORRELACAO, f"{_chave_cache(fonte, colunas, agrupar)}.pkl")
+    if usar_cache and os.path.exists(caminho):
+        with open(caminho, 'rb') as arquivo:
+            resultado = pickle.load(arquivo)
+        if resultado['spearman'] is not None or not postos:
+            return resultado
+
+    if isinstance(fonte, pd.DataFrame):
+        fontes = [fonte]
+        primeiro = fonte[colunas].iloc[:LINHAS_POR_BLOCO].to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        cabecalho, faixas = dividir_arquivo(fonte, processos or os.cpu_count() or 1)
+        fontes = [(fonte, cabecalho, inicio, fim) for inicio, fim in faixas]
+        primeiro = pd.read_csv(fonte, sep=";", usecols=colunas, nrows=LINHAS_POR_BLOCO)[colunas]
+        primeiro = primeiro.to_numpy(dtype=np.float64, na_value=np.nan)
+    # Deslocamento: média do primeiro bloco (zero se a coluna não tiver valores), igual para todos os processos
+    validos = ~np.isnan(primeiro)
+    deslocamento = np.where(validos, primeiro, 0.0).sum(axis=0) / np.maximum(validos.sum(axis=0), 1)
+
+    primeira = _executar(fontes, colunas, agrupar, deslocamento, None, processos)
+    contagens = {grupo: acumulado['contagens'] for grupo, acumulado in primeira.items()}
+    segunda = _executar(fontes, colunas, agrupar, None, contagens, processos) if postos else {}
+
+    def montar(grupo):
+        return {
+            'pearson': _tabela(primeira[grupo]['pearson'].correlacao(), colunas),
+            'spearman': _tabela(segunda[grupo].correlacao(), colunas) if postos else None,
+            'n': _tabela(primeira[grupo]['pearson'].n.astype(np.int64), colunas),
+        }
+
+    resultado = montar(None)
+    # Postos exatos (sem faixas) e, em todos os pares, as mesmas linhas que cada coluna tem sozinha
+    # (n[i, j] = n[i, i] = n[j, j]); senão os postos não são os que o pandas calcularia no par
+    resultado['pares_completos'] = all(_pares_completos(acumulado['pearson'].n) for acumulado in primeira.values())
+    resultado['exata'] = (resultado['pares_completos']
+                          and all(c.exata for grupo in contagens.values() for c in grupo))
+    resultado['grupos'] = {grupo: montar(grupo) for grupo in sorted(g for g in primeira if g is not None)}
+
+    os.makedirs(PASTA_CACHE_CORRELACAO, exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as arquivo:
+        pickle.dump(resultado, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+    return resultado
+
+
+def _pares_completos(n):
+    diagonal = np.diag(n)
+    return bool(np.all(n == diagonal[:, None]) and np.all(n == diagonal[None, :]))
+
+
+# Correlações de cada coluna com o alvo, da maior para a menor
+def ranking_alvo(matriz, alvo=ALVO):
+    return matriz[alvo].sort_values(ascending=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Correlações de Pearson e Spearman em blocos, com cache")
+    parser.add_argument("--origem", default=CAMINHO_TRATADO, help="CSV no formato da base tratada")
+    parser.add_argument("--agrupar", default=None, help="coluna para correlações por grupo (ex.: Grau)")
+    parser.add_argument("--processos", type=int, default=None, help="processos (padrão: todos os núcleos)")
+    parser.add_argument("--sem-postos", action="store_true", help="só Pearson (uma passada)")
+    parser.add_argument("--refazer", action="store_true", help="ignorar o cache")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resultado = calcular(args.origem, agrupar=args.agrupar, postos=not args.sem_postos,
+                         processos=args.processos, usar_cache=not args.refazer)
+    print(f"Correlações em {time.perf_counter() - inicio:.2f} s"
+          + ("" if resultado['exata'] else " (Spearman aproximado: postos por faixas)" if resultado['pares_completos']
+             else " (Spearman aproximado: postos por coluna, não por par, com ausentes diferentes entre colunas)"))
+    pd.set_option('display.width', 200)
+    metodos = ['pearson'] + ([] if args.sem_postos else ['spearman'])
+    print(f"\nCorrelação com {ALVO}:")
+    print(pd.DataFrame({m: ranking_alvo(resultado[m]) for m in metodos}).round(3).to_string())
+    for grupo, tabelas in resultado['grupos'].items():
+        print(f"\n{args.agrupar} = {grupo}:")
+        print(pd.DataFrame({m: ranking_alvo(tabelas[m]) for m in metodos}).round(3).head(5).to_string())
@@ -0,0 +1,290 @@
+# === cubo.py ===
+# Cubo pré-agregado de órgão x município x grau para as consultas dos fatores de atraso.
+# A base é reduzida uma única vez às células do menor grão (cada combinação existente de 'Nome orgao',
+# 'Municipio' e 'Grau'), com o número de linhas e, por métrica, contagem, soma e soma de quadrados.
+# Essas somas são aditivas: qualquer agregação por um subconjunto das dimensões (rollup), recorte por
+# valores das dimensões (slice) ou ranking (top-N) sai de um bincount sobre as células, sem voltar às
+# linhas da base. As somas de quadrados ficam deslocadas pela média geral de cada métrica, para que a
+# variância final não perca precisão. As consultas repetidas saem de uma memória LRU no próprio cubo,
+# e o cubo fica em cache no disco, refeito só quando o conteúdo do CSV de origem muda.
+# Quantis não são aditivos e não cabem no cubo: para eles, use agregacao.agregar ou quantis.py.
+#
+# Exemplos:
+#   python cubo.py
+#   python cubo.py --por Municipio --ordenar linhas -n 15
+#   python cubo.py --por Municipio Grau --filtro Grau=G1 --filtro "Grau=G1, JE" --minimo 5
+#   python cubo.py --metrica CN_12_meses --medir 10000
+
+import argparse
+import os
+import pickle
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from agregacao import filtrar_minimo, ranking
+from base_dados import ALVO, CAMINHO_TRATADO, PASTA_CACHE, hash_arquivo
+from instrumentacao import instrumentar
+
+PASTA_CACHE_CUBO = os.path.join(PASTA_CACHE, "cubo")
+DIMENSOES = ['Nome orgao', 'Municipio', 'Grau']
+METRICAS = [ALVO, 'TPCPL_Dec_2024_num', 'CN_12_meses', 'CP_Dec_2024', 'Sus_Dec_2024']
+LIMITE_MEMORIA = 4096
+VERSAO = 1
+
+
+# === CUBO ===
+class Cubo:
+    # codigos[dim][i]: código da célula i na dimensão (len(categorias[dim]) = valor ausente);
+    # linhas[i]: linhas da célula; medidas[metrica]: contagem, soma e soma de quadrados deslocados
+    def __init__(self, dimensoes, categorias, codigos, linhas, medidas, deslocamento):
+        self.dimensoes = list(dimensoes)
+        self.categorias = categorias
+        self.codigos = codigos
+        self.linhas = linhas
+        self.medidas = medidas
+        self.deslocamento = deslocamento
+        self._memoria = OrderedDict()
+        # Posição de cada valor nas categorias, para os recortes sem get_indexer
+        self._posicoes = {dim: {valor: i for i, valor in enumerate(categorias[dim])} for dim in self.dimensoes}
+
+    @classmethod
+    @instrumentar
+    def construir(cls, df, dimensoes=DIMENSOES, metricas=METRICAS):
+        categorias, codigos_linha = {}, []
+        for dim in dimensoes:
+            # Categorias na ordem de aparição, como no agregar; ausentes ganham o código k
+            codigos, unicos = pd.factorize(df[dim])
+            k = len(unicos)
+            categorias[dim] = pd.Index(np.asarray(unicos), name=dim)
+            codigos_linha.append(np.where(codigos < 0, k, codigos))
+        tamanhos = [len(categorias[dim]) + 1 for dim in dimensoes]
+        celulas, inverso = np.unique(np.ravel_multi_index(codigos_linha, tamanhos), return_inverse=True)
+        n = len(celulas)
+        codigos = {dim: c.astype(np.int32) for dim, c in zip(dimensoes, np.unravel_index(celulas, tamanhos))}
+
+        medidas, deslocamento = {}, {}
+        for metrica in metricas:
+            valores = df[metrica].to_numpy(dtype=np.float64, na_value=np.nan)
+            validos = ~np.isnan(valores)
+            c = inverso[validos]
+            v = valores[validos]
+            deslocamento[metrica] = float(v.mean()) if len(v) else 0.0
+            medidas[metrica] = {
+                'contagem': np.bincount(c, minlength=n),
+                'soma': np.bincount(c, weights=v, minlength=n),
+                'soma_quadrados': np.bincount(c, weights=(v - deslocamento[metrica]) ** 2, minlength=n),
+            }
+        return cls(dimensoes, categorias, codigos, np.bincount(inverso, minlength=n), medidas, deslocamento)
+
+    @property
+    def celulas(self):
+        return len(self.linhas)
+
+    # Estado gravado no disco: só os arrays e as categorias (sem a memória de consultas e sem a classe,
+    # que seria __main__.Cubo quando o cubo é gravado pela linha de comando)
+    def estado(self):
+        return {'dimensoes': self.dimensoes, 'categorias': self.categorias, 'codigos': self.codigos,
+                'linhas': self.linhas, 'medidas': self.medidas, 'deslocamento': self.deslocamento}
+
+    def limpar_memoria(self):
+        self._memoria.clear()
+
+    # Chave de memória: filtros como tuplas ordenadas, para que a ordem de escrita não importe
+    # (tuplas já vêm normalizadas, como nas chamadas do topo)
+    @staticmethod
+    def _normalizar_filtros(filtros):
+        if not filtros:
+            return ()
+        if isinstance(filtros, tuple):
+            return filtros
+        normalizados = []
+        for dim, valores in filtros.items():
+            if isinstance(valores, (str, bytes)) or not np.iterable(valores):
+                valores = [valores]
+            normalizados.append((dim, tuple(sorted(set(valores), key=str))))
+        return tuple(sorted(normalizados))
+
+    # Células que passam pelos filtros ({dimensão: valor ou lista de valores})
+    def _mascara(self, filtros):
+        mascara = np.ones(self.celulas, dtype=bool)
+        for dim, valores in filtros:
+            if dim not in self.categorias:
+                raise KeyError(f"Dimensão fora do cubo: {dim} (disponíveis: {', '.join(self.dimensoes)})")
+            posicoes = self._posicoes[dim]
+            codigos = [posicoes[valor] for valor in valores if valor in posicoes]
+            mascara &= np.isin(self.codigos[dim], codigos)
+        return mascara
+
+    # Estatísticas por combinação das dimensões em "por", no formato do agregacao.agregar (sem quantis):
+    # linhas, contagem, soma, media e desvio (ddof=1). Com "por" vazio, uma linha com o total.
+    def consultar(self, por, metrica=ALVO, filtros=None):
+        por = (por,) if isinstance(por, str) else tuple(por)
+        filtros = self._normalizar_filtros(filtros)
+        return self._lembrar((por, metrica, filtros), lambda: self._calcular(por, metrica, filtros))
+
+    # Top-N de uma estatística, só com os grupos de pelo menos "minimo" linhas
+    def topo(self, por, coluna='media', n=10, minimo=0, metrica=ALVO, filtros=None):
+        por = (por,) if isinstance(por, str) else tuple(por)
+        filtros = self._normalizar_filtros(filtros)
+        return self._lembrar(('topo', por, metrica, filtros, coluna, n, minimo), lambda: ranking(
+            filtrar_minimo(self.consultar(por, metrica, filtros), minimo), coluna, n))
+
+    # Memória LRU das consultas; devolve cópias, para que quem consulta não altere a memória
+    def _lembrar(self, chave, calcular):
+        resultado = self._memoria.get(chave)
+        if resultado is None:
+            resultado = calcular()
+            self._memoria[chave] = resultado
+            if len(self._memoria) > LIMITE_MEMORIA:
+                self._memoria.popitem(last=False)
+        else:
+            self._memoria.move_to_end(chave)
+        return resultado.copy()
+
+    def _calcular(self, por, metrica, filtros):
+        if metrica not in self.medidas:
+            raise KeyError(f"Métrica fora do cubo: {metrica} (disponíveis: {', '.join(self.medidas)})")
+        mascara = self._mascara(filtros)
+        # Grupos com dimensão ausente ficam de fora, como no groupby
+        for dim in por:
+            mascara &= self.codigos[dim] < len(self.categorias[dim])
+        tamanhos = [len(self.categorias[dim]) for dim in por]
+        combinado = (np.ravel_multi_index([self.codigos[dim][mascara] for dim in por], tamanhos) if por
+                     else np.zeros(int(mascara.sum()), dtype=np.int64))
+        # Só os grupos com células; em ordem de código, isto é, de aparição na base
+        grupos, inverso = np.unique(combinado, return_inverse=True)
+        k = len(grupos)
+
+        medidas = self.medidas[metrica]
+        contagem = np.bincount(inverso, weights=medidas['contagem'][mascara], minlength=k).astype(np.int64)
+        soma = np.bincount(inverso, weights=medidas['soma'][mascara], minlength=k)
+        quadrados = np.bincount(inverso, weights=medidas['soma_quadrados'][mascara], minlength=k)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = soma / contagem
+            centrada = soma - contagem * self.deslocamento[metrica]
+            desvios = np.maximum(quadrados - centrada ** 2 / contagem, 0.0)
+            desvio = np.sqrt(desvios / (contagem - 1))
+        desvio[contagem < 2] = np.nan
+
+        if len(por) == 1:
+            indice = self.categorias[por[0]].take(grupos)
+        elif por:
+            indice = pd.MultiIndex(levels=[self.categorias[dim] for dim in por],
+                                   codes=list(np.unravel_index(grupos, tamanhos)), names=por,
+                                   verify_integrity=False)
+        else:
+            indice = pd.Index(['Total'])
+        return pd.DataFrame({
+            'linhas': np.bincount(inverso, weights=self.linhas[mascara], minlength=k).astype(np.int64),
+            'contagem': contagem,
+            'soma': soma,
+            'media': media,
+            'desvio': desvio
+        }, index=indice)
+
+
+# === CACHE EM DISCO ===
+# Válido enquanto o CSV de origem não mudar (mtime/tamanho e, se mudarem, hash) e a configuração for a mesma
+def _cache_valido(meta, origem, dimensoes, metricas):
+    if (meta.get('versao') != VERSAO or meta.get('dimensoes') != list(dimensoes)
+            or meta.get('metricas') != list(metricas)):
+        return False
+    estado = os.stat(origem)
+    if meta['mtime_ns'] == estado.st_mtime_ns and meta['tamanho'] == estado.st_size:
+        return True
+    return meta['sha256'] == hash_arquivo(origem)
+
+
+@instrumentar
+def carregar_cubo(origem=CAMINHO_TRATADO, dimensoes=DIMENSOES, metricas=METRICAS, usar_cache=True):
+    nome = os.path.splitext(os.path.basename(origem))[0]
+    caminho = os.path.join(PASTA_CACHE_CUBO, f"{nome}.pkl")
+    if usar_cache and os.path.exists(caminho):
+        with open(caminho, 'rb') as arquivo:
+            meta, estado = pickle.load(arquivo)
+        if _cache_valido(meta, origem, dimensoes, metricas):
+            return Cubo(**estado)
+
+    from base_dados import carregar_tratado
+
+    colunas = list(dict.fromkeys(list(dimensoes) + list(metricas)))
+    cubo = Cubo.construir(carregar_tratado(colunas, origem=origem), dimensoes, metricas)
+    estado = os.stat(origem)
+    meta = {
+        'origem': os.path.abspath(origem),
+        'mtime_ns': estado.st_mtime_ns,
+        'tamanho': estado.st_size,
+        'sha256': hash_arquivo(origem),
+        'dimensoes': list(dimensoes),
+        'metricas': list(metricas),
+        'versao': VERSAO
+    }
+    os.makedirs(PASTA_CACHE_CUBO, exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as arquivo:
+        pickle.dump((meta, cubo.estado()), arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+    return cubo
+
+
+# === MEDIÇÃO ===
+# Consultas sorteadas (rollups por 1 ou 2 dimensões, com ou sem recorte, e top-N), sem e com memória
+def medir(cubo, consultas=1000, metrica=ALVO, semente=42):
+    rng = np.random.default_rng(semente)
+    pedidos = []
+    for _ in range(consultas):
+        por = list(rng.choice(cubo.dimensoes, size=rng.integers(1, 3), replace=False))
+        filtros = None
+        if rng.random() < 0.5:
+            dim = str(rng.choice(cubo.dimensoes))
+            filtros = {dim: [cubo.categorias[dim][i] for i in rng.choice(len(cubo.categorias[dim]), size=2)]}
+        pedidos.append((por, filtros, int(rng.choice([0, 5]))))
+
+    def rodar():
+        inicio = time.perf_counter()
+        for por, filtros, minimo in pedidos:
+            cubo.topo(por, 'media', 10, minimo, metrica, filtros)
+        return (time.perf_counter() - inicio) / consultas * 1000
+
+    cubo.limpar_memoria()
+    sem_memoria = rodar()
+    return {'consultas': consultas, 'ms_sem_memoria': sem_memoria, 'ms_com_memoria': rodar()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cubo pré-agregado de órgão x município x grau")
+    parser.add_argument("--origem", default=CAMINHO_TRATADO, help="CSV no formato da base tratada")
+    parser.add_argument("--por", nargs="*", default=['Nome orgao'], help="dimensões do rollup (vazio: total)")
+    parser.add_argument("--metrica", default=ALVO, choices=METRICAS)
+    parser.add_argument("--filtro", action="append", default=[], metavar="DIM=VALOR",
+                        help="recorte; repetir a mesma dimensão soma valores")
+    parser.add_argument("--ordenar", default="media", choices=['media', 'linhas', 'contagem', 'soma', 'desvio'])
+    parser.add_argument("-n", type=int, default=10, help="tamanho do top-N")
+    parser.add_argument("--minimo", type=int, default=0, help="mínimo de linhas por grupo")
+    parser.add_argument("--medir", type=int, default=0, metavar="N", help="medir N consultas sorteadas")
+    parser.add_argument("--refazer", action="store_true", help="ignorar o cache do cubo")
+    args = parser.parse_args()
+
+    filtros = {}
+    for texto in args.filtro:
+        dim, _, valor = texto.partition("=")
+        filtros.setdefault(dim, []).append(valor)
+
+    inicio = time.perf_counter()
+    cubo = carregar_cubo(args.origem, usar_cache=not args.refazer)
+    print(f"Cubo com {cubo.celulas} células ({' x '.join(cubo.dimensoes)}) em {time.perf_counter() - inicio:.3f} s")
+
+    inicio = time.perf_counter()
+    resumo = filtrar_minimo(cubo.consultar(args.por, args.metrica, filtros), args.minimo)
+    tempo = (time.perf_counter() - inicio) * 1000
+    pd.set_option('display.width', 200)
+    print(f"\n{args.metrica} por {', '.join(args.por) or 'total'} ({len(resumo)} grupos, {tempo:.2f} ms):")
+    print(resumo.sort_values(args.ordenar, ascending=False, kind='stable').head(args.n).round(2).to_string())
+
+    if args.medir:
+        medida = medir(cubo, args.medir, args.metrica)
+        print(f"\n{medida['consultas']} consultas: {medida['ms_sem_memoria']:.3f} ms por consulta sem memória, "
+              f"{medida['ms_com_memoria']:.3f} ms com memória")
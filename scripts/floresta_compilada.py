@@ -0,0 +1,148 @@
+# === floresta_compilada.py ===
+# Inferência da Random Forest sobre arrays contíguos de nós (atributo, limiar, filhos, valor),
+# percorrendo todas as árvores e todas as linhas de uma vez, nível a nível, com numpy.
+# O resultado é idêntico bit a bit ao predict do sklearn (mesma conversão para float32 e
+# mesma ordem de soma das árvores).
+
+import os
+import time
+
+import numpy as np
+
+CAMPOS = ['atributo', 'limiar', 'esquerda', 'direita', 'faltante_esquerda', 'valor', 'raizes']
+
+
+# === COMPILAÇÃO ===
+# Os nós de todas as árvores são concatenados; filhos viram índices globais.
+# Folhas apontam para si mesmas, de modo que o percurso pode seguir um número fixo de passos.
+def compilar(modelo):
+    atributos, limiares, esquerdas, direitas, faltantes, valores, raizes = [], [], [], [], [], [], []
+    deslocamento = 0
+    profundidade = 0
+    for arvore in modelo.estimators_:
+        t = arvore.tree_
+        n = t.node_count
+        folha = t.children_left == -1
+        indices = np.arange(n) + deslocamento
+
+        atributos.append(np.where(folha, 0, t.feature).astype(np.int32))
+        limiares.append(np.where(folha, np.inf, t.threshold))
+        esquerdas.append(np.where(folha, indices, t.children_left + deslocamento).astype(np.int32))
+        direitas.append(np.where(folha, indices, t.children_right + deslocamento).astype(np.int32))
+        if hasattr(t, 'missing_go_to_left'):
+            faltantes.append(np.asarray(t.missing_go_to_left, dtype=bool))
+        else:
+            faltantes.append(np.zeros(n, dtype=bool))
+        valores.append(t.value[:, 0, 0].astype(np.float64))
+        raizes.append(deslocamento)
+
+        deslocamento += n
+        profundidade = max(profundidade, t.max_depth)
+
+    return {
+        'atributo': np.concatenate(atributos),
+        'limiar': np.concatenate(limiares),
+        'esquerda': np.concatenate(esquerdas),
+        'direita': np.concatenate(direitas),
+        'faltante_esquerda': np.concatenate(faltantes),
+        'valor': np.concatenate(valores),
+        'raizes': np.asarray(raizes, dtype=np.int32),
+        'profundidade': int(profundidade),
+        'n_atributos': int(modelo.n_features_in_),
+    }
+
+
+# === PERCURSO VETORIZADO ===
+def _prever_bloco(floresta, X32):
+    n, m = X32.shape
+    plano = X32.ravel()
+    # Posição de cada linha no array achatado; o valor lido é plano[base + atributo do nó]
+    base = (np.arange(n, dtype=np.int64) * m)[None, :]
+    nos = np.repeat(floresta['raizes'][:, None], n, axis=1)
+    atributo, limiar, esquerda = floresta['atributo'], floresta['limiar'], floresta['esquerda']
+    salto = floresta['direita'] - esquerda
+    tem_faltante = np.isnan(X32).any()
+
+    for _ in range(floresta['profundidade']):
+        x = plano.take(base + atributo.take(nos))
+        # O sklearn compara o valor em float32 (promovido a double) com o limiar em double
+        vai_direita = x > limiar.take(nos)
+        if tem_faltante:
+            vai_direita = np.where(np.isnan(x), ~floresta['faltante_esquerda'].take(nos), vai_direita)
+        nos = esquerda.take(nos) + salto.take(nos) * vai_direita
+
+    # Soma acumulada árvore a árvore, na mesma ordem do predict do sklearn
+    folhas = floresta['valor'].take(nos)
+    return np.cumsum(folhas, axis=0)[-1] / len(floresta['raizes'])
+
+
+def prever(floresta, X, linhas_por_bloco=2_000):
+    X32 = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    if X32.ndim == 1:
+        X32 = X32[None, :]
+    if X32.shape[1] != floresta['n_atributos']:
+        raise ValueError(f"Esperadas {floresta['n_atributos']} colunas, recebidas {X32.shape[1]}")
+    if X32.shape[0] <= linhas_por_bloco:
+        return _prever_bloco(floresta, X32)
+    return np.concatenate([_prever_bloco(floresta, X32[i:i + linhas_por_bloco])
+                           for i in range(0, X32.shape[0], linhas_por_bloco)])
+
+
+# === PERSISTÊNCIA ===
+# Cada array vai num .npy próprio, para ser lido com memory map
+def salvar(floresta, pasta):
+    for campo in CAMPOS:
+        np.save(os.path.join(pasta, f"floresta_{campo}.npy"), floresta[campo])
+
+
+def carregar(pasta, profundidade, n_atributos, mmap=True):
+    floresta = {campo: np.load(os.path.join(pasta, f"floresta_{campo}.npy"), mmap_mode='r' if mmap else None)
+                for campo in CAMPOS}
+    floresta['profundidade'] = profundidade
+    floresta['n_atributos'] = n_atributos
+    return floresta
+
+
+# === VERIFICAÇÃO E BENCHMARK ===
+# Compara com o predict do sklearn (igualdade exata) e mede a latência em lotes de 1, 100 e 100 mil linhas
+def comparar(modelo, floresta, X, tamanhos=(1, 100, 100_000), repeticoes=20, semente=42):
+    import pandas as pd
+
+    gerador = np.random.default_rng(semente)
+    colunas = getattr(modelo, 'feature_names_in_', None)
+    resultados = []
+    for tamanho in tamanhos:
+        lote = X[gerador.integers(0, len(X), tamanho)]
+        lote_sklearn = pd.DataFrame(lote, columns=colunas) if colunas is not None else lote
+        vezes = max(1, repeticoes if tamanho <= 1000 else 3)
+
+        inicio = time.perf_counter()
+        for _ in range(vezes):
+            esperado = modelo.predict(lote_sklearn)
+        tempo_sklearn = (time.perf_counter() - inicio) / vezes
+
+        inicio = time.perf_counter()
+        for _ in range(vezes):
+            obtido = prever(floresta, lote)
+        tempo_compilada = (time.perf_counter() - inicio) / vezes
+
+        resultados.append({
+            'linhas': tamanho,
+            'sklearn_ms': tempo_sklearn * 1000,
+            'compilada_ms': tempo_compilada * 1000,
+            'aceleracao': tempo_sklearn / tempo_compilada,
+            'identico': bool(np.array_equal(esperado, obtido)),
+        })
+    return pd.DataFrame(resultados)
+
+
+if __name__ == "__main__":
+    from artefato_modelo import carregar_artefato, montar_matriz
+    from base_dados import carregar_tratado
+
+    artefato = carregar_artefato(mmap=False)
+    floresta = compilar(artefato['modelo'])
+    X = montar_matriz(artefato, carregar_tratado())
+    print(f"Floresta compilada: {len(floresta['raizes'])} árvores, {len(floresta['valor'])} nós, "
+          f"profundidade máxima {floresta['profundidade']}")
+    print(comparar(artefato['modelo'], floresta, X).to_string(index=False))
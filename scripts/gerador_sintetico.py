@@ -0,0 +1,390 @@
+# === gerador_sintetico.py ===
+# Gerador de bases sintéticas no mesmo formato de tjsp_processos_sp.csv, para testes de escala e carga
+# sem tirar os dados reais do ambiente seguro.
+#
+# O perfil aprendido da base real guarda: as 24 colunas, as frequências de Grau e Municipio, os "tipos"
+# de órgão por Grau, a proporção de nomes únicos, as taxas de ausência por Grau e, para as variáveis
+# numéricas, quantis e correlações de postos por Grau (uma cópula gaussiana, que preserva as
+# distribuições e as correlações aproximadas). As contagens de 2024 saem das de 2023 e das variações
+# %CP e %Sus, limitadas à faixa observada na base real para acervos de 2023 do mesmo porte.
+# A geração é toda vetorizada: os números são sorteados de uma normal multivariada e o texto CSV
+# (com "4.700", "-4,3%", "8 anos e 5 meses") é montado byte a byte em matrizes numpy.
+#
+# Exemplos:
+#   python gerador_sintetico.py --linhas 10000000 --saida ../dados/sintetico.csv
+#   python gerador_sintetico.py --aprender ../dados/perfil_sintetico.json
+
+import argparse
+import io
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from base_dados import CAMINHO_ORIGINAL
+from carregamento import COLUNAS_CONTAGEM, converter_tipos
+
+# Variáveis sorteadas conjuntamente; o texto de %CP e %Sus é recalculado a partir das contagens
+NUMERICAS = COLUNAS_CONTAGEM + ['TPSent_12_meses_num', 'TPCPL_Dec_2024_num', 'TC_Dec_2024_num', 'IAD_12_meses_num',
+                                '%CP_num', '%Sus_num']
+COM_AUSENTES = ['TPSent_12_meses', 'TPCPL_Dec_2024', 'TC_Dec_2024', 'IAD_12_meses']
+
+# Colunas de variação percentual e as contagens de 2023 e 2024 de onde são calculadas
+PARES_VARIACAO = {'%CP': ('CP_Dec_2023', 'CP_Dec_2024'), '%Sus': ('Sus_Dec_2023', 'Sus_Dec_2024')}
+
+# Faixas de porte do acervo de 2023 (quantis dos valores positivos) com limites próprios de variação:
+# decis, e faixas mais estreitas no topo, onde uma variação alta vira as maiores contagens da base
+NIVEIS_FAIXAS_VARIACAO = np.r_[np.linspace(0, 0.9, 10), 0.95, 0.99, 1]
+
+# Níveis em que os quantis de cada variável são guardados no perfil
+NIVEIS_QUANTIS = np.linspace(0, 1, 201)
+
+# Graus com poucas linhas usam a média e a covariância da base inteira
+MINIMO_LINHAS_GRAU = 30
+
+
+# === APRENDIZADO DO PERFIL ===
+def _frequencias(serie, limite=None):
+    contagem = serie.dropna().value_counts()
+    if limite:
+        contagem = contagem.head(limite)
+    return {'valores': contagem.index.astype(str).tolist(), 'pesos': (contagem / contagem.sum()).tolist()}
+
+
+# Cópula gaussiana: cada variável vira escore normal pelo seu posto; guardamos a correlação entre os
+# escores e os quantis de cada variável. Zeros e caudas longas saem da própria distribuição empírica
+# e zeros que ocorrem juntos (órgãos sem movimento) continuam ocorrendo juntos.
+def _estatisticas(valores):
+    escores = ndtri(valores.rank() / (valores.count() + 1))
+    correlacao = escores.corr().fillna(0).to_numpy()
+    # Encolhimento em direção à identidade, maior quanto menos linhas, para manter a matriz bem condicionada
+    peso = min(1.0, 10 / max(len(valores), 1))
+    correlacao = (1 - peso) * correlacao + peso * np.eye(len(correlacao))
+    quantis = valores.quantile(NIVEIS_QUANTIS).fillna(0)
+    return {'correlacao': correlacao.tolist(), 'quantis': quantis.to_numpy().T.tolist()}
+
+
+# A cópula sorteia a variação quase independente do acervo de 2023, e um acervo grande com uma variação
+# de órgão pequeno (+700%) gera contagens de 2024 muito além das reais. Guardamos, por faixa de porte
+# do acervo de 2023, a menor e a maior variação observadas, usadas para limitar o sorteio.
+def _limites_variacao(df):
+    limites = {}
+    for coluna, (antes, _) in PARES_VARIACAO.items():
+        validos = (df[antes] > 0) & df[f"{coluna}_num"].notna()
+        base, variacao = df.loc[validos, antes], df.loc[validos, f"{coluna}_num"]
+        cortes = np.unique(base.quantile(NIVEIS_FAIXAS_VARIACAO, interpolation='lower'))[1:-1]
+        faixa = np.searchsorted(cortes, base, side='right')
+        grupos = variacao.groupby(faixa).agg(['min', 'max']).reindex(range(len(cortes) + 1))
+        limites[coluna] = {'cortes': cortes.tolist(),
+                           'minimo': grupos['min'].fillna(variacao.min()).tolist(),
+                           'maximo': grupos['max'].fillna(variacao.max()).tolist()}
+    return limites
+
+
+def aprender_perfil(caminho=CAMINHO_ORIGINAL):
+    bruto = pd.read_csv(caminho, sep=";", dtype=str, encoding="utf-8-sig")
+    df = converter_tipos(bruto)
+
+    # Tipo do órgão: o nome sem o sufixo " DE <MUNICIPIO>", quando houver
+    nomes = df['Nome orgao'].astype(str)
+    sufixos = ' DE ' + df['Municipio'].fillna('').astype(str)
+    tem_sufixo = pd.Series([n.endswith(s) for n, s in zip(nomes, sufixos)], index=df.index)
+    tipos = pd.Series([n[:len(n) - len(s)] if t else n for n, s, t in zip(nomes, sufixos, tem_sufixo)],
+                      index=df.index)
+    # Tipos com dois dígitos iniciais ("01 CIVEL") ficam sem a numeração, que é gerada de novo
+    tipos = tipos.str.replace(r'^\d+\s+', '', regex=True)
+    repetidos = nomes.map(nomes.value_counts()) > 1
+
+    perfil = {
+        'colunas': list(bruto.columns),
+        'linhas_origem': len(bruto),
+        'tribunal': bruto['Tribunal'].mode().iloc[0],
+        'uf': bruto['UF'].mode().iloc[0],
+        'codigo_inicial': int(df['Codigo orgao'].max()) + 1,
+        'graus': _frequencias(df['Grau']),
+        'municipios': _frequencias(df['Municipio']),
+        'nomes': {
+            'proporcao_unicos': float(1 - repetidos.mean()),
+            'compartilhados': _frequencias(nomes[repetidos]),
+            'proporcao_com_municipio': float(tem_sufixo.mean()),
+        },
+        'por_grau': {},
+        'geral': _estatisticas(df[NUMERICAS]),
+        'variacoes': _limites_variacao(df),
+    }
+
+    for grau, indices in df.groupby('Grau').groups.items():
+        parte = df.loc[indices]
+        estatisticas = _estatisticas(parte[NUMERICAS]) if len(parte) >= MINIMO_LINHAS_GRAU else None
+        perfil['por_grau'][grau] = {
+            'tipos': _frequencias(tipos.loc[indices], limite=300),
+            'ausentes': {c: float(parte[c].isna().mean()) for c in COM_AUSENTES},
+            'numericas': estatisticas,
+        }
+    return perfil
+
+
+# === FORMATAÇÃO EM BYTES ===
+# Cada campo é uma matriz (linhas x largura) de uint8; bytes 0 são preenchimento e somem no final,
+# de modo que segmentos de tamanhos diferentes podem ser simplesmente concatenados lado a lado.
+
+def _vocabulario(textos):
+    codificados = [t.encode('utf-8') for t in textos]
+    largura = max([len(c) for c in codificados] + [1])
+    matriz = np.zeros((len(codificados), largura), dtype=np.uint8)
+    for i, c in enumerate(codificados):
+        matriz[i, :len(c)] = np.frombuffer(c, dtype=np.uint8)
+    return matriz
+
+
+def _constante(texto, n, mascara=None):
+    linha = np.frombuffer(texto.encode('utf-8'), dtype=np.uint8)
+    matriz = np.broadcast_to(linha, (n, len(linha))).copy()
+    if mascara is not None:
+        matriz[~mascara] = 0
+    return matriz
+
+
+# Inteiros não negativos, com ponto como separador de milhar ("4.700").
+# Os números são quebrados em grupos de três algarismos, convertidos por uma tabela '000'..'999'.
+_TRINCAS = np.frombuffer(''.join(f"{i:03d}" for i in range(1000)).encode(), dtype=np.uint8).reshape(1000, 3)
+
+
+def _inteiros(valores, milhar=True):
+    valores = np.asarray(valores, dtype=np.float64)
+    digitos = max(len(str(int(valores.max()))) if len(valores) else 1, 1)
+    grupos = -(-digitos // 3)
+    # Divisão em float64 (exata para estes inteiros) é bem mais rápida que a divisão inteira
+    quocientes = np.floor(valores[:, None] / 1000.0 ** np.arange(grupos - 1, -1, -1))
+    trincas = quocientes.copy()
+    trincas[:, 1:] -= 1000 * quocientes[:, :-1]
+    caracteres = _TRINCAS.view('S3').ravel()[trincas.astype(np.intp)].view(np.uint8)
+
+    # Zeros à esquerda viram preenchimento (mantendo ao menos o último algarismo)
+    significativo = valores[:, None] >= 10.0 ** np.arange(3 * grupos - 1, -1, -1)
+    significativo[:, -1] = True
+    caracteres = caracteres.reshape(len(valores), 3 * grupos) * significativo
+    if not milhar or grupos == 1:
+        return caracteres[:, 3 * grupos - digitos:]
+
+    saida = np.zeros((len(valores), 4 * grupos - 1), dtype=np.uint8)
+    for g in range(grupos):
+        saida[:, 4 * g:4 * g + 3] = caracteres[:, 3 * g:3 * g + 3]
+        if g:
+            saida[:, 4 * g - 1] = significativo[:, 3 * g - 1] * ord('.')
+    return saida
+
+
+# Percentual com uma casa decimal omitida quando zero ("-4,3%", "108%", "1.100%")
+def _percentual(valores, casas=1):
+    escala = 10 ** casas
+    inteiro_escalado = np.rint(np.abs(valores) * escala).astype(np.int64)
+    inteiro, decimal = inteiro_escalado // escala, inteiro_escalado % escala
+    negativo = (valores < 0) & (inteiro_escalado > 0)
+    partes = [np.where(negativo, ord('-'), 0).astype(np.uint8)[:, None], _inteiros(inteiro)]
+    if casas:
+        tem_decimal = decimal > 0
+        partes.append(_constante(',', len(valores), tem_decimal))
+        casas_txt = _inteiros(decimal, milhar=False)
+        casas_txt[~tem_decimal] = 0
+        partes.append(casas_txt)
+    partes.append(_constante('%', len(valores)))
+    return np.concatenate(partes, axis=1)
+
+
+# Durações como na base do CNJ: "8 anos e 5 meses", "1 ano", "1 Mes", "0 anos"
+def _duracao(meses_totais):
+    meses_totais = np.asarray(meses_totais, dtype=np.int64)
+    anos, meses = meses_totais // 12, meses_totais % 12
+    n = len(meses_totais)
+    mostra_anos = (anos > 0) | (meses == 0)
+    mostra_meses = meses > 0
+
+    anos_txt = _inteiros(anos, milhar=False)
+    anos_txt[~mostra_anos] = 0
+    meses_txt = _inteiros(meses, milhar=False)
+    meses_txt[~mostra_meses] = 0
+
+    sufixo_anos = _vocabulario([' anos', ' ano'])[(anos == 1).astype(np.int64)]
+    sufixo_anos[~mostra_anos] = 0
+    sufixo_meses = _vocabulario([' meses', ' Mes'])[(meses == 1).astype(np.int64)]
+    sufixo_meses[~mostra_meses] = 0
+    return np.concatenate([anos_txt, sufixo_anos, _constante(' e ', n, mostra_anos & mostra_meses),
+                           meses_txt, sufixo_meses], axis=1)
+
+
+def _ausente(campo, mascara):
+    campo[mascara] = 0
+    return campo
+
+
+# === SORTEIO DOS VALORES ===
+def _sortear_numericas(estatisticas, n, gerador):
+    correlacao = np.asarray(estatisticas['correlacao'])
+    # Garante matriz semidefinida positiva (correlações par a par podem não ser)
+    autovalores, autovetores = np.linalg.eigh(correlacao)
+    fator = autovetores * np.sqrt(np.clip(autovalores, 0, None))
+    uniformes = ndtr(gerador.standard_normal((n, len(correlacao))) @ fator.T)
+    # Interpolação linear entre quantis de níveis igualmente espaçados, todas as colunas de uma vez
+    quantis = np.asarray(estatisticas['quantis']).ravel()
+    posicao = uniformes * (len(NIVEIS_QUANTIS) - 1)
+    inferior = np.minimum(posicao.astype(np.intp), len(NIVEIS_QUANTIS) - 2)
+    fracao = posicao - inferior
+    inferior += np.arange(len(correlacao)) * len(NIVEIS_QUANTIS)
+    return quantis[inferior] + fracao * (quantis[inferior + 1] - quantis[inferior])
+
+
+def gerar_bloco(perfil, n, inicio, gerador):
+    graus = np.asarray(perfil['graus']['valores'])
+    codigos_grau = gerador.choice(len(graus), size=n, p=perfil['graus']['pesos'])
+    codigos_municipio = gerador.choice(len(perfil['municipios']['valores']), size=n, p=perfil['municipios']['pesos'])
+
+    valores = np.empty((n, len(NUMERICAS)))
+    ausentes = {c: np.zeros(n, dtype=bool) for c in COM_AUSENTES}
+    tipos = np.empty(n, dtype=np.int64)
+    vocab_tipos, deslocamento = [], 0
+    for g, grau in enumerate(graus):
+        linhas = np.flatnonzero(codigos_grau == g)
+        info = perfil['por_grau'][grau]
+        valores[linhas] = _sortear_numericas(info['numericas'] or perfil['geral'], len(linhas), gerador)
+        for coluna, taxa in info['ausentes'].items():
+            ausentes[coluna][linhas] = gerador.random(len(linhas)) < taxa
+        tipos[linhas] = deslocamento + gerador.choice(len(info['tipos']['valores']), size=len(linhas),
+                                                      p=info['tipos']['pesos'])
+        vocab_tipos += info['tipos']['valores']
+        deslocamento += len(info['tipos']['valores'])
+
+    numericas = dict(zip(NUMERICAS, valores.T))
+    contagens = {c: np.rint(numericas[c]).astype(np.int64) for c in COLUNAS_CONTAGEM}
+    # O acervo de 2024 segue a variação sorteada, limitada à faixa real para o porte do acervo de 2023
+    # (exceto quando 2023 é zero e a variação não existe). Perfis salvos antes dos limites não os têm.
+    for coluna, (antes, depois) in PARES_VARIACAO.items():
+        variacao = numericas[f"{coluna}_num"]
+        limites = perfil.get('variacoes', {}).get(coluna)
+        if limites:
+            faixa = np.searchsorted(limites['cortes'], contagens[antes], side='right')
+            variacao = np.clip(variacao, np.asarray(limites['minimo'])[faixa], np.asarray(limites['maximo'])[faixa])
+        seguinte = np.rint(contagens[antes] * (1 + variacao / 100)).astype(np.int64)
+        contagens[depois] = np.where(contagens[antes] > 0, seguinte, contagens[depois])
+    indices = inicio + np.arange(n)
+
+    # Nome do órgão: a maioria é única ("NN TIPO DE MUNICIPIO"); o resto repete nomes compartilhados
+    unico = gerador.random(n) < perfil['nomes']['proporcao_unicos']
+    com_municipio = gerador.random(n) < perfil['nomes']['proporcao_com_municipio']
+    municipios = _vocabulario(perfil['municipios']['valores'])[codigos_municipio]
+    nome_unico = np.concatenate([
+        _inteiros(indices + 1, milhar=False), _constante(' ', n),
+        _vocabulario(vocab_tipos)[tipos],
+        _constante(' DE ', n, com_municipio), np.where(com_municipio[:, None], municipios, 0).astype(np.uint8)
+    ], axis=1)
+    compartilhados = perfil['nomes']['compartilhados']
+    nome_compartilhado = _vocabulario(compartilhados['valores'])[
+        gerador.choice(len(compartilhados['valores']), size=n, p=compartilhados['pesos'])]
+    largura = max(nome_unico.shape[1], nome_compartilhado.shape[1])
+    nome = np.zeros((n, largura), dtype=np.uint8)
+    nome[unico, :nome_unico.shape[1]] = nome_unico[unico]
+    nome[~unico, :nome_compartilhado.shape[1]] = nome_compartilhado[~unico]
+
+    # Variações percentuais derivadas das contagens (ausentes quando a base de 2023 é zero)
+    def variacao(antes, depois):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(antes > 0, (depois / np.maximum(antes, 1) - 1) * 100, 0.0)
+
+    campos = {
+        'Tribunal': _constante(perfil['tribunal'], n),
+        'Codigo orgao': _inteiros(perfil['codigo_inicial'] + indices, milhar=False),
+        'Municipio': municipios,
+        'UF': _constante(perfil['uf'], n),
+        'Nome orgao': nome,
+        'Grau': _vocabulario(list(graus))[codigos_grau],
+        'TPSent_12_meses': _ausente(_duracao(np.rint(numericas['TPSent_12_meses_num'])),
+                                    ausentes['TPSent_12_meses']),
+        'TPCPL_Dec_2024': _ausente(_duracao(np.rint(numericas['TPCPL_Dec_2024_num'])),
+                                   ausentes['TPCPL_Dec_2024']),
+        'TC_Dec_2024': _ausente(_percentual(np.clip(np.rint(numericas['TC_Dec_2024_num']), 0, 100), casas=0),
+                                ausentes['TC_Dec_2024']),
+        'IAD_12_meses': _ausente(_percentual(np.rint(numericas['IAD_12_meses_num']), casas=0),
+                                 ausentes['IAD_12_meses']),
+    }
+    for coluna in COLUNAS_CONTAGEM:
+        campos[coluna] = _inteiros(contagens[coluna])
+    for coluna, (antes, depois) in PARES_VARIACAO.items():
+        campos[coluna] = _ausente(_percentual(variacao(contagens[antes], contagens[depois])), contagens[antes] == 0)
+
+    # Montagem das linhas: campos separados por ';' e terminados por '\n', sem os bytes de preenchimento
+    separador = np.full((n, 1), ord(';'), dtype=np.uint8)
+    partes = []
+    for i, coluna in enumerate(perfil['colunas']):
+        if i:
+            partes.append(separador)
+        partes.append(campos[coluna])
+    partes.append(np.full((n, 1), ord('\n'), dtype=np.uint8))
+    matriz = np.concatenate(partes, axis=1).ravel()
+    return matriz[matriz != 0].tobytes()
+
+
+# === SAÍDA ===
+# Cada bloco tem o próprio gerador aleatório (semente, número do bloco): o arquivo gerado é o mesmo
+# com qualquer número de processos
+def _gerar_bloco_numerado(tarefa):
+    perfil, indice, n, primeira, semente = tarefa
+    return gerar_bloco(perfil, n, primeira, np.random.default_rng([semente, indice]))
+
+
+# Grava em blocos: a memória usada depende do tamanho do bloco (e dos processos), não do total de linhas
+def gerar_csv(perfil, linhas, destino, linhas_por_bloco=50_000, semente=42, processos=None):
+    inicio = time.perf_counter()
+    tarefas = [(perfil, i, min(linhas_por_bloco, linhas - primeira), primeira, semente)
+               for i, primeira in enumerate(range(0, linhas, linhas_por_bloco))]
+    with open(destino, 'wb') as arquivo:
+        arquivo.write(('\ufeff' + ';'.join(perfil['colunas']) + '\n').encode('utf-8'))
+        if len(tarefas) > 1 and processos != 1:
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                for bloco in executor.map(_gerar_bloco_numerado, tarefas):
+                    arquivo.write(bloco)
+        else:
+            for tarefa in tarefas:
+                arquivo.write(_gerar_bloco_numerado(tarefa))
+    return time.perf_counter() - inicio
+
+
+# Base sintética em memória, lida como texto, no mesmo formato do read_csv da base original
+def gerar_dataframe(perfil, linhas, semente=42):
+    texto = ';'.join(perfil['colunas']).encode('utf-8') + b'\n' + _gerar_bloco_numerado((perfil, 0, linhas, 0, semente))
+    return pd.read_csv(io.BytesIO(texto), sep=";", dtype=str)
+
+
+def salvar_perfil(perfil, caminho):
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump(perfil, arquivo, ensure_ascii=False)
+
+
+def ler_perfil(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gerador de bases sintéticas no formato do DataJud")
+    parser.add_argument("--origem", default=CAMINHO_ORIGINAL, help="base real usada para aprender o perfil")
+    parser.add_argument("--perfil", default=None, help="perfil já aprendido (JSON), em vez da base real")
+    parser.add_argument("--aprender", default=None, help="apenas aprender o perfil e salvá-lo neste JSON")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--saida", default=None)
+    parser.add_argument("--blocos", type=int, default=50_000, help="linhas por bloco gravado")
+    parser.add_argument("--processos", type=int, default=None, help="processos geradores (padrão: todos os núcleos)")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    perfil = ler_perfil(args.perfil) if args.perfil else aprender_perfil(args.origem)
+    if args.aprender:
+        salvar_perfil(perfil, args.aprender)
+        print(f"Perfil salvo em {args.aprender}")
+    elif args.saida:
+        segundos = gerar_csv(perfil, args.linhas, args.saida, args.blocos, args.semente, args.processos)
+        print(f"{args.linhas} linhas geradas em {segundos:.2f} s ({args.linhas / segundos:,.0f} linhas/s)")
+    else:
+        parser.error("informe --saida ou --aprender")
@@ -0,0 +1,138 @@
+# === gradiente_histograma.py ===
+# Segundo modelo do projeto, ao lado da Random Forest: gradient boosting com histogramas
+# (HistGradientBoostingRegressor). Cada atributo é discretizado uma única vez em até max_bins faixas e as
+# divisões são procuradas sobre os histogramas das faixas, não sobre os valores ordenados; o custo por
+# iteração cresce com linhas x atributos, sem o fator "número de árvores completas" da floresta.
+# 'Nome orgao', 'Municipio' e 'Grau' entram como códigos categóricos nativos (CodificadorCategorias),
+# sem a passada de target encoding; as categorias menos frequentes além de max_bins - 1 viram "outros".
+# O número de iterações é decidido por parada antecipada numa fração de validação separada do treino.
+#
+# Exemplos:
+#   python gradiente_histograma.py
+#   python gradiente_histograma.py --iteracoes 500 --taxa 0.05 --arvores 200
+#   python gradiente_histograma.py --sem-memoria
+
+import argparse
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from base_dados import ALVO, VARIAVEIS_CATEGORICAS, VARIAVEIS_NUMERICAS
+from instrumentacao import instrumentar
+
+NOME_MODELO = "hgb_final"
+MAX_BINS = 255
+
+# Colunas do modelo: numéricas seguidas das categóricas (mesma ordem do artefato da Random Forest)
+COLUNAS_MODELO = VARIAVEIS_NUMERICAS + VARIAVEIS_CATEGORICAS
+MASCARA_CATEGORICAS = [False] * len(VARIAVEIS_NUMERICAS) + [True] * len(VARIAVEIS_CATEGORICAS)
+
+
+# Modelo com as categóricas marcadas pela posição (serve para DataFrame e para matriz numpy)
+def criar_modelo(semente=42, iteracoes=300, taxa=0.1, max_bins=MAX_BINS, validacao=0.1, paciencia=20):
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    return HistGradientBoostingRegressor(
+        max_iter=iteracoes,
+        learning_rate=taxa,
+        max_bins=max_bins,
+        categorical_features=MASCARA_CATEGORICAS,
+        early_stopping=True,
+        validation_fraction=validacao,
+        n_iter_no_change=paciencia,
+        random_state=semente,
+    )
+
+
+def criar_codificador(max_bins=MAX_BINS):
+    from codificacao import CodificadorCategorias
+    return CodificadorCategorias(max_categorias=max_bins - 1)
+
+
+# Matriz do modelo: numéricas como estão e categóricas como códigos do codificador já ajustado
+def montar_matriz(df, codificador):
+    return df[VARIAVEIS_NUMERICAS].join(codificador.transform(df[VARIAVEIS_CATEGORICAS]))[COLUNAS_MODELO]
+
+
+@instrumentar
+def ajustar(treino, semente=42, **parametros):
+    max_bins = parametros.get('max_bins', MAX_BINS)
+    codificador = criar_codificador(max_bins).fit(treino[VARIAVEIS_CATEGORICAS])
+    modelo = criar_modelo(semente, **parametros)
+    modelo.fit(montar_matriz(treino, codificador), treino[ALVO])
+    return codificador, modelo
+
+
+# === COMPARAÇÃO COM A RANDOM FOREST ===
+# Mesma divisão treino/teste para os dois modelos. O tempo e o pico de memória cobrem a preparação
+# das categóricas (target encoding ou códigos) e o ajuste, medidos como as etapas do benchmark.py:
+# a memória é o pico de RSS de um processo novo que faz só o ajuste daquele modelo ('pico_rss_mb') e
+# quanto ele passou do RSS com os dados já carregados ('aumento_pico_rss_mb').
+# A floresta usa target encoding fora da dobra no treino: com a codificação ajustada e aplicada nas
+# mesmas linhas, o modelo decora o alvo de 'Nome orgao' (quase um órgão por linha) e a comparação
+# mediria esse vazamento, não a diferença entre os modelos.
+def _ajuste_floresta(estado, opcoes):
+    from sklearn.ensemble import RandomForestRegressor
+
+    from codificacao import CodificadorAlvo
+
+    treino = estado['treino']
+    encoder = CodificadorAlvo()
+    X = treino[VARIAVEIS_NUMERICAS].join(encoder.fit_transform_oof(treino[VARIAVEIS_CATEGORICAS], treino[ALVO]))
+    modelo = RandomForestRegressor(n_estimators=opcoes['arvores'], random_state=opcoes['semente'], n_jobs=-1)
+    modelo.fit(X, treino[ALVO])
+    teste = estado['teste']
+    X_teste = teste[VARIAVEIS_NUMERICAS].join(encoder.transform(teste[VARIAVEIS_CATEGORICAS]))
+    return len(treino), {'previsto': modelo.predict(X_teste), 'iteracoes': opcoes['arvores']}
+
+
+def _ajuste_gradiente(estado, opcoes):
+    codificador, modelo = ajustar(estado['treino'], opcoes['semente'], iteracoes=opcoes['iteracoes'],
+                                  taxa=opcoes['taxa'])
+    return len(estado['treino']), {'previsto': modelo.predict(montar_matriz(estado['teste'], codificador)),
+                                   'iteracoes': modelo.n_iter_}
+
+
+def comparar(df, opcoes, teste=0.2, memoria=True):
+    from sklearn.model_selection import train_test_split
+
+    from benchmark import medir
+
+    treino, teste = train_test_split(df, test_size=teste, random_state=opcoes['semente'])
+    estado = {'treino': treino, 'teste': teste}
+    y = teste[ALVO].to_numpy(np.float64)
+    linhas = []
+    for nome, funcao in (('Random Forest (fora da dobra)', _ajuste_floresta),
+                         ('Gradient Boosting (histogramas)', _ajuste_gradiente)):
+        medida, saida = medir(funcao, estado, opcoes, memoria)
+        linhas.append({
+            'Modelo': nome,
+            'segundos': medida['segundos'],
+            'pico_rss_mb': medida.get('pico_rss_mb', np.nan),
+            'aumento_pico_rss_mb': medida.get('aumento_pico_rss_mb', np.nan),
+            'iteracoes': saida['iteracoes'],
+            'MAE': mean_absolute_error(y, saida['previsto']),
+            'RMSE': mean_squared_error(y, saida['previsto']) ** 0.5,
+            'R2': r2_score(y, saida['previsto']),
+        })
+    return pd.DataFrame(linhas)
+
+
+if __name__ == "__main__":
+    from base_dados import carregar_modelagem
+
+    parser = argparse.ArgumentParser(description="Gradient boosting com histogramas x Random Forest")
+    parser.add_argument("--arvores", type=int, default=100, help="árvores da Random Forest")
+    parser.add_argument("--iteracoes", type=int, default=300, help="máximo de iterações do boosting")
+    parser.add_argument("--taxa", type=float, default=0.1, help="taxa de aprendizado do boosting")
+    parser.add_argument("--teste", type=float, default=0.2)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--sem-memoria", action="store_true", help="não medir o pico de memória (RSS)")
+    args = parser.parse_args()
+
+    df = carregar_modelagem(categoricas=True)
+    opcoes = {'arvores': args.arvores, 'iteracoes': args.iteracoes, 'taxa': args.taxa, 'semente': args.semente}
+    resultado = comparar(df, opcoes, args.teste, memoria=not args.sem_memoria)
+    pd.set_option('display.width', 200)
+    print(f"\n{len(df)} linhas, divisão treino/teste {1 - args.teste:.0%}/{args.teste:.0%}:")
+    print(resultado.round(3).to_string(index=False))
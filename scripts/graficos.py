@@ -0,0 +1,265 @@
+# === graficos.py ===
+# Renderização em lote dos gráficos: especificações leves montadas a partir de dados já agregados,
+# desenhadas sem interface gráfica (backend Agg) em paralelo e puladas quando nada mudou
+
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from base_dados import hash_arquivo
+from instrumentacao import instrumentar
+
+PASTA_GRAFICOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "graficos")
+ARQUIVO_MANIFESTO = ".manifesto_graficos.json"
+
+# Versão do desenho: incrementar quando desenhar() mudar (estilos, dpi, tipos), para redesenhar tudo
+VERSAO_DESENHO = 2
+
+# Chamadas simultâneas de renderizar (ex.: etapas do pipeline em threads) não gravam o manifesto juntas
+_TRAVA_MANIFESTO = threading.Lock()
+
+
+# === MONTAGEM DAS ESPECIFICAÇÕES ===
+# Cada especificação é um dicionário serializável: tipo, arquivo, rótulos e os dados já reduzidos
+
+# Histograma com curva de densidade, calculados aqui para enviar só contagens ao processo de desenho
+def espec_histograma(valores, arquivo, titulo, xlabel, ylabel='Frequência', bins=30, cor=None, kde=True):
+    valores = pd.Series(valores, dtype='float64').dropna().to_numpy()
+    contagens, bordas = np.histogram(valores, bins=bins)
+    espec = {
+        'tipo': 'histograma', 'arquivo': arquivo, 'titulo': titulo, 'xlabel': xlabel, 'ylabel': ylabel,
+        'cor': cor, 'contagens': contagens.tolist(), 'bordas': bordas.tolist()
+    }
+    if kde and len(valores) > 1:
+        espec['kde_x'], espec['kde_y'] = _kde_binado(valores, bordas)
+    return espec
+
+
+# Densidade gaussiana (banda de Scott) sobre uma grade fina, via convolução do histograma;
+# custo proporcional ao tamanho da grade, não ao número de linhas
+def _kde_binado(valores, bordas, pontos=512):
+    desvio = valores.std(ddof=1)
+    banda = 1.06 * desvio * len(valores) ** (-1 / 5) if desvio > 0 else 1.0
+    grade = np.linspace(bordas[0] - 3 * banda, bordas[-1] + 3 * banda, pontos)
+    passo = grade[1] - grade[0]
+    fina, _ = np.histogram(valores, bins=np.append(grade - passo / 2, grade[-1] + passo / 2))
+    meio = int(np.ceil(4 * banda / passo))
+    nucleo = np.exp(-0.5 * (np.arange(-meio, meio + 1) * passo / banda) ** 2)
+    densidade = np.convolve(fina, nucleo / nucleo.sum(), mode='same')
+    # Escala da curva igual à das contagens do histograma (como o kde=True do seaborn)
+    largura = bordas[1] - bordas[0]
+    return grade.tolist(), (densidade * largura / passo).tolist()
+
+
+# Mapa de calor a partir de uma matriz (ex.: correlações)
+def espec_mapa_calor(matriz, arquivo, titulo, cmap='coolwarm'):
+    return {
+        'tipo': 'mapa_calor', 'arquivo': arquivo, 'titulo': titulo, 'cmap': cmap,
+        'linhas': [str(i) for i in matriz.index], 'colunas': [str(c) for c in matriz.columns],
+        'valores': matriz.to_numpy(dtype='float64').tolist()
+    }
+
+
+# Boxplot a partir das estatísticas de cada grupo (mediana, quartis, bigodes e outliers), tiradas dos
+# resumos de quantis de quantis.py: exatas para grupos pequenos, aproximadas com erro limitado nos grandes
+def estatisticas_boxplot(df, grupo, valor, ordem=None):
+    from quantis import estatisticas_boxplot as estatisticas, resumos_por_grupo
+
+    return estatisticas(resumos_por_grupo(df, grupo, valor), ordem)
+
+
+def espec_boxplot(estatisticas, arquivo, titulo, xlabel, ylabel, rotacao=0, figsize=(8, 5)):
+    return {
+        'tipo': 'boxplot', 'arquivo': arquivo, 'titulo': titulo, 'xlabel': xlabel, 'ylabel': ylabel,
+        'estatisticas': estatisticas, 'rotacao': rotacao, 'figsize': list(figsize)
+    }
+
+
+# Barras horizontais (rankings e importâncias) a partir de uma Series já ordenada
+def espec_barras(serie, arquivo, titulo, xlabel, ylabel=None, cor=None, figsize=(10, 5)):
+    return {
+        'tipo': 'barras', 'arquivo': arquivo, 'titulo': titulo, 'xlabel': xlabel, 'ylabel': ylabel,
+        'cor': cor, 'rotulos': [str(i) for i in serie.index], 'valores': serie.astype('float64').tolist(),
+        'figsize': list(figsize)
+    }
+
+
+# Barras verticais simples (ex.: tempo médio por grau, R² por modelo)
+def espec_colunas(serie, arquivo, titulo, xlabel, ylabel, ylim=None, figsize=(6, 4)):
+    return {
+        'tipo': 'colunas', 'arquivo': arquivo, 'titulo': titulo, 'xlabel': xlabel, 'ylabel': ylabel,
+        'rotulos': [str(i) for i in serie.index], 'valores': serie.astype('float64').tolist(),
+        'ylim': list(ylim) if ylim else None, 'figsize': list(figsize)
+    }
+
+
+# Dispersão entre duas colunas, opcionalmente colorida por grupo
+def espec_dispersao(df, x, y, arquivo, titulo, xlabel, ylabel, grupo=None, figsize=(8, 5)):
+    colunas = [x, y] + ([grupo] if grupo else [])
+    dados = df[colunas].dropna()
+    espec = {
+        'tipo': 'dispersao', 'arquivo': arquivo, 'titulo': titulo, 'xlabel': xlabel, 'ylabel': ylabel,
+        'x': dados[x].astype('float64').tolist(), 'y': dados[y].astype('float64').tolist(),
+        'figsize': list(figsize)
+    }
+    if grupo:
+        espec['grupo'] = dados[grupo].astype(str).tolist()
+        espec['titulo_legenda'] = 'Grau de Jurisdição' if grupo == 'Grau' else grupo
+    return espec
+
+
+# === HASH E MANIFESTO ===
+# O mesmo espec desenhado por outro código ou outra versão das bibliotecas gera outro PNG: a versão do
+# desenho e as versões do matplotlib e do seaborn entram no hash (lidas sem importar as bibliotecas)
+@functools.lru_cache(maxsize=1)
+def assinatura_desenho():
+    from importlib.metadata import PackageNotFoundError, version
+
+    assinatura = {'versao': VERSAO_DESENHO}
+    for pacote in ('matplotlib', 'seaborn'):
+        try:
+            assinatura[pacote] = version(pacote)
+        except PackageNotFoundError:
+            assinatura[pacote] = None
+    return assinatura
+
+
+def hash_espec(espec):
+    conteudo = json.dumps({'espec': espec, 'desenho': assinatura_desenho()}, sort_keys=True,
+                          ensure_ascii=False, default=str)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+# Entrada do manifesto ainda válida: mesmo hash de espec e o PNG no disco é o que foi desenhado aqui
+# (um PNG sobrescrito por outro script tem outro sha256 e é redesenhado)
+def _atualizado(entrada, h, destino):
+    return (isinstance(entrada, dict) and entrada.get('espec') == h and os.path.exists(destino)
+            and entrada.get('png') == hash_arquivo(destino))
+
+
+def _ler_manifesto(pasta):
+    caminho = os.path.join(pasta, ARQUIVO_MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+# Junta os hashes novos ao manifesto que está no disco (outra renderização pode tê-lo atualizado
+# depois da nossa leitura) e grava num temporário, trocado de uma vez: nunca fica um JSON pela metade
+def _gravar_manifesto(pasta, novos):
+    caminho = os.path.join(pasta, ARQUIVO_MANIFESTO)
+    with _TRAVA_MANIFESTO:
+        manifesto = _ler_manifesto(pasta)
+        manifesto.update(novos)
+        temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump(manifesto, arquivo, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temporario, caminho)
+
+
+# === DESENHO (EXECUTADO NOS PROCESSOS DE TRABALHO) ===
+@instrumentar
+def desenhar(espec, destino):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    tipo = espec['tipo']
+    fig, ax = plt.subplots(figsize=espec.get('figsize', (10, 6)))
+
+    if tipo == 'histograma':
+        bordas = np.asarray(espec['bordas'])
+        ax.hist(bordas[:-1], bins=bordas, weights=espec['contagens'],
+                color=espec.get('cor') or 'C0', alpha=0.6, edgecolor='white')
+        if 'kde_x' in espec:
+            ax.plot(espec['kde_x'], espec['kde_y'], color=espec.get('cor') or 'C0')
+            ax.set_xlim(bordas[0], bordas[-1])
+    elif tipo == 'mapa_calor':
+        import seaborn as sns
+        matriz = pd.DataFrame(espec['valores'], index=espec['linhas'], columns=espec['colunas'])
+        sns.heatmap(matriz, cmap=espec['cmap'], annot=False, ax=ax)
+    elif tipo == 'boxplot':
+        ax.bxp(espec['estatisticas'], patch_artist=True)
+        ax.tick_params(axis='x', labelrotation=espec.get('rotacao', 0))
+    elif tipo == 'barras':
+        ax.barh(espec['rotulos'], espec['valores'], color=espec.get('cor'))
+        ax.invert_yaxis()
+    elif tipo == 'colunas':
+        ax.bar(espec['rotulos'], espec['valores'])
+        if espec.get('ylim'):
+            ax.set_ylim(*espec['ylim'])
+    elif tipo == 'dispersao':
+        if 'grupo' in espec:
+            grupos = pd.Series(espec['grupo'])
+            cores = plt.get_cmap('Set2')
+            for i, nome in enumerate(sorted(grupos.unique())):
+                marcar = (grupos == nome).to_numpy()
+                ax.scatter(np.asarray(espec['x'])[marcar], np.asarray(espec['y'])[marcar],
+                           color=cores(i % 8), alpha=0.7, label=nome, s=15)
+            ax.legend(title=espec.get('titulo_legenda'))
+        else:
+            ax.scatter(espec['x'], espec['y'], s=15)
+    else:
+        raise ValueError(f"Tipo de gráfico desconhecido: {tipo}")
+
+    ax.set_title(espec['titulo'])
+    if espec.get('xlabel'):
+        ax.set_xlabel(espec['xlabel'])
+    if espec.get('ylabel'):
+        ax.set_ylabel(espec['ylabel'])
+    fig.tight_layout()
+    fig.savefig(destino, dpi=espec.get('dpi', 150))
+    plt.close(fig)
+    return destino
+
+
+def _desenhar_tarefa(argumentos):
+    espec, destino = argumentos
+    return desenhar(espec, destino)
+
+
+# Processos de trabalho sem fork: um fork feito enquanto outra thread está dentro do matplotlib
+# herda travas presas e o processo filho trava para sempre
+def _contexto_processos():
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+
+
+# === RENDERIZAÇÃO EM LOTE ===
+# Desenha apenas os gráficos cujo hash (dados + especificação + desenho) mudou ou cujo PNG não existe
+# ou não é mais o desenhado por aqui
+@instrumentar
+def renderizar(especs, pasta=PASTA_GRAFICOS, processos=None, forcar=False):
+    os.makedirs(pasta, exist_ok=True)
+    manifesto = _ler_manifesto(pasta)
+
+    pendentes = []
+    for espec in especs:
+        destino = os.path.join(pasta, espec['arquivo'])
+        h = hash_espec(espec)
+        if not forcar and _atualizado(manifesto.get(espec['arquivo']), h, destino):
+            continue
+        pendentes.append((espec, destino, h))
+
+    if len(pendentes) > 1 and processos != 1:
+        with ProcessPoolExecutor(max_workers=processos, mp_context=_contexto_processos()) as executor:
+            list(executor.map(_desenhar_tarefa, [(e, d) for e, d, _ in pendentes]))
+    else:
+        for espec, destino, _ in pendentes:
+            desenhar(espec, destino)
+
+    _gravar_manifesto(pasta, {espec['arquivo']: {'espec': h, 'png': hash_arquivo(destino)}
+                              for espec, destino, h in pendentes})
+
+    return {
+        'desenhados': [e['arquivo'] for e, _, _ in pendentes],
+        'pulados': len(especs) - len(pendentes)
+    }
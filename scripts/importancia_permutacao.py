@@ -0,0 +1,261 @@
+# === importancia_permutacao.py ===
+# Importância por permutação: quanto a métrica piora quando uma coluna (ou um grupo de colunas,
+# embaralhadas com a mesma permutação de linhas) perde a relação com o alvo. Ao contrário da
+# importância por impureza (feature_importances_), não favorece colunas de alta cardinalidade como o
+# 'Nome orgao' codificado, e vale para qualquer modelo.
+# Cada par (grupo, repetição) é uma tarefa independente num pool de processos. X, y e o modelo são
+# gravados uma única vez e abertos com memory map em cada processo, como em comparacao_modelos.py;
+# a Random Forest é avaliada pela floresta compilada (floresta_compilada.py) em lotes pequenos e pelo
+# predict do sklearn nos grandes, como em artefato_modelo.prever. O resultado fica em cache, com a
+# chave formada pelo hash do modelo, dos dados e da configuração.
+#
+# Exemplos:
+#   python importancia_permutacao.py
+#   python importancia_permutacao.py --modelo hgb --repeticoes 10 --juntar-categoricas
+#   python importancia_permutacao.py --metrica MAE --processos 4
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, r2_score
+
+from base_dados import PASTA_CACHE, VARIAVEIS_CATEGORICAS
+from instrumentacao import instrumentar
+
+PASTA_CACHE_IMPORTANCIA = os.path.join(PASTA_CACHE, "importancia")
+
+# Métrica -> (função, sinal): importância = sinal * (métrica embaralhada - métrica original), positiva
+# quando embaralhar piora o modelo
+METRICAS = {
+    'R2': (r2_score, -1),
+    'MAE': (mean_absolute_error, 1),
+}
+
+
+# Um grupo por coluna, mais os grupos pedidos em 'juntar' ({nome: [colunas]}), permutados em bloco
+def montar_grupos(colunas, juntar=None):
+    grupos = {coluna: [coluna] for coluna in colunas}
+    for nome, membros in (juntar or {}).items():
+        faltando = set(membros) - set(colunas)
+        if faltando:
+            raise ValueError(f"Colunas do grupo '{nome}' ausentes da matriz: {sorted(faltando)}")
+        grupos[nome] = list(membros)
+    return grupos
+
+
+# === CHAVE DO CACHE ===
+# Modelo: os arrays da floresta compilada (o que de fato define as previsões) ou o pickle do modelo
+def hash_modelo(modelo, floresta=None):
+    h = hashlib.sha256(type(modelo).__name__.encode('utf-8'))
+    if floresta is not None:
+        for campo in ('atributo', 'limiar', 'esquerda', 'direita', 'faltante_esquerda', 'valor', 'raizes'):
+            h.update(np.ascontiguousarray(floresta[campo]).tobytes())
+    else:
+        h.update(pickle.dumps(modelo, protocol=pickle.HIGHEST_PROTOCOL))
+    return h.hexdigest()[:16]
+
+
+def hash_matriz(X, y, colunas):
+    h = hashlib.sha256(json.dumps(list(colunas)).encode('utf-8'))
+    h.update(np.ascontiguousarray(X).tobytes())
+    h.update(np.ascontiguousarray(y).tobytes())
+    return h.hexdigest()[:16]
+
+
+def _ler(caminho):
+    with open(caminho, 'rb') as arquivo:
+        return pickle.load(arquivo)
+
+
+def _gravar(caminho, objeto):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as arquivo:
+        pickle.dump(objeto, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+
+
+# === DADOS COMPARTILHADOS ===
+# Em cada processo do pool: X e y mapeados do disco e o caminho de previsão (floresta compilada ou modelo)
+_DADOS = {}
+
+
+def _gravar_dados(pasta, X, y, modelo, floresta, configuracao):
+    import joblib
+
+    import floresta_compilada
+
+    np.save(os.path.join(pasta, "X.npy"), X)
+    np.save(os.path.join(pasta, "y.npy"), y)
+    if floresta is not None:
+        floresta_compilada.salvar(floresta, pasta)
+        configuracao = {**configuracao, 'profundidade': floresta['profundidade'],
+                        'n_atributos': floresta['n_atributos']}
+    else:
+        joblib.dump(modelo, os.path.join(pasta, "modelo.joblib"), compress=0)
+    with open(os.path.join(pasta, "configuracao.json"), 'w', encoding='utf-8') as arquivo:
+        json.dump(configuracao, arquivo)
+
+
+def _abrir_dados(pasta):
+    import floresta_compilada
+
+    with open(os.path.join(pasta, "configuracao.json"), encoding='utf-8') as arquivo:
+        configuracao = json.load(arquivo)
+    _DADOS.update(configuracao)
+    _DADOS['X'] = np.load(os.path.join(pasta, "X.npy"), mmap_mode='r')
+    _DADOS['y'] = np.load(os.path.join(pasta, "y.npy"), mmap_mode='r')
+    if 'profundidade' in configuracao:
+        _DADOS['floresta'] = floresta_compilada.carregar(pasta, configuracao['profundidade'],
+                                                         configuracao['n_atributos'])
+    else:
+        import joblib
+        _DADOS['modelo'] = joblib.load(os.path.join(pasta, "modelo.joblib"), mmap_mode='r')
+
+
+def _prever(X):
+    if 'floresta' in _DADOS:
+        import floresta_compilada
+        return floresta_compilada.prever(_DADOS['floresta'], X)
+    modelo = _DADOS['modelo']
+    # Modelos ajustados com nomes de colunas recebem o mesmo formato, para evitar avisos
+    if hasattr(modelo, 'feature_names_in_'):
+        X = pd.DataFrame(X, columns=_DADOS['colunas'])
+    return modelo.predict(X)
+
+
+def _pontuar(X):
+    funcao, _ = METRICAS[_DADOS['metrica']]
+    return funcao(_DADOS['y'], _prever(X))
+
+
+# Uma tarefa: as colunas do grupo recebem a permutação de linhas da repetição (a mesma para todos os
+# grupos, reproduzível pela semente); as demais colunas ficam como estão
+def _permutar(tarefa):
+    indices, repeticao = tarefa
+    X = np.array(_DADOS['X'])
+    ordem = np.random.default_rng([_DADOS['semente'], repeticao]).permutation(len(X))
+    X[:, indices] = X[np.ix_(ordem, indices)]
+    return _pontuar(X)
+
+
+def _referencia(_):
+    return _pontuar(np.asarray(_DADOS['X']))
+
+
+# === IMPORTÂNCIA ===
+# X: DataFrame (ou matriz com 'colunas'); grupos: {nome: [colunas]} (padrão: uma coluna por grupo).
+# Devolve {'referencia': métrica sem permutação, 'importancias': grupos x repetições,
+# 'tabela': média e desvio por grupo, da maior para a menor}.
+@instrumentar
+def importancia_permutacao(modelo, X, y, grupos=None, repeticoes=5, metrica='R2', semente=42, processos=None,
+                           colunas=None, floresta=None, usar_cache=True, verbose=False):
+    from artefato_modelo import LIMITE_COMPILADA
+
+    colunas = list(X.columns) if isinstance(X, pd.DataFrame) else list(colunas)
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float64))
+    y = np.ascontiguousarray(np.asarray(y, dtype=np.float64))
+    grupos = grupos or montar_grupos(colunas)
+    if metrica not in METRICAS:
+        raise ValueError(f"Métrica desconhecida: {metrica} (opções: {list(METRICAS)})")
+
+    # Floresta compilada só onde ela é mais rápida que o predict do sklearn
+    if len(X) > LIMITE_COMPILADA:
+        floresta = None
+    elif floresta is None and hasattr(modelo, 'estimators_'):
+        import floresta_compilada
+        floresta = floresta_compilada.compilar(modelo)
+
+    configuracao = {'colunas': colunas, 'metrica': metrica, 'semente': semente}
+    chave = json.dumps({'modelo': hash_modelo(modelo, floresta), 'dados': hash_matriz(X, y, colunas),
+                        'grupos': grupos, 'repeticoes': repeticoes, **configuracao}, sort_keys=True)
+    caminho = os.path.join(PASTA_CACHE_IMPORTANCIA, hashlib.sha256(chave.encode('utf-8')).hexdigest()[:16] + ".pkl")
+    if usar_cache and os.path.exists(caminho):
+        if verbose:
+            print(f"Importância por permutação lida do cache: {caminho}")
+        return _ler(caminho)
+
+    inicio = time.perf_counter()
+    posicoes = {coluna: j for j, coluna in enumerate(colunas)}
+    tarefas = [([posicoes[c] for c in membros], r) for membros in grupos.values() for r in range(repeticoes)]
+    with tempfile.TemporaryDirectory(prefix="importancia_") as pasta:
+        _gravar_dados(pasta, X, y, modelo, floresta, configuracao)
+        if processos == 1:
+            _abrir_dados(pasta)
+            referencia = _referencia(None)
+            pontos = [_permutar(t) for t in tarefas]
+            _DADOS.clear()
+        else:
+            # Poucos lotes de tarefas por processo: cada tarefa é só uma previsão
+            lote = max(1, len(tarefas) // (4 * (processos or os.cpu_count() or 1)))
+            with ProcessPoolExecutor(max_workers=processos, initializer=_abrir_dados, initargs=(pasta,)) as executor:
+                futuro = executor.submit(_referencia, None)
+                pontos = list(executor.map(_permutar, tarefas, chunksize=lote))
+                referencia = futuro.result()
+
+    _, sinal = METRICAS[metrica]
+    importancias = pd.DataFrame(sinal * (np.reshape(pontos, (len(grupos), repeticoes)) - referencia),
+                                index=pd.Index(list(grupos), name='grupo'))
+    tabela = pd.DataFrame({'importancia': importancias.mean(axis=1), 'desvio': importancias.std(axis=1, ddof=0),
+                           'colunas': [len(m) for m in grupos.values()]})
+    resultado = {'referencia': float(referencia), 'metrica': metrica, 'colunas': colunas, 'importancias': importancias,
+                 'tabela': tabela.sort_values('importancia', ascending=False, kind='stable'),
+                 'segundos': time.perf_counter() - inicio}
+    if usar_cache:
+        _gravar(caminho, resultado)
+    if verbose:
+        print(f"Importância por permutação: {len(tarefas)} previsões em {resultado['segundos']:.2f} s")
+    return resultado
+
+
+# Importância por impureza e por permutação lado a lado (a impureza só existe por coluna)
+def comparar_importancias(modelo, resultado):
+    tabela = resultado['tabela'][['importancia', 'desvio']].rename(
+        columns={'importancia': f"permutacao_{resultado['metrica']}", 'desvio': 'permutacao_desvio'})
+    if hasattr(modelo, 'feature_importances_'):
+        tabela = tabela.join(pd.Series(modelo.feature_importances_, index=resultado['colunas'], name='impureza'))
+    return tabela
+
+
+if __name__ == "__main__":
+    from sklearn.model_selection import train_test_split
+
+    from artefato_modelo import NOME_MODELO, carregar_artefato, montar_matriz
+    from base_dados import ALVO, carregar_modelagem
+
+    parser = argparse.ArgumentParser(description="Importância por permutação do modelo salvo, em paralelo")
+    parser.add_argument("--modelo", choices=["rf", "hgb"], default="rf", help="artefato a usar")
+    parser.add_argument("--versao", type=int, default=None)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--metrica", choices=list(METRICAS), default='R2')
+    parser.add_argument("--juntar-categoricas", action="store_true",
+                        help="permutar também as categóricas codificadas juntas, como um grupo")
+    parser.add_argument("--processos", type=int, default=None, help="processos do pool (padrão: todos os núcleos)")
+    # Mesma divisão do 'cli.py treinar' (padrões iguais), para medir no teste que o modelo não viu
+    parser.add_argument("--teste", type=float, default=0.2)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--sem-cache", action="store_true")
+    args = parser.parse_args()
+
+    if args.modelo == 'hgb':
+        from gradiente_histograma import NOME_MODELO
+    artefato = carregar_artefato(args.versao, NOME_MODELO, mmap=False)
+    _, teste = train_test_split(carregar_modelagem(categoricas=True), test_size=args.teste, random_state=args.semente)
+    colunas = artefato['metadados']['colunas_modelo']
+    X = pd.DataFrame(montar_matriz(artefato, teste), columns=colunas)
+    juntar = {'categóricas': VARIAVEIS_CATEGORICAS} if args.juntar_categoricas else None
+
+    resultado = importancia_permutacao(artefato['modelo'], X, teste[ALVO], montar_grupos(colunas, juntar),
+                                       args.repeticoes, args.metrica, args.semente, args.processos,
+                                       floresta=artefato['floresta'], usar_cache=not args.sem_cache, verbose=True)
+    pd.set_option('display.width', 200)
+    print(f"\n{args.metrica} sem permutação: {resultado['referencia']:.3f} ({len(X)} linhas de teste)")
+    print(comparar_importancias(artefato['modelo'], resultado).round(4).to_string())
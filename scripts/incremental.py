@@ -0,0 +1,221 @@
+# === incremental.py ===
+# Tratamento incremental de novos extratos do DataJud, com cada linha identificada pelo 'Codigo orgao'.
+# Cada linha da base original tem um hash do seu conteúdo. Comparando com os hashes do extrato anterior,
+# separamos os órgãos inseridos, alterados, removidos e inalterados, e só os inseridos e alterados
+# passam pela conversão e pelo tratamento. A base tratada é regravada copiando o texto das linhas
+# inalteradas. Os agregados por órgão, município e grau (linhas, contagem, soma e soma dos
+# quadrados do alvo) recebem só a diferença: saem as contribuições antigas e entram as novas.
+#
+# Exemplos:
+#   python incremental.py
+#   python incremental.py --origem ../dados/tjsp_processos_sp_2025_01.csv
+#   python incremental.py --refazer
+
+import argparse
+import io
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from base_dados import ALVO, CAMINHO_ORIGINAL, CAMINHO_TRATADO, PASTA_CACHE, TIPOS_TEXTO, hash_arquivo
+from instrumentacao import instrumentar
+
+PASTA_INCREMENTAL = os.path.join(PASTA_CACHE, "incremental")
+CHAVE = 'Codigo orgao'
+CHAVES_AGREGADOS = ['Nome orgao', 'Municipio', 'Grau']
+SOMAS = ['linhas', 'contagem', 'soma', 'soma_quadrados']
+
+
+def caminho_estado(destino=CAMINHO_TRATADO):
+    nome = os.path.splitext(os.path.basename(destino))[0]
+    return os.path.join(PASTA_INCREMENTAL, f"{nome}.pkl")
+
+
+# Estado do último extrato: hash de cada órgão, agregados e o hash do arquivo tratado que ele descreve.
+# Se a base tratada foi regravada por outro caminho (tratamento completo), o estado não vale mais.
+def ler_estado(destino=CAMINHO_TRATADO):
+    caminho = caminho_estado(destino)
+    if not os.path.exists(caminho) or not os.path.exists(destino):
+        return None
+    with open(caminho, 'rb') as arquivo:
+        estado = pickle.load(arquivo)
+    if estado['sha256_tratado'] != hash_arquivo(destino):
+        return None
+    return estado
+
+
+def _gravar_estado(estado, destino):
+    caminho = caminho_estado(destino)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as arquivo:
+        pickle.dump(estado, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+
+
+# === LINHAS DOS ARQUIVOS ===
+# Os dois arquivos são tratados como listas de linhas de texto: só as linhas do delta são interpretadas
+# pelo read_csv, e as linhas tratadas inalteradas são copiadas sem passar de novo pela formatação.
+# Exige uma linha física por registro (sem quebras de linha dentro de campos entre aspas).
+def ler_linhas(caminho, encoding='utf-8'):
+    with open(caminho, encoding=encoding, newline='') as arquivo:
+        linhas = arquivo.readlines()
+    if linhas and not linhas[-1].endswith(('\n', '\r')):
+        linhas[-1] += '\n'
+    chaves = pd.read_csv(caminho, sep=";", usecols=[CHAVE], dtype=str, encoding=encoding)[CHAVE]
+    if len(chaves) != len(linhas) - 1:
+        raise ValueError(f"{caminho}: {len(linhas) - 1} linhas para {len(chaves)} registros "
+                         "(campos com quebra de linha não são suportados)")
+    chaves = pd.to_numeric(chaves, errors='coerce').astype('Int64')
+    if chaves.isna().any():
+        raise ValueError(f"{caminho}: {int(chaves.isna().sum())} linhas sem '{CHAVE}' válido")
+    if not chaves.is_unique:
+        repetidos = chaves[chaves.duplicated()].unique().tolist()[:5]
+        raise ValueError(f"{caminho}: '{CHAVE}' repetido (ex.: {repetidos})")
+    return linhas[0], np.array(linhas[1:], dtype=object), pd.Index(chaves.to_numpy(np.int64), name=CHAVE)
+
+
+# Interpretar um subconjunto de linhas com o cabeçalho do arquivo
+def interpretar(cabecalho, linhas, **kwargs):
+    return pd.read_csv(io.StringIO(cabecalho + ''.join(linhas)), sep=";", **kwargs)
+
+
+# Hash de cada linha da base original, indexado pelo órgão
+def hashes_linhas(linhas, chaves):
+    return pd.Series(pd.util.hash_array(linhas), index=chaves)
+
+
+# Órgãos inseridos, alterados, removidos e inalterados entre dois conjuntos de hashes
+def comparar_hashes(anteriores, atuais):
+    comuns = atuais.index.intersection(anteriores.index)
+    iguais = atuais[comuns].to_numpy() == anteriores[comuns].to_numpy()
+    return {
+        'inseridos': atuais.index.difference(anteriores.index),
+        'alterados': comuns[~iguais],
+        'removidos': anteriores.index.difference(atuais.index),
+        'inalterados': comuns[iguais],
+    }
+
+
+# === AGREGADOS SOMÁVEIS ===
+# Contribuição de um conjunto de linhas tratadas: somas por grupo, que podem ser somadas e subtraídas
+def contribuicoes(df, chave, valor=ALVO):
+    valores = df[valor].to_numpy(dtype=np.float64)
+    validos = ~np.isnan(valores)
+    tabela = pd.DataFrame({
+        chave: df[chave].to_numpy(),
+        'linhas': 1,
+        'contagem': validos.astype(np.int64),
+        'soma': np.where(validos, valores, 0.0),
+        'soma_quadrados': np.where(validos, valores ** 2, 0.0),
+    })
+    return tabela.groupby(chave, sort=False)[SOMAS].sum()
+
+
+def _atualizar_somas(atual, saem, entram):
+    resultado = atual.sub(saem, fill_value=0).add(entram, fill_value=0)
+    resultado = resultado[resultado['linhas'] > 0]
+    resultado[['linhas', 'contagem']] = resultado[['linhas', 'contagem']].round().astype(np.int64)
+    return resultado
+
+
+# Resumo no formato de agregacao.agregar (sem quantis, que não são somáveis)
+def resumo_agregado(somas):
+    contagem = somas['contagem'].to_numpy(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = somas['soma'].to_numpy() / contagem
+        variancia = (somas['soma_quadrados'].to_numpy() - contagem * media ** 2) / (contagem - 1)
+    desvio = np.sqrt(np.maximum(variancia, 0))
+    desvio[contagem < 2] = np.nan
+    return pd.DataFrame({'linhas': somas['linhas'], 'contagem': somas['contagem'], 'soma': somas['soma'],
+                         'media': media, 'desvio': desvio}, index=somas.index)
+
+
+# Agregados salvos pelo último tratamento incremental: {chave: resumo}
+def carregar_agregados(destino=CAMINHO_TRATADO):
+    estado = ler_estado(destino)
+    if estado is None:
+        raise FileNotFoundError(f"Sem agregados incrementais válidos para {destino}; rode incremental.py")
+    return {chave: resumo_agregado(somas) for chave, somas in estado['agregados'].items()}
+
+
+# === ATUALIZAÇÃO ===
+@instrumentar
+def atualizar(origem=CAMINHO_ORIGINAL, destino=CAMINHO_TRATADO, refazer=False):
+    from carregamento import converter_tipos, tratar_ausentes
+
+    inicio = time.perf_counter()
+    cabecalho_bruto, linhas_brutas, chaves = ler_linhas(origem, encoding="utf-8-sig")
+    hashes = hashes_linhas(linhas_brutas, chaves)
+    estado = None if refazer else ler_estado(destino)
+    # Outro cabeçalho na origem (colunas novas ou reordenadas) muda todas as linhas tratadas
+    if estado is not None and estado['cabecalho_origem'] != cabecalho_bruto:
+        estado = None
+    anteriores = hashes.iloc[:0] if estado is None else estado['hashes']
+    delta = comparar_hashes(anteriores, hashes)
+
+    # Só os órgãos novos ou alterados são convertidos e tratados
+    processar = chaves.isin(delta['inseridos'].union(delta['alterados']))
+    novos = tratar_ausentes(converter_tipos(interpretar(cabecalho_bruto, linhas_brutas[processar], dtype=str)))
+    texto_novos = novos.to_csv(None, sep=";", index=False)
+    cabecalho = texto_novos[:texto_novos.index('\n') + 1]
+    linhas_novas = np.array(texto_novos.splitlines(keepends=True)[1:], dtype=object)
+    chaves_novas = novos[CHAVE].to_numpy(np.int64)
+
+    if estado is None:
+        saem = None
+        linhas, chaves_linhas = linhas_novas, chaves_novas
+    else:
+        _, linhas_anteriores, chaves_anteriores = ler_linhas(destino)
+        # Linhas tratadas que deixam de valer: órgãos removidos e versões antigas dos alterados
+        mantidas = chaves_anteriores.isin(delta['inalterados'])
+        saem = interpretar(cabecalho, linhas_anteriores[~mantidas], dtype={coluna: str for coluna in TIPOS_TEXTO})
+        linhas = np.concatenate([linhas_anteriores[mantidas], linhas_novas])
+        chaves_linhas = np.concatenate([chaves_anteriores[mantidas].to_numpy(), chaves_novas])
+
+    # Mesma ordem de linhas do extrato atual, como num tratamento completo
+    ordem = np.argsort(chaves.get_indexer(chaves_linhas), kind='stable')
+    temporario = destino + ".tmp"
+    with open(temporario, 'w', encoding='utf-8', newline='') as arquivo:
+        arquivo.write(cabecalho)
+        arquivo.writelines(linhas[ordem])
+    os.replace(temporario, destino)
+
+    agregados = {} if saem is None else estado['agregados']
+    for chave in CHAVES_AGREGADOS:
+        if saem is None:
+            agregados[chave] = contribuicoes(novos, chave)
+        elif chave not in agregados:
+            tratado = interpretar(cabecalho, linhas, usecols=[chave, ALVO], dtype={chave: str})
+            agregados[chave] = contribuicoes(tratado, chave)
+        else:
+            agregados[chave] = _atualizar_somas(agregados[chave], contribuicoes(saem, chave),
+                                                contribuicoes(novos, chave))
+    _gravar_estado({'hashes': hashes, 'agregados': agregados, 'sha256_tratado': hash_arquivo(destino),
+                    'origem': os.path.abspath(origem), 'cabecalho_origem': cabecalho_bruto}, destino)
+
+    return {
+        'completo': estado is None,
+        **{nome: len(indices) for nome, indices in delta.items()},
+        'linhas_tratadas': int(processar.sum()),
+        'linhas_gravadas': len(linhas),
+        'segundos': time.perf_counter() - inicio,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tratamento incremental de um novo extrato, por 'Codigo orgao'")
+    parser.add_argument("--origem", default=CAMINHO_ORIGINAL)
+    parser.add_argument("--destino", default=CAMINHO_TRATADO)
+    parser.add_argument("--refazer", action="store_true", help="ignorar o estado anterior e tratar tudo")
+    args = parser.parse_args()
+
+    resumo = atualizar(args.origem, args.destino, args.refazer)
+    modo = "completo" if resumo['completo'] else "incremental"
+    print(f"Tratamento {modo}: {resumo['inseridos']} inseridos, {resumo['alterados']} alterados, "
+          f"{resumo['removidos']} removidos, {resumo['inalterados']} inalterados")
+    print(f"{resumo['linhas_tratadas']} linhas tratadas, {resumo['linhas_gravadas']} gravadas "
+          f"em {resumo['segundos']:.2f} s -> {args.destino}")
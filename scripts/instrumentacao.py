@@ -0,0 +1,286 @@
+# === instrumentacao.py ===
+# Tempo e memória de cada etapa (leitura, conversões, ausentes, codificação, ajustes, buscas, gráficos),
+# gravados como rastreio no formato Chrome Trace Event: o JSON abre em chrome://tracing ou no Perfetto
+# (ui.perfetto.dev), com as etapas aninhadas numa linha do tempo por processo e thread.
+# Cada etapa registra tempo de relógio, tempo de CPU, pico de memória residente (RSS) do processo
+# e, quando informado ou deduzido, o número de linhas.
+#
+# Desligado por padrão. Liga com a variável de ambiente TJSP_RASTREIO:
+#   TJSP_RASTREIO=1                  -> ../rastreios/<script>-<data>-<pid>.json
+#   TJSP_RASTREIO=pasta              -> pasta/<script>-<data>-<pid>.json
+#   TJSP_RASTREIO=rastreio.json      -> rastreio.json (processos filhos: rastreio.<pid>.json)
+# ou com "python cli.py --rastreio ...". Desligado, rastrear() devolve um contexto vazio compartilhado e
+# as funções decoradas pagam só uma verificação de booleano por chamada.
+#
+# Exemplos:
+#   TJSP_RASTREIO=1 python modelagem_final.py
+#   python instrumentacao.py resumo ../rastreios/modelagem_final-20250101-120000-123.json
+#   python instrumentacao.py juntar ../rastreios/*.json -o rastreio_completo.json
+
+import argparse
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+PASTA_RASTREIOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "rastreios")
+VARIAVEL_AMBIENTE = 'TJSP_RASTREIO'
+# pid do processo principal, herdado pelos filhos (fork ou spawn) para que gravem em arquivos próprios
+VARIAVEL_PRINCIPAL = 'TJSP_RASTREIO_PRINCIPAL'
+
+_ESTADO = {'ativo': False, 'configurado': None, 'destino': None, 'eventos': [], 'gravados': 0, 'pid': None}
+_TRAVA = threading.Lock()
+
+
+# === MEMÓRIA ===
+# Pico de RSS do processo em MB: resource.getrusage onde existe (kB no Linux, bytes no macOS);
+# no Windows, peak_wset do psutil se estiver instalado; sem nenhum dos dois, None
+def pico_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        memoria = psutil.Process().memory_info()
+        return getattr(memoria, 'peak_wset', memoria.rss) / 2 ** 20
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 2 ** 20 if sys.platform == 'darwin' else pico / 2 ** 10
+
+
+# Linhas de um resultado ou argumento com formato tabular (DataFrame, Series, array)
+def _linhas(objeto):
+    forma = getattr(objeto, 'shape', None)
+    if forma:
+        return int(forma[0])
+    return None
+
+
+# === ETAPAS ===
+class _Nulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+    def __setattr__(self, nome, valor):
+        pass
+
+
+_NULO = _Nulo()
+
+
+class _Etapa:
+    __slots__ = ('nome', 'categoria', 'linhas', 'args', '_inicio', '_cpu', '_rss')
+
+    def __init__(self, nome, categoria, linhas, args):
+        self.nome = nome
+        self.categoria = categoria
+        self.linhas = linhas
+        self.args = args
+
+    def __enter__(self):
+        self._rss = pico_rss_mb()
+        self._cpu = time.process_time_ns()
+        self._inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo, erro, rastro):
+        fim = time.perf_counter_ns()
+        cpu = time.process_time_ns() - self._cpu
+        rss = pico_rss_mb()
+        args = dict(self.args)
+        args['cpu_ms'] = round(cpu / 1e6, 3)
+        if rss is not None:
+            args['pico_rss_mb'] = round(rss, 1)
+            args['aumento_pico_rss_mb'] = round(rss - self._rss, 1)
+        if self.linhas is not None:
+            args['linhas'] = int(self.linhas)
+        if tipo is not None:
+            args['erro'] = tipo.__name__
+        _registrar({
+            'name': self.nome, 'cat': self.categoria, 'ph': 'X',
+            'ts': self._inicio / 1e3, 'dur': (fim - self._inicio) / 1e3,
+            'pid': os.getpid(), 'tid': threading.get_native_id(), 'args': args,
+        })
+        if rss is not None:
+            _registrar({'name': 'pico_rss_mb', 'ph': 'C', 'ts': fim / 1e3, 'pid': os.getpid(),
+                        'args': {'pico_rss_mb': round(rss, 1)}})
+        return False
+
+
+# Contexto de uma etapa; 'linhas' pode ser informado na entrada ou atribuído dentro do bloco:
+#   with rastrear('tratar_ausentes') as etapa:
+#       df = ...
+#       etapa.linhas = len(df)
+# O tempo de CPU é o do processo todo (inclui as threads do sklearn/numpy durante o bloco).
+def rastrear(nome, categoria='etapa', linhas=None, **args):
+    if not _ESTADO['ativo']:
+        return _NULO
+    return _Etapa(nome, categoria, linhas, args)
+
+
+# Decorador: cada chamada vira uma etapa com o nome qualificado da função. As linhas vêm do resultado
+# ou, se ele não tiver formato tabular, do primeiro argumento que tiver (ignorando self).
+def instrumentar(funcao=None, *, nome=None, categoria='etapa'):
+    if funcao is None:
+        return functools.partial(instrumentar, nome=nome, categoria=categoria)
+    rotulo = nome or funcao.__qualname__
+
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        if not _ESTADO['ativo']:
+            return funcao(*args, **kwargs)
+        with _Etapa(rotulo, categoria, None, {}) as etapa:
+            resultado = funcao(*args, **kwargs)
+            etapa.linhas = _linhas(resultado)
+            if etapa.linhas is None:
+                etapa.linhas = next((n for n in map(_linhas, args) if n is not None), None)
+        return resultado
+    return envolvida
+
+
+# === GRAVAÇÃO ===
+def _registrar(evento):
+    with _TRAVA:
+        if _ESTADO['pid'] != os.getpid():
+            # Processo filho criado por fork: começa um rastreio próprio, sem os eventos herdados do pai
+            _iniciar_processo(principal=False)
+        _ESTADO['eventos'].append(evento)
+
+
+def _destino(configurado, principal):
+    if configurado.endswith('.json'):
+        if principal:
+            return configurado
+        base, extensao = os.path.splitext(configurado)
+        return f"{base}.{os.getpid()}{extensao}"
+    script = os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+    nome = f"{script}-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}.json"
+    pasta = PASTA_RASTREIOS if configurado in ('1', 'true', 'sim') else configurado
+    return os.path.join(pasta, nome)
+
+
+def _iniciar_processo(principal):
+    _ESTADO['pid'] = os.getpid()
+    _ESTADO['destino'] = _destino(_ESTADO['configurado'], principal)
+    _ESTADO['eventos'] = [{'name': 'process_name', 'ph': 'M', 'pid': os.getpid(),
+                           'args': {'name': f"{os.path.basename(sys.argv[0] or 'python')} ({os.getpid()})"}}]
+    # O evento de metadados (nome do processo) sozinho não justifica um arquivo
+    _ESTADO['gravados'] = 1
+    # Processos de pools (multiprocessing) encerram sem rodar o atexit; os finalizadores rodam
+    try:
+        from multiprocessing import util
+        util.Finalize(None, salvar, exitpriority=100)
+    except ImportError:
+        pass
+
+
+# Grava o rastreio do processo (de novo a cada chamada, se houver eventos novos); devolve o caminho
+def salvar():
+    with _TRAVA:
+        if not _ESTADO['ativo'] or _ESTADO['pid'] != os.getpid() or len(_ESTADO['eventos']) == _ESTADO['gravados']:
+            return None
+        eventos = list(_ESTADO['eventos'])
+        _ESTADO['gravados'] = len(eventos)
+        destino = _ESTADO['destino']
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+    temporario = destino + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump({'traceEvents': eventos, 'displayTimeUnit': 'ms'}, arquivo, ensure_ascii=False)
+    os.replace(temporario, destino)
+    return destino
+
+
+def ativar(destino='1'):
+    with _TRAVA:
+        if _ESTADO['ativo']:
+            return
+        _ESTADO['ativo'] = True
+        _ESTADO['configurado'] = destino
+        # Processos filhos (pools, subprocessos) herdam o rastreio ligado
+        os.environ.setdefault(VARIAVEL_AMBIENTE, destino)
+        principal = os.environ.setdefault(VARIAVEL_PRINCIPAL, str(os.getpid())) == str(os.getpid())
+        _iniciar_processo(principal)
+    atexit.register(salvar)
+
+
+def ativo():
+    return _ESTADO['ativo']
+
+
+# === LEITURA DOS RASTREIOS ===
+def ler_eventos(caminhos):
+    eventos = []
+    for caminho in caminhos:
+        with open(caminho, encoding='utf-8') as arquivo:
+            conteudo = json.load(arquivo)
+        eventos.extend(conteudo['traceEvents'] if isinstance(conteudo, dict) else conteudo)
+    return eventos
+
+
+# Tempo total, de CPU e maior pico de RSS por etapa. O tempo "próprio" desconta as etapas filhas
+# (aninhadas na mesma thread), para mostrar onde o tempo de fato é gasto.
+def resumir(eventos):
+    import pandas as pd
+
+    etapas = sorted((e for e in eventos if e.get('ph') == 'X'),
+                    key=lambda e: (e['pid'], e['tid'], e['ts'], -e['dur']))
+    proprio = [e['dur'] for e in etapas]
+    pilha, linha_do_tempo = [], None
+    for i, e in enumerate(etapas):
+        if (e['pid'], e['tid']) != linha_do_tempo:
+            pilha, linha_do_tempo = [], (e['pid'], e['tid'])
+        # Etapas abertas que já terminaram antes desta começar não são mais mães dela
+        while pilha and etapas[pilha[-1]]['ts'] + etapas[pilha[-1]]['dur'] <= e['ts']:
+            pilha.pop()
+        if pilha:
+            proprio[pilha[-1]] -= e['dur']
+        pilha.append(i)
+
+    linhas = [{'etapa': e['name'], 'chamadas': 1, 'total_s': e['dur'] / 1e6, 'proprio_s': p / 1e6,
+               'cpu_s': e['args'].get('cpu_ms', 0) / 1e3, 'linhas': e['args'].get('linhas', 0),
+               'pico_rss_mb': e['args'].get('pico_rss_mb')} for e, p in zip(etapas, proprio)]
+    if not linhas:
+        return pd.DataFrame(columns=['chamadas', 'total_s', 'proprio_s', 'cpu_s', 'linhas', 'pico_rss_mb'])
+    tabela = pd.DataFrame(linhas).groupby('etapa').agg(
+        chamadas=('chamadas', 'sum'), total_s=('total_s', 'sum'), proprio_s=('proprio_s', 'sum'),
+        cpu_s=('cpu_s', 'sum'), linhas=('linhas', 'sum'), pico_rss_mb=('pico_rss_mb', 'max'))
+    return tabela.sort_values('proprio_s', ascending=False)
+
+
+def juntar(caminhos, destino):
+    with open(destino, 'w', encoding='utf-8') as arquivo:
+        json.dump({'traceEvents': ler_eventos(caminhos), 'displayTimeUnit': 'ms'}, arquivo, ensure_ascii=False)
+    return destino
+
+
+if os.environ.get(VARIAVEL_AMBIENTE, '').strip() not in ('', '0'):
+    ativar(os.environ[VARIAVEL_AMBIENTE].strip())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumo e junção de rastreios de etapas (Chrome Trace Event)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("resumo", help="tempo e memória por etapa")
+    p.add_argument("arquivos", nargs="+")
+    p.add_argument("-n", type=int, default=20)
+    p = sub.add_parser("juntar", help="juntar rastreios de vários processos num único arquivo")
+    p.add_argument("arquivos", nargs="+")
+    p.add_argument("-o", "--destino", required=True)
+    args = parser.parse_args()
+
+    if args.comando == "juntar":
+        print(f"{len(args.arquivos)} rastreios -> {juntar(args.arquivos, args.destino)}")
+    else:
+        import pandas as pd
+        pd.set_option('display.width', 200)
+        print(resumir(ler_eventos(args.arquivos)).head(args.n).round(3).to_string())
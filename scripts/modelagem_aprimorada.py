@@ -8,40 +8,23 @@ import seaborn as sns
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from category_encoders import TargetEncoder
+from codificacao import CodificadorAlvo
+from base_dados import ALVO, VARIAVEIS_NUMERICAS, carregar_modelagem
+from importancia_permutacao import importancia_permutacao, montar_grupos
 
-# === CARREGAMENTO DOS DADOS ===
-df = pd.read_csv("../dados/tjsp_processos_tratado.csv", sep=";")
-
-# === LIMPEZA DOS REGISTROS INCOMPLETOS ===
-df = df.dropna(subset=[
-    'TPSent_12_meses_num', 'TPCPL_Dec_2024_num', 'Conc100_Dec_2024',
-    'CN_12_meses', 'Desp_12_meses', 'Sus_Dec_2023', 'Sus_Dec_2024',
-    'Tbaix_12_meses', 'CP_Dec_2024', 'SentCM_12_meses', 'SentSM_12_meses',
-    'Municipio', 'Nome orgao', 'Grau'
-])
+# === CARREGAMENTO DOS DADOS (SEM REGISTROS INCOMPLETOS) ===
+df = carregar_modelagem(categoricas=True)
 
 # === DEFINIR VARIÁVEL ALVO ===
-y = df['TPSent_12_meses_num']
+y = df[ALVO]
 
 # === VARIÁVEIS NUMÉRICAS ORIGINAIS ===
-X_num = df[[
-    'TPCPL_Dec_2024_num',
-    'Conc100_Dec_2024',
-    'CN_12_meses',
-    'Desp_12_meses',
-    'Sus_Dec_2023',
-    'Sus_Dec_2024',
-    'Tbaix_12_meses',
-    'CP_Dec_2024',
-    'SentCM_12_meses',
-    'SentSM_12_meses'
-]]
+X_num = df[VARIAVEIS_NUMERICAS]
 
 # === CODIFICAÇÃO DAS VARIÁVEIS CATEGÓRICAS ===
-encoder_municipio = TargetEncoder()
-encoder_orgao = TargetEncoder()
-encoder_grau = TargetEncoder()
+encoder_municipio = CodificadorAlvo()
+encoder_orgao = CodificadorAlvo()
+encoder_grau = CodificadorAlvo()
 
 df['Municipio_encoded'] = encoder_municipio.fit_transform(df['Municipio'], y)
 df['Nome_orgao_encoded'] = encoder_orgao.fit_transform(df['Nome orgao'], y)
@@ -84,3 +67,19 @@ sns.barplot(x='Importância', y='Variável', data=importancia_df)
 plt.title('Importância das Variáveis - Modelo Aprimorado')
 plt.tight_layout()
 plt.show()
+
+# === IMPORTÂNCIA POR PERMUTAÇÃO (NO TESTE) ===
+# A impureza favorece o Nome orgao codificado (alta cardinalidade); a permutação mede a queda de R²,
+# também com as três categóricas codificadas embaralhadas juntas
+# processos=1: este script não tem guarda __main__ (em paralelo, usar importancia_permutacao.py)
+grupos = montar_grupos(list(X.columns), {'categóricas (juntas)': list(X_cat.columns)})
+permutacao = importancia_permutacao(modelo_rf, X_test, y_test, grupos, processos=1)
+print("\nImportância por permutação (queda de R²):")
+print(permutacao['tabela'].round(4))
+permutacao_df = permutacao['tabela'].reset_index().rename(columns={'grupo': 'Variável', 'importancia': 'Queda de R²'})
+
+plt.figure(figsize=(10, 6))
+sns.barplot(x='Queda de R²', y='Variável', data=permutacao_df)
+plt.title('Importância por Permutação - Modelo Aprimorado')
+plt.tight_layout()
+plt.show()
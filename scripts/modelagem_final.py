@@ -6,45 +6,60 @@ import seaborn as sns
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from category_encoders import TargetEncoder
+from codificacao import CodificadorAlvo
+import gradiente_histograma
+from importancia_permutacao import importancia_permutacao, montar_grupos
+from artefato_modelo import salvar_artefato
+from instrumentacao import rastrear
+from base_dados import ALVO, VARIAVEIS_CATEGORICAS, VARIAVEIS_NUMERICAS, carregar_modelagem
 
-# === CARREGAR DADOS ===
-df = pd.read_csv("../dados/tjsp_processos_tratado.csv", sep=";")
+# === MODELO ===
+# 'rf': Random Forest com as categóricas em target encoding
+# 'hgb': gradient boosting com histogramas, categóricas como códigos nativos e parada antecipada
+MODELO = 'rf'
 
-# === DEFINIR VARIÁVEIS ===
-variaveis_numericas = [
-    'TPCPL_Dec_2024_num', 'Conc100_Dec_2024', 'CN_12_meses', 'Desp_12_meses',
-    'Sus_Dec_2023', 'Sus_Dec_2024', 'Tbaix_12_meses', 'CP_Dec_2024',
-    'SentCM_12_meses', 'SentSM_12_meses'
-]
-variaveis_categoricas = ['Nome orgao', 'Municipio', 'Grau']
-
-# === REMOVER REGISTROS INCOMPLETOS ===
-df = df.dropna(subset=['TPSent_12_meses_num'] + variaveis_numericas + variaveis_categoricas)
+# === CARREGAR DADOS (SEM REGISTROS INCOMPLETOS) ===
+df = carregar_modelagem(categoricas=True)
 
 # === PREPARAR X E y ===
-X_num = df[variaveis_numericas]
-X_cat = df[variaveis_categoricas]
-y = df['TPSent_12_meses_num']
+X_num = df[VARIAVEIS_NUMERICAS]
+X_cat = df[VARIAVEIS_CATEGORICAS]
+y = df[ALVO]
 
 # === DIVIDIR TREINO E TESTE ===
 X_num_train, X_num_test, X_cat_train, X_cat_test, y_train, y_test = train_test_split(
     X_num, X_cat, y, test_size=0.2, random_state=42
 )
 
-# === APLICAR TARGET ENCODER APENAS NO TREINO ===
-encoder = TargetEncoder()
-X_cat_train_enc = encoder.fit_transform(X_cat_train, y_train)
+# === CODIFICAR AS CATEGÓRICAS APENAS COM O TREINO (TARGET ENCODER OU CÓDIGOS NATIVOS) ===
+# Com CODIFICACAO_FORA_DA_DOBRA = True, cada linha do treino é codificada com as estatísticas
+# das outras dobras (K-fold), reduzindo o sobreajuste às categorias raras
+CODIFICACAO_FORA_DA_DOBRA = False
+
+if MODELO == 'hgb':
+    encoder = gradiente_histograma.criar_codificador().fit(X_cat_train)
+    X_cat_train_enc = encoder.transform(X_cat_train)
+elif CODIFICACAO_FORA_DA_DOBRA:
+    encoder = CodificadorAlvo()
+    X_cat_train_enc = encoder.fit_transform_oof(X_cat_train, y_train)
+else:
+    encoder = CodificadorAlvo()
+    X_cat_train_enc = encoder.fit_transform(X_cat_train, y_train)
 X_cat_test_enc = encoder.transform(X_cat_test)
 
 # === COMBINAR NUMÉRICAS + CATEGÓRICAS ===
 X_train_final = pd.concat([X_num_train.reset_index(drop=True), X_cat_train_enc.reset_index(drop=True)], axis=1)
 X_test_final = pd.concat([X_num_test.reset_index(drop=True), X_cat_test_enc.reset_index(drop=True)], axis=1)
 
-# === AJUSTAR MODELO RANDOM FOREST ===
-modelo = RandomForestRegressor(random_state=42)
-modelo.fit(X_train_final, y_train)
-y_pred = modelo.predict(X_test_final)
+# === AJUSTAR MODELO (RANDOM FOREST OU GRADIENT BOOSTING) ===
+if MODELO == 'hgb':
+    modelo = gradiente_histograma.criar_modelo(semente=42)
+else:
+    modelo = RandomForestRegressor(random_state=42)
+with rastrear(f'{type(modelo).__name__}.fit', linhas=len(X_train_final)):
+    modelo.fit(X_train_final, y_train)
+with rastrear(f'{type(modelo).__name__}.predict', linhas=len(X_test_final)):
+    y_pred = modelo.predict(X_test_final)
 
 # === MÉTRICAS DE DESEMPENHO ===
 mae = mean_absolute_error(y_test, y_pred)
@@ -56,8 +71,24 @@ print(f"MAE: {mae:.2f}")
 print(f"RMSE: {rmse:.2f}")
 print(f"R²: {r2:.2f}")
 
+# === SALVAR ARTEFATO VERSIONADO (CODIFICADOR + FLORESTA) PARA PONTUAÇÃO SEM RETREINO ===
+pasta_artefato = salvar_artefato(encoder, modelo, VARIAVEIS_NUMERICAS, VARIAVEIS_CATEGORICAS,
+                                 metricas={'MAE': mae, 'RMSE': rmse, 'R2': r2},
+                                 nome=gradiente_histograma.NOME_MODELO if MODELO == 'hgb' else 'rf_final')
+print(f"Artefato salvo em: {pasta_artefato}")
+
 # === IMPORTÂNCIA DAS VARIÁVEIS ===
-importancias = modelo.feature_importances_
+# Queda de R² ao embaralhar cada variável no teste (e as categóricas juntas), com cache.
+# O gradient boosting não tem importância por impureza: nele o gráfico usa a permutação.
+# processos=1: este script não tem guarda __main__ (em paralelo, usar importancia_permutacao.py)
+grupos = montar_grupos(list(X_test_final.columns), {'categóricas (juntas)': VARIAVEIS_CATEGORICAS})
+permutacao = importancia_permutacao(modelo, X_test_final, y_test, grupos, processos=1)
+print("\nImportância por permutação (queda de R²):")
+print(permutacao['tabela'].round(4))
+if MODELO == 'hgb':
+    importancias = permutacao['tabela']['importancia'].reindex(X_train_final.columns).to_numpy()
+else:
+    importancias = modelo.feature_importances_
 nomes_variaveis = X_train_final.columns
 
 importancia_df = pd.DataFrame({
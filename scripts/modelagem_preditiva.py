@@ -8,24 +8,20 @@ from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.tree import DecisionTreeRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from base_dados import ALVO, VARIAVEIS_NUMERICAS, carregar_modelagem
+from busca_hiperparametros import busca_halving, imprimir_resumo
+from instrumentacao import rastrear
+from importancia_permutacao import importancia_permutacao, montar_grupos
 
-# Carregar os dados tratados
-df = pd.read_csv("../dados/tjsp_processos_tratado.csv", sep=";")
+# Estratégia de ajuste fino: 'halving' (successive halving com warm start) ou 'grade' (GridSearchCV completo)
+BUSCA = 'halving'
+
+# Carregar os dados tratados (apenas alvo e preditoras numéricas)
+df = carregar_modelagem()
 
 # Selecionar variável alvo e preditoras (numéricas)
-y = df['TPSent_12_meses_num']
-X = df[[
-    'TPCPL_Dec_2024_num',
-    'Conc100_Dec_2024',
-    'CN_12_meses',
-    'Desp_12_meses',
-    'Sus_Dec_2023',
-    'Sus_Dec_2024',
-    'Tbaix_12_meses',
-    'CP_Dec_2024',
-    'SentCM_12_meses',
-    'SentSM_12_meses'
-]]
+y = df[ALVO]
+X = df[VARIAVEIS_NUMERICAS]
 
 # Dividir dados em treino e teste
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
@@ -41,7 +37,8 @@ modelos = {
 resultados = []
 
 for nome, modelo in modelos.items():
-    modelo.fit(X_train, y_train)
+    with rastrear(f'{nome}.fit', linhas=len(X_train)):
+        modelo.fit(X_train, y_train)
     y_pred = modelo.predict(X_test)
 
     mae = mean_absolute_error(y_test, y_pred)
@@ -79,19 +76,28 @@ param_grid = {
     'min_samples_leaf': [1, 2, 4]
 }
 
-grid_search = GridSearchCV(estimator=RandomForestRegressor(random_state=42),
-                           param_grid=param_grid,
-                           cv=5,
-                           scoring='neg_mean_absolute_error',
-                           n_jobs=-1,
-                           verbose=1)
-
-grid_search.fit(X_train, y_train)
+if BUSCA == 'halving':
+    # Candidatos começam com 100 árvores; o melhor terço cresce para 200 e depois 300, reaproveitando as árvores
+    busca = busca_halving(X_train, y_train, param_grid, recurso='n_estimators', fator=3, cv=5, random_state=42)
+    imprimir_resumo(busca)
+    best_model = busca['melhor_modelo']
+    best_params = busca['melhores_parametros']
+else:
+    grid_search = GridSearchCV(estimator=RandomForestRegressor(random_state=42),
+                               param_grid=param_grid,
+                               cv=5,
+                               scoring='neg_mean_absolute_error',
+                               n_jobs=-1,
+                               verbose=1)
+
+    with rastrear('GridSearchCV.fit', linhas=len(X_train)):
+        grid_search.fit(X_train, y_train)
+    best_model = grid_search.best_estimator_
+    best_params = grid_search.best_params_
 
 # Melhor modelo
-best_model = grid_search.best_estimator_
 print("\nMelhores hiperparâmetros encontrados:")
-print(grid_search.best_params_)
+print(best_params)
 
 # Avaliação do modelo ajustado
 y_pred_best = best_model.predict(X_test)
@@ -116,6 +122,20 @@ plt.tight_layout()
 plt.savefig("../graficos/importancia_variaveis_rf_ajustado.png", dpi=300)
 plt.show()
 
+# === IMPORTÂNCIA POR PERMUTAÇÃO (NO TESTE) ===
+# Queda de R² ao embaralhar cada variável, em paralelo e com cache (ver importancia_permutacao.py)
+# processos=1: este script não tem guarda __main__ (em paralelo, usar importancia_permutacao.py)
+permutacao = importancia_permutacao(best_model, X_test, y_test, montar_grupos(list(X.columns)), processos=1)
+print("\nImportância por permutação (queda de R²):")
+print(permutacao['tabela'].round(4))
+permutacao_df = permutacao['tabela'].reset_index().rename(columns={'grupo': 'Variável', 'importancia': 'Queda de R²'})
+
+plt.figure(figsize=(10, 6))
+sns.barplot(x='Queda de R²', y='Variável', data=permutacao_df)
+plt.title('Importância por Permutação - Random Forest Ajustado')
+plt.tight_layout()
+plt.show()
+
 # Gráfico comparando modelos antes e depois do ajuste (R²)
 resultados_df = pd.DataFrame({
     'Modelo': ['Random Forest (Padrão)', 'Random Forest (Ajustado)'],
@@ -0,0 +1,216 @@
+# === painel.py ===
+# Painel em formato longo: uma linha por (Codigo orgao, período), uma coluna por indicador.
+# A base larga do DataJud traz o período no nome da coluna (CP_Dec_2023, CP_Dec_2024, CN_12_meses...);
+# aqui esses nomes são separados em indicador + período, e cada período fica num arquivo colunar próprio:
+#   painel/periodo=2024-12.parquet   painel/periodo=2023-12.parquet   painel/orgaos.parquet
+# Um novo extrato só acrescenta (ou completa) arquivos de período, sem mudar nenhuma lista de colunas.
+# As variações entre períodos (diferença, crescimento, médias móveis) saem de uma matriz
+# órgãos x períodos por indicador, calculadas para todos os órgãos de uma vez.
+#
+# Exemplos:
+#   python painel.py
+#   python painel.py --origem ../dados/tjsp_processos_tratado_2025.csv --periodo-12-meses 2025-12
+#   python painel.py --indicadores CP Sus --janela 2
+
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from base_dados import CAMINHO_TRATADO, PASTA_DADOS, TIPOS_TEXTO, formato_cache, ler_colunar, salvar_colunar
+from particionamento import EXTENSOES
+
+PASTA_PAINEL = os.path.join(PASTA_DADOS, "painel")
+CHAVE = 'Codigo orgao'
+COLUNAS_ORGAO = ['Tribunal', 'Municipio', 'UF', 'Nome orgao', 'Grau']
+
+# Os indicadores "_12_meses" cobrem os 12 meses até a data de referência do extrato
+PERIODO_12_MESES = '2024-12'
+
+# Nome largo -> (indicador, período). As colunas "_num" são a versão numérica de um texto original;
+# percentuais de variação (%CP, %Sus) não entram, pois são recalculados a partir do painel.
+_PADRAO_DEZEMBRO = re.compile(r'^(?P<indicador>.+)_Dec_(?P<ano>\d{4})(?P<num>_num)?$')
+_PADRAO_12_MESES = re.compile(r'^(?P<indicador>.+)_12_meses(?P<num>_num)?$')
+
+
+def separar_coluna(coluna, periodo_12_meses=PERIODO_12_MESES):
+    achado = _PADRAO_DEZEMBRO.match(coluna)
+    if achado:
+        return achado.group('indicador'), pd.Period(f"{achado.group('ano')}-12", freq='M'), bool(achado.group('num'))
+    achado = _PADRAO_12_MESES.match(coluna)
+    if achado:
+        return achado.group('indicador'), pd.Period(periodo_12_meses, freq='M'), bool(achado.group('num'))
+    return None
+
+
+# Colunas numéricas da base larga: {período: {indicador: coluna}}. Quando há texto e "_num",
+# fica a "_num"; colunas de texto sem versão numérica ficam de fora.
+def mapear_colunas(df, periodo_12_meses=PERIODO_12_MESES):
+    mapa = {}
+    for coluna in df.columns:
+        separada = separar_coluna(coluna, periodo_12_meses)
+        if separada is None or not pd.api.types.is_numeric_dtype(df[coluna]):
+            continue
+        indicador, periodo, numerica = separada
+        if numerica or indicador not in mapa.get(periodo, {}):
+            mapa.setdefault(periodo, {})[indicador] = coluna
+    return mapa
+
+
+# === CONVERSÃO ===
+# Base larga -> painel longo, indexado por (Codigo orgao, periodo)
+def para_longo(df, periodo_12_meses=PERIODO_12_MESES):
+    partes = []
+    for periodo, colunas in mapear_colunas(df, periodo_12_meses).items():
+        parte = df[[CHAVE] + list(colunas.values())].rename(columns={c: i for i, c in colunas.items()})
+        partes.append(parte.assign(periodo=periodo))
+    longo = pd.concat(partes, ignore_index=True)
+    longo[CHAVE] = longo[CHAVE].astype(np.int64)
+    return longo.set_index([CHAVE, 'periodo']).sort_index()
+
+
+# === ARMAZENAMENTO ===
+def _arquivo(pasta, nome, formato):
+    return os.path.join(pasta, f"{nome}.{EXTENSOES[formato]}")
+
+
+def periodos_salvos(pasta=PASTA_PAINEL):
+    if not os.path.isdir(pasta):
+        return []
+    nomes = [n.split('.')[0] for n in os.listdir(pasta) if n.startswith('periodo=')]
+    return sorted(pd.Period(n[len('periodo='):], freq='M') for n in nomes)
+
+
+# Acrescentar um extrato largo ao painel. Períodos já salvos são completados: órgãos e indicadores
+# do extrato novo substituem os antigos, e o resto do que já estava salvo é mantido.
+def adicionar_extrato(df, periodo_12_meses=PERIODO_12_MESES, pasta=PASTA_PAINEL, formato=None):
+    formato = formato or formato_cache()
+    os.makedirs(pasta, exist_ok=True)
+    longo = para_longo(df, periodo_12_meses)
+    for periodo, parte in longo.groupby(level='periodo'):
+        parte = parte.droplevel('periodo')
+        caminho = _arquivo(pasta, f"periodo={periodo}", formato)
+        if os.path.exists(caminho):
+            parte = parte.combine_first(ler_colunar(caminho, formato=formato).set_index(CHAVE))
+        salvar_colunar(parte.reset_index(), caminho, formato)
+
+    # Atributos de cada órgão (nome, município, grau): prevalecem os do extrato mais recente
+    orgaos = df[[CHAVE] + COLUNAS_ORGAO].astype({CHAVE: np.int64}).set_index(CHAVE)
+    caminho = _arquivo(pasta, "orgaos", formato)
+    if os.path.exists(caminho):
+        orgaos = orgaos.combine_first(ler_colunar(caminho, formato=formato).set_index(CHAVE))
+    salvar_colunar(orgaos.reset_index(), caminho, formato)
+    return sorted(longo.index.get_level_values('periodo').unique())
+
+
+# Painel longo com os indicadores e períodos pedidos (todos, por padrão)
+def carregar_painel(indicadores=None, periodos=None, pasta=PASTA_PAINEL, formato=None):
+    formato = formato or formato_cache()
+    escolhidos = periodos_salvos(pasta)
+    if not escolhidos:
+        raise FileNotFoundError(f"Nenhum período salvo em {pasta}; rode painel.py")
+    if periodos is not None:
+        pedidos = {pd.Period(p, freq='M') for p in periodos}
+        escolhidos = [p for p in escolhidos if p in pedidos]
+    partes = [_ler_periodo(_arquivo(pasta, f"periodo={periodo}", formato), indicadores, formato)
+              .assign(periodo=periodo) for periodo in escolhidos]
+    painel = pd.concat(partes, ignore_index=True).set_index([CHAVE, 'periodo']).sort_index()
+    return painel if indicadores is None else painel.reindex(columns=list(indicadores))
+
+
+# Só os indicadores pedidos que o período tem (ex.: CN só existe nos períodos com "_12_meses")
+def _ler_periodo(caminho, indicadores, formato):
+    if indicadores is None:
+        return ler_colunar(caminho, formato=formato)
+    if formato == 'parquet':
+        import pyarrow.parquet as pq
+        salvas = pq.read_schema(caminho).names
+        return ler_colunar(caminho, [CHAVE] + [i for i in indicadores if i in salvas], formato)
+    tabela = ler_colunar(caminho, formato=formato)
+    return tabela[[CHAVE] + [i for i in indicadores if i in tabela.columns]]
+
+
+def carregar_orgaos(pasta=PASTA_PAINEL, formato=None):
+    formato = formato or formato_cache()
+    return ler_colunar(_arquivo(pasta, "orgaos", formato), formato=formato).set_index(CHAVE)
+
+
+# === VARIAÇÕES ENTRE PERÍODOS ===
+# Matriz órgãos x períodos de um indicador (ausente onde o órgão não tem o período), montada
+# direto dos códigos do MultiIndex; devolve também a posição de cada linha do painel na matriz
+def matriz(painel, indicador):
+    indice = painel.index.remove_unused_levels()
+    orgaos, periodos = indice.levels
+    linhas, colunas = indice.codes
+    valores = np.full((len(orgaos), len(periodos)), np.nan)
+    valores[linhas, colunas] = painel[indicador].to_numpy(dtype=np.float64, na_value=np.nan)
+    return valores, linhas * len(periodos) + colunas
+
+
+# Média móvel de 'janela' períodos ao longo das colunas; só com a janela completa
+def _media_movel(valores, janela):
+    validos = ~np.isnan(valores)
+    soma = np.cumsum(np.where(validos, valores, 0.0), axis=1)
+    contagem = np.cumsum(validos, axis=1)
+    zeros = np.zeros((len(valores), 1))
+    soma = np.hstack([zeros, soma])
+    contagem = np.hstack([zeros, contagem])
+    media = np.full(valores.shape, np.nan)
+    if janela <= valores.shape[1]:
+        n = contagem[:, janela:] - contagem[:, :-janela]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media[:, janela - 1:] = np.where(n == janela, (soma[:, janela:] - soma[:, :-janela]) / n, np.nan)
+    return media
+
+
+# Para cada indicador: valor no período anterior, diferença, crescimento em % (como %CP e %Sus)
+# e média móvel. "Anterior" é o período salvo imediatamente antes, para todos os órgãos.
+def variacoes(painel, indicadores=None, janela=2):
+    indicadores = list(painel.columns) if indicadores is None else list(indicadores)
+    colunas = {}
+    for indicador in indicadores:
+        valores, posicao = matriz(painel, indicador)
+        anterior = np.hstack([np.full((len(valores), 1), np.nan), valores[:, :-1]])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            crescimento = (valores - anterior) / anterior * 100
+        crescimento[~np.isfinite(crescimento)] = np.nan
+        derivadas = {
+            indicador: valores,
+            f'{indicador}_anterior': anterior,
+            f'{indicador}_delta': valores - anterior,
+            f'{indicador}_crescimento': crescimento,
+            f'{indicador}_media_{janela}': _media_movel(valores, janela),
+        }
+        # De volta às linhas do painel (só as combinações órgão x período que existem)
+        colunas.update({nome: v.ravel()[posicao] for nome, v in derivadas.items()})
+    return pd.DataFrame(colunas, index=painel.index)
+
+
+# Um período em formato largo (uma linha por órgão), com as variações como colunas
+def tabela_periodo(painel, periodo, indicadores=None, janela=2):
+    derivadas = variacoes(painel, indicadores, janela)
+    return derivadas.xs(pd.Period(periodo, freq='M'), level='periodo')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Painel longo (órgão x período) a partir da base tratada")
+    parser.add_argument("--origem", default=CAMINHO_TRATADO, help="base tratada em formato largo")
+    parser.add_argument("--periodo-12-meses", default=PERIODO_12_MESES,
+                        help="período (AAAA-MM) a que se referem as colunas _12_meses")
+    parser.add_argument("--destino", default=PASTA_PAINEL)
+    parser.add_argument("--indicadores", nargs="+", default=['CP', 'Sus'], help="indicadores a resumir")
+    parser.add_argument("--janela", type=int, default=2, help="períodos da média móvel")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.origem, sep=";", dtype={coluna: str for coluna in TIPOS_TEXTO})
+    periodos = adicionar_extrato(df, args.periodo_12_meses, args.destino)
+    print(f"Períodos gravados: {', '.join(map(str, periodos))} -> {args.destino}")
+
+    painel = carregar_painel(args.indicadores, pasta=args.destino)
+    print(f"\nPainel: {painel.index.get_level_values(CHAVE).nunique()} órgãos x "
+          f"{painel.index.get_level_values('periodo').nunique()} períodos")
+    derivadas = variacoes(painel, args.indicadores, args.janela)
+    pd.set_option('display.width', 200)
+    print(derivadas.groupby(level='periodo').median().round(2).T.to_string())
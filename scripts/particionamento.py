@@ -0,0 +1,181 @@
+# === particionamento.py ===
+# Base de vários tribunais num único armazenamento particionado em pastas, no estilo Hive:
+#   particoes/Tribunal=TJSP/UF=SP/parte-00000.parquet   (opcionalmente .../Grau=G1%2C%20JE/...)
+# A leitura com filtros nas chaves de partição descarta pastas inteiras antes de abrir qualquer arquivo,
+# e só as colunas pedidas são lidas (quando o formato é Parquet).
+#
+# Exemplos:
+#   python particionamento.py --origens ../dados/tjsp_processos_sp.csv ../dados/tjrj_processos_rj.csv
+#   python particionamento.py --origens ../dados/*.csv --por-grau --blocos 500000
+
+import argparse
+import json
+import os
+import shutil
+import time
+from urllib.parse import quote, unquote
+
+import pandas as pd
+
+from base_dados import CAMINHO_ORIGINAL, PASTA_DADOS, formato_cache, ler_colunar, salvar_colunar
+
+PASTA_PARTICOES = os.path.join(PASTA_DADOS, "particoes")
+CHAVES_PADRAO = ['Tribunal', 'UF']
+ARQUIVO_ESQUEMA = "_esquema.json"
+
+# Nome de pasta para valores ausentes na chave de partição
+AUSENTE = "__AUSENTE__"
+EXTENSOES = {'parquet': 'parquet', 'pickle': 'pkl'}
+
+
+def _ler_esquema(pasta):
+    caminho = os.path.join(pasta, ARQUIVO_ESQUEMA)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def _codificar(valor):
+    return AUSENTE if pd.isna(valor) else quote(str(valor), safe='')
+
+
+def _decodificar(texto):
+    return None if texto == AUSENTE else unquote(texto)
+
+
+# === GRAVAÇÃO ===
+# Cada partição presente em df tem seus arquivos substituídos, exceto as listadas em 'acrescentar'
+# (usado na ingestão em blocos, em que o mesmo tribunal chega em vários blocos).
+# Devolve o conjunto de pastas de partição gravadas.
+def gravar_particoes(df, pasta=PASTA_PARTICOES, chaves=CHAVES_PADRAO, formato=None, acrescentar=()):
+    esquema = _ler_esquema(pasta)
+    if esquema is None:
+        formato = formato or formato_cache()
+        esquema = {'chaves': list(chaves), 'formato': formato, 'ordem': list(df.columns),
+                   'colunas': [c for c in df.columns if c not in chaves]}
+        os.makedirs(pasta, exist_ok=True)
+        with open(os.path.join(pasta, ARQUIVO_ESQUEMA), 'w', encoding='utf-8') as arquivo:
+            json.dump(esquema, arquivo, ensure_ascii=False, indent=1)
+    elif esquema['chaves'] != list(chaves):
+        raise ValueError(f"{pasta} está particionado por {esquema['chaves']}, não por {list(chaves)}")
+
+    extensao = EXTENSOES[esquema['formato']]
+    gravadas = set()
+    for valores, parte in df.groupby(list(chaves), dropna=False, sort=False):
+        valores = valores if isinstance(valores, tuple) else (valores,)
+        destino = os.path.join(pasta, *(f"{c}={_codificar(v)}" for c, v in zip(chaves, valores)))
+        if destino not in acrescentar and os.path.isdir(destino):
+            shutil.rmtree(destino)
+        os.makedirs(destino, exist_ok=True)
+        numero = len([a for a in os.listdir(destino) if a.startswith('parte-')])
+        caminho = os.path.join(destino, f"parte-{numero:05d}.{extensao}")
+        salvar_colunar(parte.drop(columns=list(chaves)).reset_index(drop=True), caminho, esquema['formato'])
+        gravadas.add(destino)
+    return gravadas
+
+
+# Ingestão das bases originais (uma por tribunal ou já nacionais), tratadas bloco a bloco
+def ingerir(origens, pasta=PASTA_PARTICOES, chaves=CHAVES_PADRAO, linhas_por_bloco=None, formato=None):
+    from carregamento import converter_tipos, tratar_ausentes
+
+    gravadas = set()
+    linhas = 0
+    for origem in origens:
+        leitor = pd.read_csv(origem, sep=";", dtype=str, encoding="utf-8-sig", chunksize=linhas_por_bloco)
+        for bloco in (leitor if linhas_por_bloco else [leitor]):
+            bloco = tratar_ausentes(converter_tipos(bloco))
+            gravadas |= gravar_particoes(bloco, pasta, chaves, formato, acrescentar=gravadas)
+            linhas += len(bloco)
+    return {'linhas': linhas, 'particoes': sorted(gravadas)}
+
+
+# === LEITURA ===
+# Partições existentes, com os valores das chaves lidos dos nomes das pastas
+def listar_particoes(pasta=PASTA_PARTICOES):
+    esquema = _ler_esquema(pasta)
+    if esquema is None:
+        raise FileNotFoundError(f"Nenhuma base particionada em {pasta}")
+    particoes = [{'caminho': pasta}]
+    for chave in esquema['chaves']:
+        proximas = []
+        for particao in particoes:
+            for nome in sorted(os.listdir(particao['caminho'])):
+                if nome.startswith(f"{chave}="):
+                    proximas.append({**particao, chave: _decodificar(nome[len(chave) + 1:]),
+                                     'caminho': os.path.join(particao['caminho'], nome)})
+        particoes = proximas
+    return particoes
+
+
+def _permitidos(permitido):
+    permitidos = permitido if isinstance(permitido, (list, tuple, set)) else [permitido]
+    return {None if p is None else str(p) for p in permitidos}
+
+
+# Carregar a base particionada. 'filtros' é um dicionário coluna -> valor (ou lista de valores):
+# nas chaves de partição o filtro poda pastas sem abri-las; nas demais colunas é aplicado às linhas lidas.
+# O número de partições e arquivos lidos fica em df.attrs['leitura'].
+def carregar_particoes(filtros=None, colunas=None, remover_ausentes=None, pasta=PASTA_PARTICOES):
+    from carregamento import compactar
+
+    todas = listar_particoes(pasta)
+    esquema = _ler_esquema(pasta)
+    chaves = esquema['chaves']
+    filtros = filtros or {}
+    desconhecidas = set(filtros) - set(esquema['ordem'])
+    if desconhecidas:
+        raise KeyError(f"Colunas de filtro desconhecidas: {sorted(desconhecidas)}")
+
+    escolhidas = [p for p in todas if all(p[c] in _permitidos(v) for c, v in filtros.items() if c in chaves)]
+
+    # Colunas de arquivo a ler: as pedidas (menos as de partição) mais as usadas nos filtros de linha
+    filtros_linha = {c: v for c, v in filtros.items() if c not in chaves}
+    if colunas is None:
+        colunas_arquivo = None
+    else:
+        colunas_arquivo = [c for c in colunas if c not in chaves]
+        colunas_arquivo += [c for c in filtros_linha if c not in colunas_arquivo]
+
+    partes = []
+    arquivos = 0
+    for particao in escolhidas:
+        for nome in sorted(os.listdir(particao['caminho'])):
+            if not nome.startswith('parte-'):
+                continue
+            parte = ler_colunar(os.path.join(particao['caminho'], nome), colunas_arquivo, esquema['formato'])
+            arquivos += 1
+            for coluna, permitido in filtros_linha.items():
+                permitidos = _permitidos(permitido)
+                mascara = parte[coluna].astype(str).isin(permitidos - {None})
+                if None in permitidos:
+                    mascara |= parte[coluna].isna()
+                parte = parte[mascara]
+            partes.append(parte.assign(**{c: particao[c] for c in chaves if colunas is None or c in colunas}))
+
+    if partes:
+        # Categorias compactadas depois da concatenação: partes com dicionários diferentes virariam texto
+        df = compactar(pd.concat(partes, ignore_index=True))
+    else:
+        df = pd.DataFrame(columns=colunas if colunas is not None else esquema['ordem'])
+    # Mesma ordem de colunas da base original (ou a ordem pedida)
+    df = df[list(colunas) if colunas is not None else esquema['ordem']]
+    if remover_ausentes:
+        df = df.dropna(subset=remover_ausentes)
+    df.attrs['leitura'] = {'particoes_lidas': len(escolhidas), 'particoes_total': len(todas), 'arquivos': arquivos}
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Base de vários tribunais particionada por Tribunal/UF(/Grau)")
+    parser.add_argument("--origens", nargs="+", default=[CAMINHO_ORIGINAL], help="CSVs originais do DataJud")
+    parser.add_argument("--destino", default=PASTA_PARTICOES)
+    parser.add_argument("--por-grau", action="store_true", help="particionar também por Grau")
+    parser.add_argument("--blocos", type=int, default=None, help="linhas por bloco na leitura dos CSVs")
+    args = parser.parse_args()
+
+    chaves = CHAVES_PADRAO + (['Grau'] if args.por_grau else [])
+    inicio = time.perf_counter()
+    resumo = ingerir(args.origens, args.destino, chaves, args.blocos)
+    print(f"{resumo['linhas']} linhas em {len(resumo['particoes'])} partições "
+          f"({time.perf_counter() - inicio:.2f} s) -> {args.destino}")
@@ -0,0 +1,286 @@
+# === pipeline.py ===
+# Pipeline completo, da base original às métricas do modelo, declarado como um grafo de etapas.
+# Cada etapa tem sua saída guardada em cache pela combinação de parâmetros e entradas;
+# só as etapas invalidadas são reexecutadas, e etapas independentes rodam em paralelo.
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from base_dados import (ALVO, CAMINHO_ORIGINAL, PASTA_CACHE, VARIAVEIS_CATEGORICAS, VARIAVEIS_NUMERICAS,
+                        hash_arquivo)
+
+PASTA_CACHE_PIPELINE = os.path.join(PASTA_CACHE, "pipeline")
+
+# Parâmetros padrão; cada etapa declara quais deles afetam sua saída
+PARAMETROS_PADRAO = {
+    'origem': CAMINHO_ORIGINAL,
+    'chaves_agregacao': ['Nome orgao', 'Municipio', 'Grau'],
+    'test_size': 0.2,
+    'random_state': 42,
+    'n_estimators': 100,
+    'max_depth': None,
+    'min_samples_split': 2,
+    'min_samples_leaf': 1,
+}
+
+
+# === FUNÇÕES DAS ETAPAS ===
+# Recebem os parâmetros e as saídas das dependências (pelo nome da etapa)
+
+def etapa_ingestao(parametros, entradas):
+    import pandas as pd
+    return pd.read_csv(parametros['origem'], sep=";", dtype=str, encoding="utf-8-sig")
+
+
+def etapa_tratamento(parametros, entradas):
+    from carregamento import converter_tipos, tratar_ausentes
+    return tratar_ausentes(converter_tipos(entradas['ingestao']))
+
+
+def etapa_agregados_eda(parametros, entradas):
+    from agregacao import agregar
+    df = entradas['tratamento']
+    return {
+        'resumos': agregar(df, parametros['chaves_agregacao'], ALVO),
+        'correlacoes': df.select_dtypes(include='number').corr()
+    }
+
+
+def etapa_matriz(parametros, entradas):
+    from sklearn.model_selection import train_test_split
+    colunas = [ALVO] + VARIAVEIS_NUMERICAS + VARIAVEIS_CATEGORICAS
+    df = entradas['tratamento'][colunas].dropna()
+    treino, teste = train_test_split(df, test_size=parametros['test_size'],
+                                     random_state=parametros['random_state'])
+    return {'treino': treino, 'teste': teste}
+
+
+def etapa_modelo(parametros, entradas):
+    import pandas as pd
+    from codificacao import CodificadorAlvo
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+    treino, teste = entradas['matriz']['treino'], entradas['matriz']['teste']
+
+    # Target encoding ajustado apenas no treino (sem vazamento), como em modelagem_final.py
+    encoder = CodificadorAlvo()
+    cat_treino = encoder.fit_transform(treino[VARIAVEIS_CATEGORICAS], treino[ALVO])
+    cat_teste = encoder.transform(teste[VARIAVEIS_CATEGORICAS])
+    X_treino = pd.concat([treino[VARIAVEIS_NUMERICAS], cat_treino], axis=1)
+    X_teste = pd.concat([teste[VARIAVEIS_NUMERICAS], cat_teste], axis=1)
+
+    modelo = RandomForestRegressor(
+        n_estimators=parametros['n_estimators'], max_depth=parametros['max_depth'],
+        min_samples_split=parametros['min_samples_split'], min_samples_leaf=parametros['min_samples_leaf'],
+        random_state=parametros['random_state'])
+    modelo.fit(X_treino, treino[ALVO])
+    y_pred = modelo.predict(X_teste)
+
+    return {
+        'metricas': {
+            'MAE': mean_absolute_error(teste[ALVO], y_pred),
+            'RMSE': mean_squared_error(teste[ALVO], y_pred) ** 0.5,
+            'R2': r2_score(teste[ALVO], y_pred)
+        },
+        'importancias': pd.Series(modelo.feature_importances_, index=X_treino.columns).sort_values(ascending=False),
+        'encoder': encoder,
+        'modelo': modelo
+    }
+
+
+def etapa_graficos_eda(parametros, entradas):
+    from graficos import renderizar
+    from renderizar_graficos import especs_exploratoria, especs_fatores
+    df = entradas['tratamento']
+    return renderizar(especs_exploratoria(df) + especs_fatores(df))
+
+
+def etapa_graficos_modelo(parametros, entradas):
+    from graficos import espec_barras, renderizar
+    importancias = entradas['modelo']['importancias']
+    espec = espec_barras(importancias, 'importância variáveis - modelo final (pipeline).png',
+                         'Importância das Variáveis - Modelo Final', 'Importância', figsize=(10, 6))
+    return renderizar([espec], processos=1)
+
+
+# === GRAFO DE ETAPAS ===
+# versao: incrementar quando a lógica da etapa mudar, para invalidar o cache antigo
+# recurso: etapas com o mesmo recurso nunca rodam ao mesmo tempo (os gráficos usam o matplotlib,
+# que não é seguro entre threads, e o mesmo manifesto)
+ETAPAS = {
+    'ingestao': {'funcao': etapa_ingestao, 'dependencias': [], 'parametros': ['origem'], 'versao': 1},
+    'tratamento': {'funcao': etapa_tratamento, 'dependencias': ['ingestao'], 'parametros': [], 'versao': 1},
+    'agregados_eda': {'funcao': etapa_agregados_eda, 'dependencias': ['tratamento'],
+                      'parametros': ['chaves_agregacao'], 'versao': 1},
+    'matriz': {'funcao': etapa_matriz, 'dependencias': ['tratamento'],
+               'parametros': ['test_size', 'random_state'], 'versao': 1},
+    'modelo': {'funcao': etapa_modelo, 'dependencias': ['matriz'],
+               'parametros': ['n_estimators', 'max_depth', 'min_samples_split', 'min_samples_leaf',
+                              'random_state'], 'versao': 2},
+    'graficos_eda': {'funcao': etapa_graficos_eda, 'dependencias': ['tratamento'], 'parametros': [],
+                     'versao': 1, 'cache': False, 'recurso': 'graficos'},
+    'graficos_modelo': {'funcao': etapa_graficos_modelo, 'dependencias': ['modelo'], 'parametros': [],
+                        'versao': 1, 'cache': False, 'recurso': 'graficos'},
+}
+
+
+# Ordem topológica das etapas necessárias para chegar aos alvos pedidos
+def ordenar(alvos):
+    ordem, visitadas = [], set()
+
+    def visitar(nome):
+        if nome in visitadas:
+            return
+        visitadas.add(nome)
+        for dependencia in ETAPAS[nome]['dependencias']:
+            visitar(dependencia)
+        ordem.append(nome)
+
+    for alvo in alvos:
+        visitar(alvo)
+    return ordem
+
+
+# Chave de cache de cada etapa: versão + parâmetros usados + chaves das dependências.
+# A etapa de ingestão inclui o hash do arquivo de origem.
+def calcular_chaves(ordem, parametros):
+    chaves = {}
+    for nome in ordem:
+        etapa = ETAPAS[nome]
+        conteudo = {
+            'etapa': nome,
+            'versao': etapa['versao'],
+            'parametros': {p: parametros[p] for p in etapa['parametros']},
+            'dependencias': {d: chaves[d] for d in etapa['dependencias']}
+        }
+        if nome == 'ingestao':
+            conteudo['arquivo'] = hash_arquivo(parametros['origem'])
+        texto = json.dumps(conteudo, sort_keys=True, default=str)
+        chaves[nome] = hashlib.sha256(texto.encode('utf-8')).hexdigest()[:16]
+    return chaves
+
+
+def _caminho_cache(nome, chave):
+    return os.path.join(PASTA_CACHE_PIPELINE, f"{nome}-{chave}.pkl")
+
+
+def _ler_cache(nome, chave):
+    with open(_caminho_cache(nome, chave), 'rb') as arquivo:
+        return pickle.load(arquivo)
+
+
+def _gravar_cache(nome, chave, saida):
+    caminho = _caminho_cache(nome, chave)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'wb') as arquivo:
+        pickle.dump(saida, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporario, caminho)
+
+
+# Executar o pipeline até os alvos, reaproveitando o cache das etapas não invalidadas
+def executar(alvos=None, parametros=None, forcar=(), processos=4, verbose=True):
+    parametros = {**PARAMETROS_PADRAO, **(parametros or {})}
+    alvos = alvos or list(ETAPAS)
+    ordem = ordenar(alvos)
+    chaves = calcular_chaves(ordem, parametros)
+    os.makedirs(PASTA_CACHE_PIPELINE, exist_ok=True)
+
+    # Etapas a executar: sem cache válido, forçadas, ou sem cache por definição
+    executar_etapa = {}
+    for nome in ordem:
+        tem_cache = ETAPAS[nome].get('cache', True) and os.path.exists(_caminho_cache(nome, chaves[nome]))
+        executar_etapa[nome] = nome in forcar or not tem_cache
+
+    # Só carregamos do disco as saídas que alguém vai usar (alvo ou dependência de etapa a executar)
+    necessarias = set(alvos)
+    for nome in ordem:
+        if executar_etapa[nome]:
+            necessarias.update(ETAPAS[nome]['dependencias'])
+
+    saidas, relatorio = {}, {}
+
+    def rodar(nome):
+        inicio = time.perf_counter()
+        entradas = {d: saidas[d] for d in ETAPAS[nome]['dependencias']}
+        saida = ETAPAS[nome]['funcao'](parametros, entradas)
+        if ETAPAS[nome].get('cache', True):
+            _gravar_cache(nome, chaves[nome], saida)
+        return saida, time.perf_counter() - inicio
+
+    pendentes = [nome for nome in ordem]
+    em_execucao = {}
+    with ThreadPoolExecutor(max_workers=processos) as executor:
+        while pendentes or em_execucao:
+            # Disparar todas as etapas cujas dependências já estão prontas
+            for nome in list(pendentes):
+                if any(d in pendentes or d in em_execucao.values() for d in ETAPAS[nome]['dependencias']):
+                    continue
+                recurso = ETAPAS[nome].get('recurso')
+                if (executar_etapa[nome] and recurso
+                        and any(ETAPAS[outra].get('recurso') == recurso for outra in em_execucao.values())):
+                    continue
+                pendentes.remove(nome)
+                if executar_etapa[nome]:
+                    em_execucao[executor.submit(rodar, nome)] = nome
+                else:
+                    if nome in necessarias:
+                        saidas[nome] = _ler_cache(nome, chaves[nome])
+                    relatorio[nome] = {'status': 'cache', 'chave': chaves[nome]}
+                    if verbose:
+                        print(f"[cache]    {nome} ({chaves[nome]})")
+            if not em_execucao:
+                continue
+            concluidas, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in concluidas:
+                nome = em_execucao.pop(futuro)
+                saidas[nome], segundos = futuro.result()
+                relatorio[nome] = {'status': 'executada', 'chave': chaves[nome], 'segundos': segundos}
+                if verbose:
+                    print(f"[executou] {nome} ({chaves[nome]}) em {segundos:.2f} s")
+
+    return {nome: saidas[nome] for nome in alvos if nome in saidas}, relatorio
+
+
+def _valor_max_depth(texto):
+    return None if texto.lower() == 'none' else int(texto)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pipeline da base original às métricas do modelo")
+    parser.add_argument("alvos", nargs="*", help=f"etapas finais desejadas (padrão: todas): {', '.join(ETAPAS)}")
+    parser.add_argument("--origem", default=PARAMETROS_PADRAO['origem'])
+    parser.add_argument("--n-estimators", type=int, default=PARAMETROS_PADRAO['n_estimators'])
+    parser.add_argument("--max-depth", type=_valor_max_depth, default=PARAMETROS_PADRAO['max_depth'])
+    parser.add_argument("--min-samples-split", type=int, default=PARAMETROS_PADRAO['min_samples_split'])
+    parser.add_argument("--min-samples-leaf", type=int, default=PARAMETROS_PADRAO['min_samples_leaf'])
+    parser.add_argument("--random-state", type=int, default=PARAMETROS_PADRAO['random_state'])
+    parser.add_argument("--test-size", type=float, default=PARAMETROS_PADRAO['test_size'])
+    parser.add_argument("--forcar", nargs="*", default=[], choices=list(ETAPAS), help="etapas a reexecutar")
+    parser.add_argument("--processos", type=int, default=4, help="etapas simultâneas")
+    args = parser.parse_args()
+    desconhecidas = [alvo for alvo in args.alvos if alvo not in ETAPAS]
+    if desconhecidas:
+        parser.error(f"etapas desconhecidas: {', '.join(desconhecidas)}")
+
+    parametros = {
+        'origem': args.origem,
+        'n_estimators': args.n_estimators,
+        'max_depth': args.max_depth,
+        'min_samples_split': args.min_samples_split,
+        'min_samples_leaf': args.min_samples_leaf,
+        'random_state': args.random_state,
+        'test_size': args.test_size,
+    }
+    alvos = args.alvos or None
+    saidas, _ = executar(alvos, parametros, forcar=args.forcar, processos=args.processos)
+
+    if 'modelo' in saidas:
+        print("\n=== RESULTADOS DO MODELO ===")
+        for nome, valor in saidas['modelo']['metricas'].items():
+            print(f"{nome}: {valor:.2f}")
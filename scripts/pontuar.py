@@ -0,0 +1,222 @@
+# === pontuar.py ===
+# Previsão do tempo até sentença (TPSent_12_meses_num) a partir do artefato salvo por modelagem_final.py
+# ou por cli.py treinar (Random Forest ou, com --modelo hgb, o gradient boosting com histogramas),
+# sem retreinar: em lote para um CSV de órgãos, ou como serviço HTTP local com micro-lotes.
+#
+# Exemplos:
+#   python pontuar.py lote ../dados/tjsp_processos_tratado.csv previsoes.csv
+#   python pontuar.py servir --porta 8000
+#   python pontuar.py --modelo hgb servir --porta 8001
+#   curl -X POST localhost:8000/prever -d '{"registros": [{"Nome orgao": "...", ...}]}'
+
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from artefato_modelo import carregar_artefato, prever
+from carregamento import converter_tipos
+
+COLUNA_PREVISAO = 'TPSent_12_meses_previsto'
+COLUNAS_IDENTIFICACAO = ['Codigo orgao', 'Nome orgao', 'Municipio', 'Grau']
+
+
+# === PONTUAÇÃO EM LOTE ===
+# Aceita tanto a base tratada quanto a base original (neste caso converte os tipos antes)
+def pontuar_csv(artefato, entrada, saida, linhas_por_bloco=100_000):
+    inicio = time.perf_counter()
+    total = 0
+    leitor = pd.read_csv(entrada, sep=";", dtype=str, encoding="utf-8-sig", chunksize=linhas_por_bloco)
+    for i, bloco in enumerate(leitor):
+        if 'TPCPL_Dec_2024_num' not in bloco.columns:
+            bloco = converter_tipos(bloco)
+        resultado = bloco[[c for c in COLUNAS_IDENTIFICACAO if c in bloco.columns]].copy()
+        resultado[COLUNA_PREVISAO] = prever(artefato, bloco)
+        resultado.to_csv(saida, sep=";", index=False, mode='w' if i == 0 else 'a', header=(i == 0))
+        total += len(bloco)
+    return total, time.perf_counter() - inicio
+
+
+# === VALIDAÇÃO DAS REQUISIÇÕES ===
+# Cada requisição é conferida sozinha, antes de entrar na fila: o resultado não pode depender do que
+# outros clientes mandaram no mesmo micro-lote (o DataFrame do lote preencheria colunas faltantes com NaN)
+def _numero_valido(valor):
+    if valor is None:
+        return True
+    if isinstance(valor, bool):
+        return False
+    if isinstance(valor, (int, float)):
+        return True
+    if isinstance(valor, str):
+        try:
+            float(valor)
+            return True
+        except ValueError:
+            return False
+    return False
+
+
+def validar_registros(registros, metadados):
+    if not isinstance(registros, list) or not registros:
+        raise ValueError("'registros' deve ser uma lista não vazia de objetos")
+    for i, registro in enumerate(registros):
+        if not isinstance(registro, dict):
+            raise ValueError(f"registro {i}: esperado um objeto JSON")
+        ausentes = [c for c in metadados['colunas_modelo'] if c not in registro]
+        if ausentes:
+            raise ValueError(f"registro {i}: colunas ausentes: {', '.join(ausentes)}")
+        invalidas = [c for c in metadados['variaveis_numericas'] if not _numero_valido(registro[c])]
+        if invalidas:
+            raise ValueError(f"registro {i}: valores não numéricos em: {', '.join(invalidas)}")
+        invalidas = [c for c in metadados['variaveis_categoricas']
+                     if registro[c] is not None and not isinstance(registro[c], (str, int, float))]
+        if invalidas:
+            raise ValueError(f"registro {i}: categorias devem ser texto em: {', '.join(invalidas)}")
+
+
+# === MICRO-LOTES ===
+# Requisições concorrentes entram numa fila; uma thread junta o que chegar dentro da janela
+# (ou até o tamanho máximo do lote) e faz uma única chamada de previsão para todas.
+class MicroLote:
+    def __init__(self, artefato, janela_ms=5, lote_max=512):
+        self.artefato = artefato
+        self.janela = janela_ms / 1000
+        self.lote_max = lote_max
+        self.fila = queue.Queue()
+        threading.Thread(target=self._laco, daemon=True).start()
+
+    def prever(self, registros):
+        futuro = Future()
+        self.fila.put((registros, futuro))
+        return futuro.result()
+
+    def _laco(self):
+        while True:
+            pedidos = [self.fila.get()]
+            linhas = len(pedidos[0][0])
+            limite = time.perf_counter() + self.janela
+            while linhas < self.lote_max:
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    break
+                try:
+                    pedido = self.fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                pedidos.append(pedido)
+                linhas += len(pedido[0])
+
+            try:
+                df = pd.DataFrame([registro for registros, _ in pedidos for registro in registros])
+                previsoes = prever(self.artefato, df)
+            except Exception:
+                # Uma requisição com problema não derruba as outras do lote: cada uma é prevista sozinha
+                for registros, futuro in pedidos:
+                    self._prever_sozinho(registros, futuro)
+                continue
+
+            posicao = 0
+            for registros, futuro in pedidos:
+                futuro.set_result(previsoes[posicao:posicao + len(registros)].tolist())
+                posicao += len(registros)
+
+    def _prever_sozinho(self, registros, futuro):
+        try:
+            futuro.set_result(prever(self.artefato, pd.DataFrame(registros)).tolist())
+        except Exception as erro:
+            futuro.set_exception(erro)
+
+
+def criar_servidor(artefato, porta, janela_ms, lote_max):
+    lote = MicroLote(artefato, janela_ms, lote_max)
+    metadados = artefato['metadados']
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def _responder(self, status, corpo):
+            conteudo = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(conteudo)))
+            self.end_headers()
+            self.wfile.write(conteudo)
+
+        def do_GET(self):
+            if self.path == '/saude':
+                self._responder(200, {'modelo': metadados['nome'], 'versao': metadados['versao'],
+                                      'colunas': metadados['colunas_modelo']})
+            else:
+                self._responder(404, {'erro': 'rota desconhecida'})
+
+        def do_POST(self):
+            if self.path != '/prever':
+                self._responder(404, {'erro': 'rota desconhecida'})
+                return
+            try:
+                tamanho = int(self.headers.get('Content-Length', 0))
+                corpo = json.loads(self.rfile.read(tamanho) or b'{}')
+                # Aceita um único registro ou {"registros": [...]}
+                registros = corpo['registros'] if isinstance(corpo, dict) and 'registros' in corpo else [corpo]
+            except (ValueError, KeyError, TypeError) as erro:
+                self._responder(400, {'erro': f"JSON inválido: {erro}"})
+                return
+            try:
+                validar_registros(registros, metadados)
+            except ValueError as erro:
+                self._responder(400, {'erro': str(erro)})
+                return
+            try:
+                previsoes = lote.prever(registros)
+            except Exception as erro:
+                self._responder(500, {'erro': f"falha na previsão: {erro}"})
+                return
+            self._responder(200, {'versao': metadados['versao'], 'previsoes': previsoes})
+
+        def log_message(self, formato, *args):
+            pass
+
+    return ThreadingHTTPServer(('127.0.0.1', porta), Manipulador)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Previsão com o modelo final salvo")
+    parser.add_argument("--modelo", choices=["rf", "hgb"], default="rf", help="artefato a usar")
+    parser.add_argument("--versao", type=int, default=None, help="versão do artefato (padrão: a mais recente)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_lote = sub.add_parser("lote", help="pontuar um CSV inteiro")
+    p_lote.add_argument("entrada")
+    p_lote.add_argument("saida")
+    p_lote.add_argument("--blocos", type=int, default=100_000, help="linhas por bloco")
+
+    p_servir = sub.add_parser("servir", help="servir previsões via HTTP local")
+    p_servir.add_argument("--porta", type=int, default=8000)
+    p_servir.add_argument("--janela-ms", type=float, default=5, help="espera máxima para formar um lote")
+    p_servir.add_argument("--lote-max", type=int, default=512, help="linhas máximas por lote")
+
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.modelo == 'hgb':
+        from gradiente_histograma import NOME_MODELO
+    else:
+        from artefato_modelo import NOME_MODELO
+    artefato = carregar_artefato(args.versao, NOME_MODELO)
+    print(f"Artefato {NOME_MODELO} v{artefato['metadados']['versao']:03d} carregado em {time.perf_counter() - inicio:.3f} s")
+
+    if args.comando == "lote":
+        total, segundos = pontuar_csv(artefato, args.entrada, args.saida, args.blocos)
+        print(f"{total} órgãos pontuados em {segundos:.2f} s ({total / max(segundos, 1e-9):,.0f} linhas/s)")
+    else:
+        # Aquecimento: a primeira previsão paga custos de inicialização do sklearn
+        prever(artefato, pd.DataFrame({c: [0] for c in artefato['metadados']['colunas_modelo']}))
+        servidor = criar_servidor(artefato, args.porta, args.janela_ms, args.lote_max)
+        print(f"Servindo em http://127.0.0.1:{args.porta} (POST /prever, GET /saude)")
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            servidor.server_close()
@@ -0,0 +1,231 @@
+# === quantis.py ===
+# Quantis por grupo a partir de resumos (sketches) somáveis, montados numa passada em blocos.
+# Cada grupo guarda os valores distintos e suas contagens enquanto forem até LIMITE_EXATO valores
+# distintos; nesse regime quantis, bigodes e outliers são exatos (iguais ao boxplot_stats do
+# matplotlib). Acima disso o resumo vira um t-digest: centróides (média, peso) cujo tamanho máximo
+# segue a função de escala k1, pequenos nas caudas e maiores no meio, com cerca de COMPRESSAO
+# centróides; o erro de posto fica limitado e é menor perto de 0 e de 1. Resumos de blocos, partições
+# ou processos diferentes juntam-se sem voltar aos dados. Contagem, soma, mínimo e máximo são exatos.
+#
+# Exemplos:
+#   python quantis.py --grupo Grau
+#   python quantis.py --origem ../dados/nacional_tratado.csv --grupo Municipio --processos 8 -n 20
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from base_dados import ALVO, CAMINHO_TRATADO
+from correlacao import dividir_arquivo, ler_blocos
+from instrumentacao import instrumentar
+
+LIMITE_EXATO = 2048
+COMPRESSAO = 200
+LIMITE_OUTLIERS = 1000
+QUANTIS_PADRAO = (0.25, 0.5, 0.75)
+
+
+class ResumoQuantis:
+    def __init__(self, limite=LIMITE_EXATO, compressao=COMPRESSAO):
+        self.limite = limite
+        self.compressao = compressao
+        self.valores = np.empty(0)
+        self.pesos = np.empty(0)
+        self.exato = True
+        self.n = 0
+        self.soma = 0.0
+        self.minimo = np.inf
+        self.maximo = -np.inf
+
+    @classmethod
+    def de_valores(cls, x, **kwargs):
+        x = np.asarray(x, dtype=np.float64)
+        x = x[~np.isnan(x)]
+        outro = cls(**kwargs)
+        if len(x):
+            outro.valores, pesos = np.unique(x, return_counts=True)
+            outro.pesos = pesos.astype(np.float64)
+            outro.n, outro.soma = len(x), float(x.sum())
+            outro.minimo, outro.maximo = float(outro.valores[0]), float(outro.valores[-1])
+            if len(outro.valores) > outro.limite:
+                outro._comprimir()
+        return outro
+
+    def juntar(self, outro):
+        self.n += outro.n
+        self.soma += outro.soma
+        self.minimo = min(self.minimo, outro.minimo)
+        self.maximo = max(self.maximo, outro.maximo)
+        self.exato = self.exato and outro.exato
+        valores = np.concatenate([self.valores, outro.valores])
+        pesos = np.concatenate([self.pesos, outro.pesos])
+        if self.exato:
+            valores, inverso = np.unique(valores, return_inverse=True)
+            pesos = np.bincount(inverso, weights=pesos)
+        else:
+            ordem = np.argsort(valores, kind='stable')
+            valores, pesos = valores[ordem], pesos[ordem]
+        self.valores, self.pesos = valores, pesos
+        if not self.exato or len(self.valores) > self.limite:
+            self._comprimir()
+        return self
+
+    # Centróides vizinhos com o mesmo índice k = floor(δ (asin(2q - 1) / π + 1/2)) viram um só
+    def _comprimir(self):
+        acumulado = np.cumsum(self.pesos)
+        centro = (acumulado - self.pesos / 2) / acumulado[-1]
+        k = np.floor(self.compressao * (np.arcsin(2 * centro - 1) / np.pi + 0.5))
+        inicios = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        pesos = np.add.reduceat(self.pesos, inicios)
+        self.valores = np.add.reduceat(self.valores * self.pesos, inicios) / pesos
+        self.pesos = pesos
+        self.exato = False
+
+    # Quantis com interpolação linear entre estatísticas de ordem (como np.percentile e o pandas)
+    def quantis(self, qs):
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        posicao = qs * (self.n - 1)
+        if self.exato:
+            acumulado = np.cumsum(self.pesos)
+            abaixo = self.valores[np.searchsorted(acumulado, np.floor(posicao), side='right')]
+            acima = self.valores[np.searchsorted(acumulado, np.ceil(posicao), side='right')]
+            return abaixo + (acima - abaixo) * (posicao - np.floor(posicao))
+        postos, valores = self._pontos()
+        return np.interp(posicao, postos, valores)
+
+    # t-digest: cada centróide está no posto do seu centro; mínimo e máximo nas pontas
+    def _pontos(self):
+        centros = np.cumsum(self.pesos) - self.pesos / 2 - 0.5
+        return np.r_[0, centros, self.n - 1], np.r_[self.minimo, self.valores, self.maximo]
+
+    def media(self):
+        return self.soma / self.n if self.n else np.nan
+
+    # Valores (ou centróides) fora de [inferior, superior], do menor para o maior. No regime exato cada
+    # valor repete pelo número de ocorrências; acima de 'limite' fica uma amostra espaçada por posto.
+    def _fora(self, inferior, superior, limite=LIMITE_OUTLIERS):
+        fora = (self.valores < inferior) | (self.valores > superior)
+        valores = self.valores[fora]
+        if self.exato:
+            valores = np.repeat(valores, self.pesos[fora].astype(np.int64))
+        else:
+            extremos = np.array([v for v in (self.minimo, self.maximo) if v < inferior or v > superior])
+            valores = np.unique(np.r_[valores, extremos])
+        if len(valores) > limite:
+            valores = valores[np.linspace(0, len(valores) - 1, limite).round().astype(np.int64)]
+        return valores
+
+    # Mesmas chaves do matplotlib.cbook.boxplot_stats (bigodes a 1,5 IQR), prontas para ax.bxp
+    def estatisticas_boxplot(self, rotulo, bigode=1.5):
+        q1, mediana, q3 = self.quantis([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        inferior, superior = q1 - bigode * iqr, q3 + bigode * iqr
+        # Bigodes: menor valor >= limite inferior e maior valor <= limite superior, sem passar dos quartis
+        baixo = np.r_[self.valores[self.valores >= inferior], [self.minimo] if self.minimo >= inferior else []]
+        alto = np.r_[self.valores[self.valores <= superior], [self.maximo] if self.maximo <= superior else []]
+        whislo = float(min(baixo.min(), q1)) if len(baixo) else float(q1)
+        whishi = float(max(alto.max(), q3)) if len(alto) else float(q3)
+        if not self.exato:
+            # Centróides são médias: o bigode é o valor estimado no último (ou primeiro) posto dentro do limite
+            postos, valores = self._pontos()
+            posto_alto = np.floor(np.interp(superior, valores, postos))
+            posto_baixo = np.ceil(np.interp(inferior, valores, postos))
+            whishi = max(min(float(np.interp(posto_alto, postos, valores)), superior), float(q3))
+            whislo = min(max(float(np.interp(posto_baixo, postos, valores)), inferior), float(q1))
+        margem = 1.57 * iqr / np.sqrt(self.n)
+        return {
+            'mean': float(self.media()), 'iqr': float(iqr), 'cilo': float(mediana - margem),
+            'cihi': float(mediana + margem), 'whishi': whishi, 'whislo': whislo,
+            'fliers': self._fora(whislo, whishi).tolist(), 'q1': float(q1), 'med': float(mediana),
+            'q3': float(q3), 'label': str(rotulo),
+        }
+
+
+# === RESUMOS POR GRUPO ===
+# Resumos de um bloco para todos os grupos: valores distintos por (grupo, valor) de uma vez
+def resumir_bloco(chaves, valores, limite=LIMITE_EXATO, compressao=COMPRESSAO):
+    chaves = pd.Series(chaves).astype(object)
+    valores = np.asarray(valores, dtype=np.float64)
+    usar = chaves.notna().to_numpy() & ~np.isnan(valores)
+    codigos, grupos = pd.factorize(chaves[usar])
+    valores = valores[usar]
+    ordem = np.lexsort((valores, codigos))
+    codigos, valores = codigos[ordem], valores[ordem]
+    inicios = np.flatnonzero(np.r_[True, codigos[1:] != codigos[:-1]]) if len(codigos) else np.empty(0, int)
+    fins = np.r_[inicios[1:], len(codigos)]
+    return {str(grupos[codigos[i]]): ResumoQuantis.de_valores(valores[i:f], limite=limite, compressao=compressao)
+            for i, f in zip(inicios, fins)}
+
+
+def juntar_resumos(partes):
+    total = {}
+    for parte in partes:
+        for grupo, resumo in parte.items():
+            if grupo in total:
+                total[grupo].juntar(resumo)
+            else:
+                total[grupo] = resumo
+    return total
+
+
+def _resumir_fonte(tarefa):
+    fonte, grupo, valor = tarefa
+    return juntar_resumos(resumir_bloco(bloco[grupo], bloco[valor]) for bloco in ler_blocos(fonte, [grupo, valor]))
+
+
+# Resumos de 'valor' por 'grupo' ({valor do grupo: ResumoQuantis}) numa passada em blocos.
+# 'fonte' é um DataFrame ou um CSV no formato da base tratada; com 'processos' > 1 o CSV é dividido
+# em faixas resumidas em paralelo, e os resumos são juntados no final.
+@instrumentar
+def resumos_por_grupo(fonte, grupo, valor=ALVO, processos=1):
+    if isinstance(fonte, pd.DataFrame):
+        return _resumir_fonte((fonte, grupo, valor))
+    cabecalho, faixas = dividir_arquivo(fonte, processos or os.cpu_count() or 1)
+    tarefas = [((fonte, cabecalho, inicio, fim), grupo, valor) for inicio, fim in faixas]
+    if processos == 1 or len(tarefas) == 1:
+        return juntar_resumos(map(_resumir_fonte, tarefas))
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        return juntar_resumos(executor.map(_resumir_fonte, tarefas))
+
+
+# Tabela por grupo no formato de agregacao.agregar (linhas válidas, média e quantis), para ranking()
+def tabela_quantis(resumos, quantis=QUANTIS_PADRAO):
+    from agregacao import nome_quantil
+
+    linhas = []
+    for grupo, resumo in resumos.items():
+        linha = {'grupo': grupo, 'contagem': resumo.n, 'media': resumo.media(), 'exato': resumo.exato}
+        linha.update(zip(map(nome_quantil, quantis), resumo.quantis(quantis)))
+        linhas.append(linha)
+    return pd.DataFrame(linhas).set_index('grupo')
+
+
+# Estatísticas de boxplot dos grupos, na ordem pedida (padrão: ordem alfabética)
+def estatisticas_boxplot(resumos, ordem=None):
+    ordem = sorted(resumos) if ordem is None else [str(g) for g in ordem]
+    return [resumos[g].estatisticas_boxplot(g) for g in ordem if g in resumos]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantis e boxplots por grupo a partir de resumos somáveis")
+    parser.add_argument("--origem", default=CAMINHO_TRATADO, help="CSV no formato da base tratada")
+    parser.add_argument("--grupo", default='Grau')
+    parser.add_argument("--valor", default=ALVO)
+    parser.add_argument("--processos", type=int, default=None, help="processos (padrão: todos os núcleos)")
+    parser.add_argument("-n", type=int, default=10, help="linhas do ranking por mediana")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    resumos = resumos_por_grupo(args.origem, args.grupo, args.valor, args.processos)
+    tabela = tabela_quantis(resumos)
+    print(f"{len(resumos)} grupos resumidos em {time.perf_counter() - inicio:.2f} s "
+          f"({int((~tabela['exato']).sum())} em modo aproximado)")
+    pd.set_option('display.width', 200)
+    print(f"\nMaiores medianas de {args.valor} por {args.grupo}:")
+    print(tabela.sort_values('q50', ascending=False, kind='stable').head(args.n).round(2).to_string())
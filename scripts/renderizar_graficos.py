@@ -0,0 +1,86 @@
+# === renderizar_graficos.py ===
+# Gera todo o conjunto de gráficos de graficos/ sem interface gráfica, em paralelo,
+# redesenhando apenas os gráficos cujos dados ou especificação mudaram
+
+import argparse
+import time
+
+from agregacao import agregar, filtrar_minimo, ranking
+from base_dados import carregar_tratado
+from correlacao import calcular
+from graficos import (espec_barras, espec_boxplot, espec_colunas, espec_dispersao, espec_histograma,
+                      espec_mapa_calor, estatisticas_boxplot, renderizar)
+
+
+# === GRÁFICOS DA ANÁLISE EXPLORATÓRIA ===
+def especs_exploratoria(df):
+    df = df.dropna(subset=['TPSent_12_meses_num', 'TPCPL_Dec_2024_num'])
+    resumo_orgao = agregar(df, ['Nome orgao'], 'TPSent_12_meses_num')['Nome orgao']
+    top_municipios = df['Municipio'].value_counts().head(10).index
+
+    return [
+        espec_histograma(df['TPSent_12_meses_num'], 'distribuição do tempo de tramitação.png',
+                         'Distribuição do Tempo de Tramitação', 'Meses até Sentença'),
+        espec_mapa_calor(calcular(df, postos=False)['pearson'], 'mapa de calor das correlações.png', 'Mapa de Calor das Correlações'),
+        espec_boxplot(estatisticas_boxplot(df, 'Grau', 'TPSent_12_meses_num'),
+                      'tempo de tramitação por grau de jurisdição.png',
+                      'Tempo de Tramitação por Grau de Jurisdição', 'Grau', 'Meses até Sentença'),
+        espec_barras(ranking(resumo_orgao, 'media', 10), '10 órgãos com maior tempo médio de tramitação.png',
+                     '10 Órgãos com Maior Tempo Médio de Tramitação', 'Tempo Médio (meses)', 'Órgão Judicial',
+                     figsize=(10, 6)),
+        espec_dispersao(df, 'TPCPL_Dec_2024_num', 'TPSent_12_meses_num',
+                        'correlação entre tpcpl e tempo de tramitação.png',
+                        'Correlação entre TPCPL e Tempo de Tramitação',
+                        'Tempo para Conclusão após Última Sentença (meses)', 'Tempo de Tramitação (meses)'),
+        espec_dispersao(df, 'TPCPL_Dec_2024_num', 'TPSent_12_meses_num',
+                        'correlação entre tpcpl e tempo de tramitação por grau.png',
+                        'Correlação entre TPCPL e Tempo de Tramitação, por Grau',
+                        'Tempo para Conclusão após Última Sentença (meses)',
+                        'Tempo de Tramitação até Sentença (meses)', grupo='Grau', figsize=(10, 6)),
+        espec_histograma(df['IAD_12_meses_num'], 'distribuição do IAD.png',
+                         'Distribuição do Índice de Atendimento à Demanda (IAD)', 'IAD (%)', cor='skyblue'),
+        espec_boxplot(estatisticas_boxplot(df, 'Municipio', 'TPSent_12_meses_num', ordem=top_municipios),
+                      'tempo de tramitação por município.png',
+                      'Tempo de Tramitação por Município (Top 10 mais frequentes)', 'Município',
+                      'Tempo de Tramitação (meses)', rotacao=45, figsize=(12, 6)),
+    ]
+
+
+# === GRÁFICOS DA ANÁLISE DE FATORES DE ATRASO ===
+def especs_fatores(df):
+    df = df.dropna(subset=['TPSent_12_meses_num', 'Nome orgao', 'Municipio', 'Grau'])
+    resumos = agregar(df, ['Nome orgao', 'Grau'], 'TPSent_12_meses_num')
+    resumo_orgao = resumos['Nome orgao']
+    resumo_filtrado = filtrar_minimo(resumo_orgao, 5)
+
+    return [
+        espec_barras(ranking(resumo_orgao, 'media', 10), 'top 10 maior tempo de tramitação.png',
+                     'Top 10 órgãos com maior tempo médio de tramitação', 'Tempo médio (meses)', cor='salmon'),
+        espec_barras(ranking(resumo_orgao, 'linhas', 10), 'top 10 maior volume.png',
+                     'Top 10 órgãos com maior volume de processos', 'Quantidade de processos', cor='skyblue'),
+        espec_colunas(resumos['Grau']['media'].sort_index(), 'tempo médio de tramitação por grau.png',
+                      'Tempo médio de tramitação por Grau', 'Grau', 'Tempo médio (meses)'),
+        espec_barras(ranking(resumo_filtrado, 'media', 10), 'maior tempo medio cejusc.png',
+                     'Top 10 órgãos com maior tempo médio (≥ 5 processos)', 'Tempo médio (meses)',
+                     cor='darkorange'),
+        espec_barras(ranking(resumo_filtrado, 'linhas', 10), 'maior volume cejusc.png',
+                     'Top 10 órgãos com maior volume de processos (≥ 5)', 'Quantidade de processos',
+                     cor='steelblue'),
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renderização em lote dos gráficos")
+    parser.add_argument("--processos", type=int, default=None, help="número de processos (padrão: CPUs)")
+    parser.add_argument("--forcar", action="store_true", help="redesenhar mesmo sem mudanças")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    df = carregar_tratado()
+    especs = especs_exploratoria(df) + especs_fatores(df)
+    resultado = renderizar(especs, processos=args.processos, forcar=args.forcar)
+
+    print(f"{len(resultado['desenhados'])} gráficos desenhados, {resultado['pulados']} sem mudanças "
+          f"({time.perf_counter() - inicio:.2f} s).")
+    for arquivo in resultado['desenhados']:
+        print(f"  - {arquivo}")
@@ -8,27 +8,15 @@ import seaborn as sns
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from category_encoders import TargetEncoder
-
-# === CARREGAR OS DADOS ===
-df = pd.read_csv("../dados/tjsp_processos_tratado.csv", sep=";")
-
-# === REMOVER NULOS NAS VARIÁVEIS USADAS ===
-variaveis_numericas = [
-    'TPCPL_Dec_2024_num',
-    'Conc100_Dec_2024',
-    'CN_12_meses',
-    'Desp_12_meses',
-    'Sus_Dec_2023',
-    'Sus_Dec_2024',
-    'Tbaix_12_meses',
-    'CP_Dec_2024',
-    'SentCM_12_meses',
-    'SentSM_12_meses'
-]
-variaveis_categoricas = ['Nome orgao', 'Municipio', 'Grau']
-
-df = df.dropna(subset=['TPSent_12_meses_num'] + variaveis_numericas + variaveis_categoricas)
+from codificacao import CodificadorAlvo
+from base_dados import VARIAVEIS_CATEGORICAS, VARIAVEIS_NUMERICAS, carregar_modelagem
+from importancia_permutacao import importancia_permutacao, montar_grupos
+
+# === CARREGAR OS DADOS, SEM NULOS NAS VARIÁVEIS USADAS ===
+variaveis_numericas = VARIAVEIS_NUMERICAS
+variaveis_categoricas = VARIAVEIS_CATEGORICAS
+
+df = carregar_modelagem(categoricas=True)
 
 # === FILTRAR CATEGÓRICAS COM POUCA FREQUÊNCIA ===
 # Mínimo de 5 processos por categoria
@@ -37,7 +25,7 @@ for var in ['Nome orgao', 'Municipio']:
     categorias_validas = freq[freq >= 3].index
 
 # === ENCODER PARA VARIÁVEIS CATEGÓRICAS ===
-encoder = TargetEncoder(cols=variaveis_categoricas)
+encoder = CodificadorAlvo(cols=variaveis_categoricas)
 df_encoded = encoder.fit_transform(df[variaveis_categoricas], df['TPSent_12_meses_num'])
 
 # === COMBINAR VARIÁVEIS ===
@@ -77,3 +65,18 @@ plt.title("Importância das Variáveis - Modelo Aprimorado (Revisado)")
 plt.tight_layout()
 plt.show()
 
+# === IMPORTÂNCIA POR PERMUTAÇÃO (NO TESTE) ===
+# Queda de R² ao embaralhar cada variável e as categóricas codificadas juntas
+# processos=1: este script não tem guarda __main__ (em paralelo, usar importancia_permutacao.py)
+grupos = montar_grupos(list(X.columns), {'categóricas (juntas)': variaveis_categoricas})
+permutacao = importancia_permutacao(modelo, X_test, y_test, grupos, processos=1)
+print("\nImportância por permutação (queda de R²):")
+print(permutacao['tabela'].round(4))
+permutacao_df = permutacao['tabela'].reset_index().rename(columns={'grupo': 'Variável', 'importancia': 'Queda de R²'})
+
+plt.figure(figsize=(10, 6))
+sns.barplot(x='Queda de R²', y='Variável', data=permutacao_df)
+plt.title('Importância por Permutação - Modelo Aprimorado (Revisado)')
+plt.tight_layout()
+plt.show()
+
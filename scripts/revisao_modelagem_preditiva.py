@@ -10,28 +10,13 @@ from sklearn.linear_model import LinearRegression
 from sklearn.tree import DecisionTreeRegressor
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from base_dados import ALVO, VARIAVEIS_NUMERICAS, carregar_modelagem
 
-# === CARREGAR DADOS ===
-df = pd.read_csv("../dados/tjsp_processos_tratado.csv", sep=";")
+# === CARREGAR DADOS (VARIÁVEIS NUMÉRICAS CONFIÁVEIS, SEM NULOS) ===
+df_modelo = carregar_modelagem()
 
-# === SELEÇÃO DAS VARIÁVEIS NUMÉRICAS CONFIÁVEIS ===
-variaveis_numericas = [
-    'TPCPL_Dec_2024_num',
-    'Conc100_Dec_2024',
-    'CN_12_meses',
-    'Desp_12_meses',
-    'Sus_Dec_2023',
-    'Sus_Dec_2024',
-    'Tbaix_12_meses',
-    'CP_Dec_2024',
-    'SentCM_12_meses',
-    'SentSM_12_meses'
-]
-
-df_modelo = df.dropna(subset=['TPSent_12_meses_num'] + variaveis_numericas)
-
-X = df_modelo[variaveis_numericas]
-y = df_modelo['TPSent_12_meses_num']
+X = df_modelo[VARIAVEIS_NUMERICAS]
+y = df_modelo[ALVO]
 
 # === TREINO E TESTE ===
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
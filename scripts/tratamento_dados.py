@@ -1,55 +1,47 @@
-import pandas as pd
-import re
-
-# Leitura da base original
-df = pd.read_csv("../dados/tjsp_processos_sp.csv", sep=";")
-
-# Função para converter tempo em meses
-def convert_to_months(valor):
-    if pd.isna(valor):
-        return None
-    valor = str(valor).lower()
-    anos = meses = 0
-    match_ano = re.search(r"(\d+)\s*ano", valor)
-    match_mes = re.search(r"(\d+)\s*mes", valor)
-    if match_ano:
-        anos = int(match_ano.group(1))
-    if match_mes:
-        meses = int(match_mes.group(1))
-    return anos * 12 + meses
-
-# Aplicação da função
-df["TPSent_12_meses_num"] = df["TPSent_12_meses"].apply(convert_to_months)
-df["TPCPL_Dec_2024_num"] = df["TPCPL_Dec_2024"].apply(convert_to_months)
-
-# Salvar a base tratada
-df.to_csv("../dados/tjsp_processos_tratado.csv", sep=";", index=False)
-print("Base tratada salva com sucesso!")
-
-# Tratar valores ausentes
-
-# 1. Remover linhas com valores ausentes nas variáveis numéricas essenciais para a modelagem
-df = df.dropna(subset=[
-    'TPSent_12_meses_num', 
-    'TPCPL_Dec_2024_num'
-])
-
-# 2. Remover também linhas com IAD_12_meses ausente (fator relevante de atraso)
-df = df.dropna(subset=['IAD_12_meses'])
-
-# 3. Preencher colunas textuais com valor padrão
-df[['Municipio', 'UF']] = df[['Municipio', 'UF']].fillna('Não informado')
-
-# 4. Substituir valores ausentes em colunas de percentual por "0%" (evita erro na análise)
-df[['%CP', '%Sus']] = df[['%CP', '%Sus']].fillna('0%')
-
-# 5. (Recomendo) Substituir campos de texto 'TC_Dec_2024' e 'TPCPL_Dec_2024' ausentes por 'Não informado'
-df[['TC_Dec_2024', 'TPCPL_Dec_2024']] = df[['TC_Dec_2024', 'TPCPL_Dec_2024']].fillna('Não informado')
-
-# Verificação final de ausentes
-print("\nValores ausentes após o tratamento:")
-print(df.isnull().sum())
-
-# Salvar o arquivo tratado
-df.to_csv("../dados/tjsp_processos_tratado.csv", sep=";", index=False)
-print(f"Arquivo tratado salvo com sucesso com {df.shape[0]} linhas.")
+import argparse
+
+from base_dados import CAMINHO_ORIGINAL, CAMINHO_TRATADO
+from carregamento import ler_base_original, tratar_ausentes, tratar_em_blocos
+
+# Modo de execução: base inteira em memória (padrão) ou em blocos, para extratos nacionais
+parser = argparse.ArgumentParser(description="Tratamento da base original do DataJud")
+parser.add_argument("--origem", default=CAMINHO_ORIGINAL)
+parser.add_argument("--destino", default=CAMINHO_TRATADO)
+parser.add_argument("--blocos", type=int, default=None,
+                    help="processar em blocos com este número de linhas (modo streaming)")
+parser.add_argument("--incremental", action="store_true",
+                    help="tratar só os órgãos inseridos ou alterados desde o último extrato")
+args = parser.parse_args()
+
+if args.incremental:
+    # Delta por 'Codigo orgao' em relação ao extrato anterior (regras em incremental.atualizar)
+    from incremental import atualizar
+
+    resumo = atualizar(args.origem, args.destino)
+    print(f"{resumo['inseridos']} inseridos, {resumo['alterados']} alterados, {resumo['removidos']} removidos, "
+          f"{resumo['inalterados']} inalterados")
+    print(f"Arquivo tratado salvo com sucesso com {resumo['linhas_gravadas']} linhas "
+          f"({resumo['linhas_tratadas']} tratadas em {resumo['segundos']:.2f} s).")
+elif args.blocos:
+    # Leitura, tratamento e gravação bloco a bloco
+    resumo = tratar_em_blocos(args.origem, args.destino, args.blocos)
+
+    print("\nValores ausentes após o tratamento:")
+    print(resumo['ausentes'])
+    print(f"Arquivo tratado salvo com sucesso com {resumo['linhas_gravadas']} linhas "
+          f"({resumo['linhas_lidas']} lidas em {resumo['segundos']:.2f} s, "
+          f"{resumo['linhas_por_segundo']:,.0f} linhas/s).")
+else:
+    # Leitura da base original, já com durações, contagens e percentuais convertidos
+    df = ler_base_original(args.origem)
+
+    # Tratar valores ausentes (regras em carregamento.tratar_ausentes)
+    df = tratar_ausentes(df)
+
+    # Verificação final de ausentes
+    print("\nValores ausentes após o tratamento:")
+    print(df.isnull().sum())
+
+    # Salvar o arquivo tratado
+    df.to_csv(args.destino, sep=";", index=False)
+    print(f"Arquivo tratado salvo com sucesso com {df.shape[0]} linhas.")